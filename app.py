@@ -6,6 +6,12 @@ from src.config.settings import get_settings
 from src.features.ats.analyzer import ATSAnalyzer
 from src.features.job_matching.matcher import JobDescriptionMatcher
 from src.services.ai.gemini_client import GeminiClient
+from src.services.ai.hedging import HedgePolicy
+from src.services.ai.key_pool import ApiKeyPool
+from src.services.ai.model_health import ModelHealthRegistry
+from src.services.ai.model_router import ModelRouter, parse_model_routes
+from src.services.ai.rate_limiter import build_rate_limiter
+from src.services.ai.response_cache import build_response_cache
 from src.services.pdf.renderer import ResumePdfRenderer
 from src.services.resume.formatter import ResumeFormatter
 from src.services.resume.generator import ResumeGenerator
@@ -31,17 +37,63 @@ def build_resume_generator(
     max_retries: int,
     temperature: float,
     max_tokens: int,
+    section_concurrency: int,
 ) -> ResumeGenerator:
+    settings = get_settings()
     client = GeminiClient(
         api_key=api_key,
         model=model,
         timeout_seconds=timeout_seconds,
         max_retries=max_retries,
+        cache=build_response_cache(
+            backend=settings.gemini_cache_backend,
+            ttl_seconds=settings.gemini_cache_ttl_seconds,
+            max_entries=settings.gemini_cache_max_entries,
+            directory=settings.gemini_cache_dir,
+            redis_url=settings.gemini_cache_redis_url,
+        ),
+        health_registry=ModelHealthRegistry(
+            failure_threshold=settings.gemini_circuit_failure_threshold,
+            cooldown_seconds=settings.gemini_circuit_cooldown_seconds,
+            not_found_cooldown_seconds=settings.gemini_not_found_cooldown_seconds,
+        ),
+        key_pool=ApiKeyPool(
+            [api_key, *settings.gemini_api_keys],
+            requests_per_minute=settings.gemini_key_requests_per_minute,
+            default_cooldown_seconds=settings.gemini_key_cooldown_seconds,
+        ),
+        rate_limiter=build_rate_limiter(
+            requests_per_minute=settings.gemini_rate_limit_rpm,
+            tokens_per_minute=settings.gemini_rate_limit_tpm,
+            redis_url=settings.gemini_rate_limit_redis_url,
+        ),
+        rate_limit_max_wait_seconds=settings.gemini_rate_limit_max_wait_seconds,
+        hedge_policy=(
+            HedgePolicy(
+                percentile=settings.gemini_hedge_percentile,
+                max_hedge_ratio=settings.gemini_hedge_max_ratio,
+            )
+            if settings.gemini_hedging
+            else None
+        ),
+        base_url=settings.gemini_base_url,
     )
+    model_router = None
+    if settings.gemini_model_routing:
+        model_router = ModelRouter(
+            routes=parse_model_routes(settings.gemini_model_routes) or None,
+            health_registry=client.health_registry,
+            default_model=model,
+        )
     return ResumeGenerator(
         gemini_client=client,
         temperature=temperature,
         max_output_tokens=max_tokens,
+        section_concurrency=section_concurrency,
+        deadline_seconds=settings.generation_deadline_seconds,
+        strategy=settings.generation_strategy,
+        structured_output=settings.gemini_structured_output,
+        model_router=model_router,
     )
 
 
@@ -180,6 +232,9 @@ def render_generation_diagnostics():
     if raw.get("endpoint_used"):
         st.caption("Endpoint: " + str(raw.get("endpoint_used")))
 
+    if raw.get("cache_status"):
+        st.caption("Response cache: " + str(raw.get("cache_status")))
+
     if raw.get("quality_issues"):
         st.caption("Quality checks triggered: " + ", ".join(raw.get("quality_issues", [])))
 
@@ -221,6 +276,7 @@ def main():
         max_retries=settings.gemini_max_retries,
         temperature=settings.generation_temperature,
         max_tokens=settings.generation_max_tokens,
+        section_concurrency=settings.generation_section_concurrency,
     )
     formatter = build_resume_formatter()
     pdf_renderer = build_pdf_renderer()
@@ -247,6 +303,8 @@ def main():
             st.info("Test mode detected: generated a local dummy resume because all inputs were 'test'.")
         elif mode == "fallback":
             st.warning("AI response parsing failed once; showing a reliable fallback resume output.")
+        elif mode == "fallback_circuit_open":
+            st.warning("Gemini is temporarily unavailable, so the resume was built locally from your input data.")
         elif mode == "fallback_incomplete_ai":
             st.warning("AI output was incomplete, so a complete resume was rebuilt from your provided input data.")
         elif mode == "ai_sectional":
@@ -256,8 +314,17 @@ def main():
                 "Sectional AI generation partially failed for one or more sections; "
                 "affected sections were rebuilt from cleaned input data."
             )
+        elif mode == "ai_batched":
+            st.info("Generated all sections in a single batched AI pass.")
+        elif mode == "ai_batched_partial":
+            st.warning(
+                "Batched AI generation could not complete one or more sections; "
+                "affected sections were rebuilt from cleaned input data."
+            )
         elif mode == "ai_sectional_recovered":
             st.info("Sectional AI output was recovered after quality checks and retry.")
+        elif mode == "ai_batched_recovered":
+            st.info("Batched AI output was recovered after quality checks and a sectional retry.")
         elif mode == "ai_repaired":
             st.info("AI response needed JSON repair once; normalized result is shown.")
         elif mode == "ai_recovered":
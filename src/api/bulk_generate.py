@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+import json
+import os
+from pathlib import Path
+import re
+import time
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple, get_args
+
+from src.api.mappers import from_domain_resume_output, to_domain_resume_input
+from src.api.runtime import ResumeRuntime, get_resume_runtime
+from src.api.schemas import ResumeInputPayload, ResumeTemplateKey
+from src.services.ai.usage import UsageTracker, track_usage
+
+
+# Offline bulk generation: python -m src.api.bulk_generate inputs.jsonl --output ./data/bulk --workers 4
+
+CHECKPOINT_FILE = "checkpoint.jsonl"
+ITEM_STATUS_COMPLETED = "completed"
+ITEM_STATUS_FAILED = "failed"
+
+_UNSAFE_ID = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+@dataclass(frozen=True)
+class BulkOptions:
+    template_key: str = "classic"
+    generation_mode: str = "ai"
+    generation_strategy: str = ""
+    write_pdf: bool = True
+    embed_fonts: bool = True
+    # Per-process section fan-out; set from the pool-wide Gemini concurrency budget.
+    section_concurrency: int = 0
+
+
+def _parse_document(raw: str, fallback_id: str) -> Tuple[str, Dict[str, Any] | None, str]:
+    try:
+        document = json.loads(raw)
+    except ValueError as exc:
+        return fallback_id, None, f"Invalid JSON: {exc}"
+    if not isinstance(document, dict):
+        return fallback_id, None, f"Expected a JSON object, got {type(document).__name__}"
+    return str(document.pop("id", "") or fallback_id), document, ""
+
+
+def _read_documents(path: Path) -> Iterator[Tuple[str, Dict[str, Any] | None, str]]:
+    if path.is_dir():
+        for file in sorted(path.glob("*.json")):
+            try:
+                raw = file.read_text(encoding="utf-8")
+            except (OSError, ValueError) as exc:
+                yield file.stem, None, f"Unreadable file: {exc}"
+                continue
+            yield _parse_document(raw, file.stem)
+        return
+
+    with path.open(encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            yield _parse_document(line, f"{path.stem}-{line_number:06d}")
+
+
+def load_items(source: str) -> Iterator[Tuple[str, Dict[str, Any] | None, str]]:
+    # Yields (item id, document, error); a bad document carries an error instead of
+    # stopping the run. Repeated ids, or ids that map to the same file name, get a
+    # numeric suffix in input order, so reruns give every item the same id again.
+    seen_ids: set[str] = set()
+    seen_names: set[str] = set()
+    for item_id, document, error in _read_documents(Path(source)):
+        unique_id, suffix = item_id, 1
+        while unique_id in seen_ids or safe_item_id(unique_id) in seen_names:
+            suffix += 1
+            unique_id = f"{item_id}-{suffix}"
+        seen_ids.add(unique_id)
+        seen_names.add(safe_item_id(unique_id))
+        yield unique_id, document, error
+
+
+def read_checkpoint(output_dir: Path) -> Dict[str, Dict[str, Any]]:
+    # Later lines win, so an item that failed and then succeeded on a rerun counts as completed.
+    entries: Dict[str, Dict[str, Any]] = {}
+    checkpoint = output_dir / CHECKPOINT_FILE
+    if not checkpoint.exists():
+        return entries
+    for line in checkpoint.read_text(encoding="utf-8").splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            # A line cut short by an interruption is simply retried.
+            continue
+        entries[str(entry.get("id", ""))] = entry
+    return entries
+
+
+def safe_item_id(item_id: str) -> str:
+    return _UNSAFE_ID.sub("_", item_id).strip("._") or "item"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_bytes(data)
+    temporary.replace(path)
+
+
+_WORKER_RUNTIME: ResumeRuntime | None = None
+
+
+def _init_worker(options: BulkOptions) -> None:
+    global _WORKER_RUNTIME
+    _WORKER_RUNTIME = get_resume_runtime()
+    if options.section_concurrency:
+        _WORKER_RUNTIME.generator.section_concurrency = options.section_concurrency
+
+
+def process_item(
+    item_id: str,
+    document: Dict[str, Any],
+    output_dir: str,
+    options: BulkOptions,
+    runtime: ResumeRuntime | None = None,
+) -> Dict[str, Any]:
+    runtime = runtime or _WORKER_RUNTIME or get_resume_runtime()
+    started = time.perf_counter()
+    timings: Dict[str, int] = {}
+    usage_tracker = UsageTracker()
+    try:
+        payload = ResumeInputPayload.model_validate(document)
+        resume_input = to_domain_resume_input(payload)
+
+        with track_usage(usage_tracker):
+            if options.generation_mode == "local":
+                resume_output = runtime.generator.generate_local(resume_input)
+            else:
+                resume_output = runtime.generator.generate(resume_input, strategy=options.generation_strategy)
+        timings["generate_ms"] = int((time.perf_counter() - started) * 1000)
+
+        stage_started = time.perf_counter()
+        markdown = runtime.formatter.to_markdown(resume_input, resume_output, template_key=options.template_key)
+        timings["markdown_ms"] = int((time.perf_counter() - stage_started) * 1000)
+
+        pdf_bytes = b""
+        if options.write_pdf:
+            stage_started = time.perf_counter()
+            pdf_bytes = runtime.pdf_renderer.render(
+                resume_input,
+                resume_output,
+                template_key=options.template_key,
+                embed_fonts=options.embed_fonts,
+            )
+            timings["pdf_ms"] = int((time.perf_counter() - stage_started) * 1000)
+
+        # Outputs land before the checkpoint line, so a checkpointed item is always complete on disk.
+        target = Path(output_dir)
+        name = safe_item_id(item_id)
+        diagnostics = dict(resume_output.raw_response or {})
+        diagnostics["usage"] = usage_tracker.summary()
+        result = {
+            "id": item_id,
+            "template_key": options.template_key,
+            "resume_output": from_domain_resume_output(resume_output).model_dump(),
+            "diagnostics": diagnostics,
+        }
+        _write_atomic(target / f"{name}.md", markdown.encode("utf-8"))
+        if pdf_bytes:
+            _write_atomic(target / f"{name}.pdf", pdf_bytes)
+        _write_atomic(target / f"{name}.json", json.dumps(result, ensure_ascii=False, default=str).encode("utf-8"))
+        status, error = ITEM_STATUS_COMPLETED, ""
+    except Exception as exc:
+        status, error = ITEM_STATUS_FAILED, f"{type(exc).__name__}: {exc}"
+
+    usage = usage_tracker.summary()
+    return {
+        "id": item_id,
+        "status": status,
+        "error": error,
+        "elapsed_ms": int((time.perf_counter() - started) * 1000),
+        **timings,
+        "gemini_calls": usage["calls"],
+        "total_tokens": usage["total_tokens"],
+    }
+
+
+def _failed_result(item_id: str, error: str) -> Dict[str, Any]:
+    return {
+        "id": item_id,
+        "status": ITEM_STATUS_FAILED,
+        "error": error,
+        "elapsed_ms": 0,
+        "gemini_calls": 0,
+        "total_tokens": 0,
+    }
+
+
+def _percentile(values: Sequence[int], percentile: float) -> int:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(results: List[Dict[str, Any]], skipped: int, wall_seconds: float) -> Dict[str, Any]:
+    completed = [result for result in results if result["status"] == ITEM_STATUS_COMPLETED]
+    latencies = [result["elapsed_ms"] for result in completed]
+    stages = {
+        stage: int(sum(result.get(stage, 0) for result in completed) / len(completed)) if completed else 0
+        for stage in ("generate_ms", "markdown_ms", "pdf_ms")
+    }
+    return {
+        "processed": len(results),
+        "completed": len(completed),
+        "failed": len(results) - len(completed),
+        "skipped": skipped,
+        "wall_seconds": round(wall_seconds, 2),
+        "throughput_per_minute": round(len(completed) * 60 / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "max": max(latencies, default=0),
+        },
+        "mean_stage_ms": stages,
+        "gemini_calls": sum(result["gemini_calls"] for result in results),
+        "total_tokens": sum(result["total_tokens"] for result in results),
+    }
+
+
+def run_bulk(
+    source: str,
+    output_dir: str,
+    options: BulkOptions,
+    workers: int = 0,
+    executor_factory: Callable[[int, BulkOptions], Executor] | None = None,
+    on_result: Callable[[Dict[str, Any]], None] | None = None,
+) -> Dict[str, Any]:
+    # workers=0 runs every item in this process, which is handy for debugging a single bad document.
+    target = Path(output_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    done = {
+        item_id
+        for item_id, entry in read_checkpoint(target).items()
+        if entry.get("status") == ITEM_STATUS_COMPLETED
+    }
+
+    results: List[Dict[str, Any]] = []
+    skipped = 0
+
+    def pending_items() -> Iterator[Tuple[str, Dict[str, Any] | None, str]]:
+        nonlocal skipped
+        for item_id, document, error in load_items(source):
+            if item_id in done:
+                skipped += 1
+            else:
+                yield item_id, document, error
+
+    started = time.monotonic()
+    with (target / CHECKPOINT_FILE).open("a", encoding="utf-8") as checkpoint:
+
+        def finish(result: Dict[str, Any]) -> None:
+            checkpoint.write(json.dumps(result) + "\n")
+            checkpoint.flush()
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+
+        if workers <= 0:
+            for item_id, document, error in pending_items():
+                if error:
+                    finish(_failed_result(item_id, error))
+                else:
+                    finish(process_item(item_id, document, str(target), options))
+            return summarize(results, skipped, time.monotonic() - started)
+
+        factory = executor_factory or (
+            lambda count, pool_options: ProcessPoolExecutor(
+                max_workers=count,
+                initializer=_init_worker,
+                initargs=(pool_options,),
+            )
+        )
+        executor = factory(workers, options)
+        # Inputs are read lazily and only a small window is in flight, so huge batches stay cheap.
+        in_flight: Dict[Future, Tuple[str, Executor]] = {}
+        items = pending_items()
+        try:
+            while True:
+                while len(in_flight) < workers * 2:
+                    item = next(items, None)
+                    if item is None:
+                        break
+                    item_id, document, error = item
+                    if error:
+                        finish(_failed_result(item_id, error))
+                        continue
+                    try:
+                        future = executor.submit(process_item, item_id, document, str(target), options)
+                    except BrokenProcessPool:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = factory(workers, options)
+                        future = executor.submit(process_item, item_id, document, str(target), options)
+                    in_flight[future] = (item_id, executor)
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    item_id, owner = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        # A worker that dies (OOM kill, segfault) breaks the whole pool and fails
+                        # everything in flight on it; those items are checkpointed as failed so a
+                        # rerun retries them, and the rest of the run continues on a fresh pool.
+                        result = _failed_result(item_id, f"{type(exc).__name__}: {exc}")
+                        if isinstance(exc, BrokenProcessPool) and owner is executor:
+                            executor.shutdown(wait=False, cancel_futures=True)
+                            executor = factory(workers, options)
+                    finish(result)
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            summary = summarize(results, skipped, time.monotonic() - started)
+            summary["interrupted"] = True
+            return summary
+        executor.shutdown(wait=True)
+
+    return summarize(results, skipped, time.monotonic() - started)
+
+
+def _print_summary(summary: Dict[str, Any]) -> None:
+    latency = summary["latency_ms"]
+    stages = summary["mean_stage_ms"]
+    if summary.get("interrupted"):
+        print("Interrupted; rerun the same command to resume from the checkpoint.")
+    print(
+        f"Processed {summary['processed']} (completed {summary['completed']}, failed {summary['failed']}, "
+        f"skipped {summary['skipped']}) in {summary['wall_seconds']}s"
+    )
+    print(f"Throughput: {summary['throughput_per_minute']} resumes/min")
+    print(f"Latency ms: p50 {latency['p50']}, p95 {latency['p95']}, max {latency['max']}")
+    print(f"Mean stage ms: generate {stages['generate_ms']}, markdown {stages['markdown_ms']}, pdf {stages['pdf_ms']}")
+    print(f"Gemini: {summary['gemini_calls']} calls, {summary['total_tokens']} tokens")
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate resumes in bulk from a directory or JSONL of inputs.")
+    parser.add_argument("source", help="Directory of *.json ResumeInputPayload documents or a JSONL file")
+    parser.add_argument("--output", default="./data/bulk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--gemini-concurrency",
+        type=int,
+        default=0,
+        help="Upper bound on concurrent Gemini calls across all workers (0 keeps GENERATION_SECTION_CONCURRENCY)",
+    )
+    parser.add_argument("--template", choices=get_args(ResumeTemplateKey), default="classic")
+    parser.add_argument("--mode", choices=("ai", "local"), default="ai")
+    parser.add_argument("--strategy", default="")
+    parser.add_argument("--no-pdf", action="store_true")
+    parser.add_argument("--no-embed-fonts", action="store_true")
+    args = parser.parse_args(argv)
+
+    workers = max(0, args.workers)
+    section_concurrency = 0
+    if args.gemini_concurrency > 0:
+        workers = max(1, min(workers or 1, args.gemini_concurrency))
+        section_concurrency = max(1, args.gemini_concurrency // workers)
+
+    options = BulkOptions(
+        template_key=args.template,
+        generation_mode=args.mode,
+        generation_strategy=args.strategy,
+        write_pdf=not args.no_pdf,
+        embed_fonts=not args.no_embed_fonts,
+        section_concurrency=section_concurrency,
+    )
+
+    def report(result: Dict[str, Any]) -> None:
+        suffix = f" ({result['error']})" if result["error"] else ""
+        print(f"{result['status']:>9} {result['id']} {result['elapsed_ms']}ms{suffix}", flush=True)
+
+    summary = run_bulk(args.source, args.output, options, workers=workers, on_result=report)
+    _print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -53,6 +53,7 @@ class ApiSettings:
     redis_url: str
     queue_name: str
     storage_dir: str
+    job_dedup_window_seconds: int
 
 
 @lru_cache
@@ -67,6 +68,11 @@ def get_api_settings() -> ApiSettings:
     except ValueError:
         jwt_expiry_minutes = 1440
 
+    try:
+        job_dedup_window_seconds = int(_read_env("JOB_DEDUP_WINDOW_SECONDS", default="900"))
+    except ValueError:
+        job_dedup_window_seconds = 900
+
     default_origins = "http://localhost:3000,http://127.0.0.1:3000"
     return ApiSettings(
         api_prefix=_read_env("API_PREFIX", default="/api/v1"),
@@ -81,4 +87,5 @@ def get_api_settings() -> ApiSettings:
         redis_url=_read_env("REDIS_URL", default="redis://localhost:6379/0"),
         queue_name=_read_env("QUEUE_NAME", default="resume_jobs"),
         storage_dir=_read_env("STORAGE_DIR", default="./data/storage"),
+        job_dedup_window_seconds=max(0, job_dedup_window_seconds),
     )
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from datetime import timedelta
+import hashlib
+import json
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from src.api.models_db import (
+    JOB_IN_FLIGHT_STATUSES,
+    JOB_STATUS_COMPLETED,
+    ResumeJob,
+    ResumeRecord,
+    utc_now,
+)
+from src.api.schemas import ResumeGenerationRequest
+
+
+REUSABLE_JOB_STATUSES = (*JOB_IN_FLIGHT_STATUSES, JOB_STATUS_COMPLETED)
+
+# Delivery options do not change the generated resume, so they are left out of the hash.
+_UNHASHED_FIELDS = {"deduplicate", "preview_first"}
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, list):
+        items = [_normalize(item) for item in value]
+        return [item for item in items if item not in ("", None, [], {})]
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    return value
+
+
+def request_hash(payload: ResumeGenerationRequest) -> str:
+    data = payload.model_dump(mode="json", exclude=_UNHASHED_FIELDS)
+    canonical = json.dumps(_normalize(data), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def find_duplicate_job(
+    session: Session,
+    user_id: UUID,
+    hash_value: str,
+    window_seconds: int,
+) -> ResumeJob | None:
+    # Failed jobs never match, so a retry after a failure always starts a new run.
+    if not hash_value or window_seconds <= 0:
+        return None
+
+    cutoff = utc_now() - timedelta(seconds=window_seconds)
+    return session.exec(
+        select(ResumeJob)
+        .where(ResumeJob.user_id == user_id)
+        .where(ResumeJob.request_hash == hash_value)
+        .where(ResumeJob.status.in_(REUSABLE_JOB_STATUSES))
+        .where(ResumeJob.created_at >= cutoff)
+        .order_by(ResumeJob.created_at.desc())
+    ).first()
+
+
+def find_duplicate_record(
+    session: Session,
+    user_id: UUID,
+    hash_value: str,
+    window_seconds: int,
+) -> ResumeRecord | None:
+    # Records outlive the job rows that produced them, so a finished run still matches.
+    if not hash_value or window_seconds <= 0:
+        return None
+
+    cutoff = utc_now() - timedelta(seconds=window_seconds)
+    return session.exec(
+        select(ResumeRecord)
+        .where(ResumeRecord.user_id == user_id)
+        .where(ResumeRecord.request_hash == hash_value)
+        .where(ResumeRecord.created_at >= cutoff)
+        .order_by(ResumeRecord.created_at.desc())
+    ).first()
+
+
+def completed_job_for_record(payload: ResumeGenerationRequest, hash_value: str, record: ResumeRecord) -> ResumeJob:
+    # A completed job pointing at the matched record, so clients poll it like any other run.
+    return ResumeJob(
+        user_id=record.user_id,
+        status=JOB_STATUS_COMPLETED,
+        template_key=record.template_key,
+        request_hash=hash_value,
+        request_payload=payload.model_dump(mode="json"),
+        result_payload={
+            "resume_output": record.output_payload,
+            "markdown": record.markdown_content,
+            "ats_result": record.ats_result,
+            "jd_result": record.jd_result,
+            "diagnostics": record.diagnostics,
+        },
+        record_id=record.id,
+        pdf_path=record.pdf_path,
+    )
+
+
+def release_stale_dedup_key(session: Session, user_id: UUID, hash_value: str, window_seconds: int) -> None:
+    # A job older than the window no longer absorbs resubmissions, so it gives up its
+    # claim on the unique in-flight index instead of blocking the new run.
+    cutoff = utc_now() - timedelta(seconds=window_seconds)
+    session.execute(
+        update(ResumeJob)
+        .where(ResumeJob.user_id == user_id)
+        .where(ResumeJob.dedup_key == hash_value)
+        .where(ResumeJob.created_at < cutoff)
+        .values(dedup_key=None)
+    )
+
+
+def find_in_flight_job(session: Session, user_id: UUID, hash_value: str) -> ResumeJob | None:
+    return session.exec(
+        select(ResumeJob)
+        .where(ResumeJob.user_id == user_id)
+        .where(ResumeJob.dedup_key == hash_value)
+        .where(ResumeJob.status.in_(JOB_IN_FLIGHT_STATUSES))
+    ).first()
@@ -8,6 +8,8 @@ from src.api.db import init_db
 from src.api.routers.auth import router as auth_router
 from src.api.routers.ats_router import router as ats_router
 from src.api.routers.resumes import router as resumes_router
+from src.api.routers.usage import router as usage_router
+from src.api.runtime import get_resume_runtime
 
 
 def create_app() -> FastAPI:
@@ -30,6 +32,7 @@ def create_app() -> FastAPI:
     app.include_router(auth_router, prefix=settings.api_prefix)
     app.include_router(resumes_router, prefix=settings.api_prefix)
     app.include_router(ats_router, prefix=settings.api_prefix)
+    app.include_router(usage_router, prefix=settings.api_prefix)
 
     @app.on_event("startup")
     def on_startup() -> None:
@@ -40,6 +43,15 @@ def create_app() -> FastAPI:
     def healthcheck() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/healthz/gemini")
+    def gemini_health() -> dict[str, bool]:
+        # Unauthenticated, so liveness only: key labels, quotas and circuit state stay internal.
+        client = get_resume_runtime().generator.gemini_client
+        return {
+            "available": client.is_available(),
+            "api_keys_configured": bool(client.key_pool),
+        }
+
     return app
 
 
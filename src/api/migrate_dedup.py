@@ -0,0 +1,55 @@
+from typing import List
+
+from sqlalchemy import inspect, text
+
+from src.api.db import get_engine
+
+
+# One-off upgrade for databases created before job deduplication:
+#   python -m src.api.migrate_dedup
+# Fresh databases get these columns from init_db and need nothing. Safe to rerun.
+
+_COLUMNS = (
+    ("users", "deduplicate_jobs", "ALTER TABLE users ADD COLUMN deduplicate_jobs BOOLEAN NOT NULL DEFAULT TRUE"),
+    ("resume_jobs", "request_hash", "ALTER TABLE resume_jobs ADD COLUMN request_hash VARCHAR(64) NOT NULL DEFAULT ''"),
+    ("resume_jobs", "dedup_key", "ALTER TABLE resume_jobs ADD COLUMN dedup_key VARCHAR(64)"),
+    (
+        "resume_records",
+        "request_hash",
+        "ALTER TABLE resume_records ADD COLUMN request_hash VARCHAR(64) NOT NULL DEFAULT ''",
+    ),
+)
+
+_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_resume_jobs_request_hash ON resume_jobs (request_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_resume_records_request_hash ON resume_records (request_hash)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_resume_jobs_in_flight_dedup ON resume_jobs (user_id, dedup_key) "
+    "WHERE status IN ('queued', 'processing', 'preview_ready')",
+)
+
+
+def migrate(engine) -> List[str]:
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    if not {"users", "resume_jobs", "resume_records"} <= tables:
+        raise RuntimeError("Tables are missing; start the API once so init_db creates them, then rerun.")
+
+    applied: List[str] = []
+    with engine.begin() as connection:
+        for table, column, statement in _COLUMNS:
+            if column in {existing["name"] for existing in inspector.get_columns(table)}:
+                continue
+            connection.execute(text(statement))
+            applied.append(f"{table}.{column}")
+        for statement in _INDEXES:
+            connection.execute(text(statement))
+    return applied
+
+
+def main() -> None:
+    applied = migrate(get_engine())
+    print(f"Added {', '.join(applied)}" if applied else "Database already up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,33 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Any, Dict
 import uuid
 
-from sqlalchemy import Column, DateTime, JSON, String, Text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Index,
+    Integer,
+    JSON,
+    String,
+    Text,
+    UniqueConstraint,
+    text,
+    true,
+)
 from sqlmodel import Field, SQLModel
 
 
 JOB_STATUS_QUEUED = "queued"
 JOB_STATUS_PROCESSING = "processing"
+JOB_STATUS_PREVIEW_READY = "preview_ready"
 JOB_STATUS_COMPLETED = "completed"
 JOB_STATUS_FAILED = "failed"
+JOB_IN_FLIGHT_STATUSES = (JOB_STATUS_QUEUED, JOB_STATUS_PROCESSING, JOB_STATUS_PREVIEW_READY)
 
 ATS_JOB_STATUS_QUEUED = "queued"
 ATS_JOB_STATUS_PROCESSING = "processing"
@@ -19,6 +35,9 @@ ATS_JOB_STATUS_COMPLETED = "completed"
 ATS_JOB_STATUS_FAILED = "failed"
 
 
+_IN_FLIGHT_JOB_CLAUSE = text("status IN ({})".format(", ".join(f"'{item}'" for item in JOB_IN_FLIGHT_STATUSES)))
+
+
 def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
@@ -29,6 +48,10 @@ class User(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     email: str = Field(sa_column=Column(String(255), unique=True, index=True, nullable=False))
     hashed_password: str = Field(sa_column=Column(String(255), nullable=False))
+    deduplicate_jobs: bool = Field(
+        default=True,
+        sa_column=Column(Boolean, nullable=False, server_default=true()),
+    )
     created_at: datetime = Field(
         default_factory=utc_now,
         sa_column=Column(DateTime(timezone=True), nullable=False),
@@ -37,11 +60,29 @@ class User(SQLModel, table=True):
 
 class ResumeJob(SQLModel, table=True):
     __tablename__ = "resume_jobs"
+    # At most one in-flight job per user and deduplicated request, however many API
+    # processes race on the same submission.
+    __table_args__ = (
+        Index(
+            "uq_resume_jobs_in_flight_dedup",
+            "user_id",
+            "dedup_key",
+            unique=True,
+            sqlite_where=_IN_FLIGHT_JOB_CLAUSE,
+            postgresql_where=_IN_FLIGHT_JOB_CLAUSE,
+        ),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="users.id", index=True, nullable=False)
     status: str = Field(default=JOB_STATUS_QUEUED, sa_column=Column(String(32), nullable=False, index=True))
     template_key: str = Field(default="classic", sa_column=Column(String(32), nullable=False))
+    request_hash: str = Field(
+        default="",
+        sa_column=Column(String(64), nullable=False, index=True, server_default=""),
+    )
+    # The request hash while this job may be reused; NULL when deduplication was off.
+    dedup_key: str | None = Field(default=None, sa_column=Column(String(64), nullable=True))
     request_payload: Dict[str, Any] = Field(
         default_factory=dict,
         sa_column=Column(JSON, nullable=False),
@@ -70,6 +111,10 @@ class ResumeRecord(SQLModel, table=True):
     user_id: uuid.UUID = Field(foreign_key="users.id", index=True, nullable=False)
     template_key: str = Field(default="classic", sa_column=Column(String(32), nullable=False))
     title: str = Field(default="Resume", sa_column=Column(String(255), nullable=False))
+    request_hash: str = Field(
+        default="",
+        sa_column=Column(String(64), nullable=False, index=True, server_default=""),
+    )
     input_payload: Dict[str, Any] = Field(
         default_factory=dict,
         sa_column=Column(JSON, nullable=False),
@@ -98,6 +143,58 @@ class ResumeRecord(SQLModel, table=True):
     )
 
 
+class ResumeBatchJob(SQLModel, table=True):
+    # One profile tailored to several job descriptions; produces one ResumeRecord per target.
+    __tablename__ = "resume_batch_jobs"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id", index=True, nullable=False)
+    status: str = Field(default=JOB_STATUS_QUEUED, sa_column=Column(String(32), nullable=False, index=True))
+    template_key: str = Field(default="classic", sa_column=Column(String(32), nullable=False))
+    request_payload: Dict[str, Any] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False),
+    )
+    result_payload: Dict[str, Any] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False),
+    )
+    error_message: str = Field(default="", sa_column=Column(Text, nullable=False))
+    created_at: datetime = Field(
+        default_factory=utc_now,
+        sa_column=Column(DateTime(timezone=True), nullable=False, index=True),
+    )
+    updated_at: datetime = Field(
+        default_factory=utc_now,
+        sa_column=Column(DateTime(timezone=True), nullable=False, index=True),
+    )
+
+
+class UsageDaily(SQLModel, table=True):
+    __tablename__ = "usage_daily"
+    __table_args__ = (UniqueConstraint("user_id", "day", name="uq_usage_daily_user_day"),)
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id", index=True, nullable=False)
+    day: date = Field(sa_column=Column(Date, nullable=False, index=True))
+    jobs: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    calls: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    failed_calls: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    cache_hits: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    prompt_tokens: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+    output_tokens: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+    total_tokens: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+    latency_ms: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+    attempts: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    fallbacks: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    hedges: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    wall_ms: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+    updated_at: datetime = Field(
+        default_factory=utc_now,
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+
+
 class ATSOptimizeJob(SQLModel, table=True):
     __tablename__ = "ats_optimize_jobs"
 
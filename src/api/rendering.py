@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, Tuple
+
+from src.api.mappers import to_domain_resume_input
+from src.api.models_db import ResumeRecord
+from src.api.schemas import ResumeInputPayload
+from src.domain.models import ResumeInput, ResumeOutput
+
+
+# Re-rendering a stored record into another template needs only its input and output
+# payloads. Artifacts are cached per record, template and payload content, so a switch
+# costs one render the first time and a file read after that.
+
+
+def _content_key(record: ResumeRecord) -> str:
+    material = {"input": record.input_payload or {}, "output": record.output_payload or {}}
+    canonical = json.dumps(material, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def _artifact_path(storage_dir: str, record: ResumeRecord, template_key: str, suffix: str) -> Path:
+    return Path(storage_dir) / "renders" / str(record.id) / f"{template_key}-{_content_key(record)}.{suffix}"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(handle, "wb") as stream:
+            stream.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+
+
+def _record_documents(record: ResumeRecord) -> Tuple[ResumeInput, ResumeOutput]:
+    resume_input = to_domain_resume_input(ResumeInputPayload.model_validate(record.input_payload or {}))
+    resume_output = ResumeOutput.from_dict(record.output_payload or {})
+    resume_output.raw_response = dict(record.diagnostics or {})
+    return resume_input, resume_output
+
+
+def render_record_markdown(runtime: Any, record: ResumeRecord, template_key: str, storage_dir: str) -> Tuple[str, bool]:
+    # Returns the markdown and whether it came from stored data rather than a fresh render.
+    if template_key == record.template_key and record.markdown_content:
+        return record.markdown_content, True
+
+    path = _artifact_path(storage_dir, record, template_key, "md")
+    if path.exists():
+        return path.read_text(encoding="utf-8"), True
+
+    resume_input, resume_output = _record_documents(record)
+    markdown = runtime.formatter.to_markdown(resume_input, resume_output, template_key=template_key)
+    _write_atomic(path, markdown.encode("utf-8"))
+    return markdown, False
+
+
+def render_record_pdf(runtime: Any, record: ResumeRecord, template_key: str, storage_dir: str) -> Tuple[Path | None, bool]:
+    if template_key == record.template_key and record.pdf_path and Path(record.pdf_path).is_file():
+        return Path(record.pdf_path), True
+
+    path = _artifact_path(storage_dir, record, template_key, "pdf")
+    if path.is_file():
+        return path, True
+
+    resume_input, resume_output = _record_documents(record)
+    pdf_bytes = runtime.pdf_renderer.render(resume_input, resume_output, template_key=template_key)
+    if not pdf_bytes:
+        return None, False
+    _write_atomic(path, pdf_bytes)
+    return path, False
@@ -5,7 +5,13 @@ from sqlmodel import Session, select
 
 from src.api.db import get_session
 from src.api.models_db import User
-from src.api.schemas import AuthTokenResponse, UserLoginRequest, UserRegisterRequest, UserResponse
+from src.api.schemas import (
+    AuthTokenResponse,
+    UserLoginRequest,
+    UserPreferencesUpdate,
+    UserRegisterRequest,
+    UserResponse,
+)
 from src.api.security import create_access_token, get_current_user, hash_password, verify_password
 
 
@@ -48,3 +54,17 @@ def login(
 @router.get("/me", response_model=UserResponse)
 def me(current_user: Annotated[User, Depends(get_current_user)]):
     return UserResponse.model_validate(current_user)
+
+
+@router.patch("/me", response_model=UserResponse)
+def update_me(
+    payload: UserPreferencesUpdate,
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: Annotated[Session, Depends(get_session)],
+):
+    if payload.deduplicate_jobs is not None:
+        current_user.deduplicate_jobs = payload.deduplicate_jobs
+    session.add(current_user)
+    session.commit()
+    session.refresh(current_user)
+    return UserResponse.model_validate(current_user)
@@ -2,23 +2,44 @@ from __future__ import annotations
 
 from pathlib import Path
 import tempfile
+import time
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile, status
 from fastapi.responses import FileResponse
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
+from src.api.config import get_api_settings
 from src.api.db import get_session
+from src.api.dedup import (
+    completed_job_for_record,
+    find_duplicate_job,
+    find_duplicate_record,
+    find_in_flight_job,
+    release_stale_dedup_key,
+    request_hash,
+)
 from src.api.intake import parse_resume_text_to_prefill, prefill_to_resume_input_payload
-from src.api.models_db import ResumeJob, ResumeRecord, User
-from src.api.queueing import enqueue_resume_job
+from src.api.mappers import from_domain_resume_output, to_domain_resume_input
+from src.api.models_db import JOB_STATUS_COMPLETED, JOB_STATUS_QUEUED, ResumeBatchJob, ResumeJob, ResumeRecord, User
+from src.api.queueing import enqueue_resume_batch_job, enqueue_resume_job
+from src.api.rendering import render_record_markdown, render_record_pdf
+from src.api.runtime import get_resume_runtime
 from src.api.schemas import (
+    LocalGenerationResponse,
+    LocalResponseFormat,
     ParseUploadResponse,
+    RecordTemplateResponse,
+    ResumeBatchGenerationRequest,
+    ResumeBatchJobQueuedResponse,
+    ResumeBatchJobStatusResponse,
     ResumeGenerationRequest,
     ResumeJobQueuedResponse,
     ResumeJobStatusResponse,
     ResumeRecordResponse,
+    ResumeTemplateKey,
 )
 from src.api.security import get_current_user
 from src.services.resume.parsing.parser import extract_text_from_docx, extract_text_from_pdf
@@ -79,26 +100,170 @@ async def parse_upload(
     )
 
 
+def _deduplicated_job_response(job: ResumeJob, response: Response) -> ResumeJobQueuedResponse:
+    if job.status == JOB_STATUS_COMPLETED:
+        response.status_code = status.HTTP_200_OK
+    return ResumeJobQueuedResponse(
+        job_id=job.id,
+        status=job.status,
+        queue_backend="deduplicated",
+        deduplicated=True,
+        record_id=job.record_id,
+    )
+
+
 @router.post("/jobs", response_model=ResumeJobQueuedResponse, status_code=status.HTTP_202_ACCEPTED)
 def create_generation_job(
     payload: ResumeGenerationRequest,
+    response: Response,
     current_user: Annotated[User, Depends(get_current_user)],
     session: Annotated[Session, Depends(get_session)],
 ):
+    if payload.previous_record_id is not None:
+        previous_record = session.exec(
+            select(ResumeRecord)
+            .where(ResumeRecord.id == payload.previous_record_id)
+            .where(ResumeRecord.user_id == current_user.id)
+        ).first()
+        if not previous_record:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Record not found")
+
+    hash_value = request_hash(payload)
+    deduplicate = current_user.deduplicate_jobs if payload.deduplicate is None else payload.deduplicate
+    window_seconds = get_api_settings().job_dedup_window_seconds
+    dedup_key = hash_value if deduplicate and window_seconds > 0 else None
+    if dedup_key:
+        # Double clicks, client retries and reloads attach to the same run instead of
+        # generating again; a completed match is returned straight away.
+        duplicate = find_duplicate_job(session, current_user.id, hash_value, window_seconds)
+        if duplicate is not None:
+            return _deduplicated_job_response(duplicate, response)
+        record = find_duplicate_record(session, current_user.id, hash_value, window_seconds)
+        if record is not None:
+            job = completed_job_for_record(payload, hash_value, record)
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            return _deduplicated_job_response(job, response)
+        release_stale_dedup_key(session, current_user.id, hash_value, window_seconds)
+
     job = ResumeJob(
         user_id=current_user.id,
-        status="queued",
+        status=JOB_STATUS_QUEUED,
         template_key=payload.template_key,
-        request_payload=payload.model_dump(),
+        request_hash=hash_value,
+        dedup_key=dedup_key,
+        request_payload=payload.model_dump(mode="json"),
         result_payload={},
     )
 
     session.add(job)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        # Another request inserted the same in-flight job between our check and insert.
+        session.rollback()
+        duplicate = find_in_flight_job(session, current_user.id, hash_value)
+        if duplicate is None:
+            raise
+        return _deduplicated_job_response(duplicate, response)
     session.refresh(job)
 
     backend = enqueue_resume_job(str(job.id))
-    return ResumeJobQueuedResponse(job_id=job.id, status="queued", queue_backend=backend)
+    return ResumeJobQueuedResponse(job_id=job.id, status=JOB_STATUS_QUEUED, queue_backend=backend)
+
+
+@router.post("/batch-jobs", response_model=ResumeBatchJobQueuedResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_batch_generation_job(
+    payload: ResumeBatchGenerationRequest,
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: Annotated[Session, Depends(get_session)],
+):
+    job = ResumeBatchJob(
+        user_id=current_user.id,
+        status=JOB_STATUS_QUEUED,
+        template_key=payload.template_key,
+        request_payload=payload.model_dump(mode="json"),
+        result_payload={},
+    )
+
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+
+    backend = enqueue_resume_batch_job(str(job.id))
+    return ResumeBatchJobQueuedResponse(
+        job_id=job.id,
+        status=JOB_STATUS_QUEUED,
+        queue_backend=backend,
+        targets=len(payload.targets),
+    )
+
+
+@router.get("/batch-jobs/{job_id}", response_model=ResumeBatchJobStatusResponse)
+def get_batch_generation_job(
+    job_id: UUID,
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: Annotated[Session, Depends(get_session)],
+):
+    job = session.exec(
+        select(ResumeBatchJob).where(ResumeBatchJob.id == job_id).where(ResumeBatchJob.user_id == current_user.id)
+    ).first()
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+
+    records = (job.result_payload or {}).get("records") or []
+    return ResumeBatchJobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        template_key=job.template_key,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        error_message=job.error_message,
+        result_payload=job.result_payload,
+        record_ids=[record["record_id"] for record in records],
+    )
+
+
+@router.post("/generate-local", response_model=LocalGenerationResponse)
+def generate_local(
+    payload: ResumeGenerationRequest,
+    current_user: Annotated[User, Depends(get_current_user)],
+    response_format: LocalResponseFormat = "json",
+    embed_fonts: bool = False,
+):
+    # Deterministic pipeline only: no job row, no queue and no Gemini call, so the
+    # result is returned inline. generation_mode is implied by the endpoint.
+    del current_user
+
+    started = time.perf_counter()
+    runtime = get_resume_runtime()
+    resume_input = to_domain_resume_input(payload.resume_input)
+    resume_output = runtime.generator.generate_local(resume_input)
+
+    if response_format == "pdf":
+        pdf_bytes = runtime.pdf_renderer.render(
+            resume_input,
+            resume_output,
+            template_key=payload.template_key,
+            embed_fonts=embed_fonts,
+        )
+        if not pdf_bytes:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to generate PDF")
+        return Response(
+            content=pdf_bytes,
+            media_type="application/pdf",
+            headers={"Content-Disposition": 'inline; filename="resume.pdf"'},
+        )
+
+    markdown = runtime.formatter.to_markdown(resume_input, resume_output, template_key=payload.template_key)
+    return LocalGenerationResponse(
+        resume_output=from_domain_resume_output(resume_output),
+        markdown=markdown,
+        ats_result=runtime.ats_analyzer.analyze(markdown, resume_input.job_description),
+        jd_result=runtime.jd_matcher.match(markdown, resume_input.job_description),
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
 
 
 @router.get("/jobs/{job_id}", response_model=ResumeJobStatusResponse)
@@ -181,3 +346,58 @@ def get_record_pdf(
         media_type="application/pdf",
         filename=f"resume-{record.id}.pdf",
     )
+
+
+@router.get("/records/{record_id}/templates/{template_key}", response_model=RecordTemplateResponse)
+def render_record_template(
+    record_id: UUID,
+    template_key: ResumeTemplateKey,
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: Annotated[Session, Depends(get_session)],
+):
+    # Template switching re-renders stored payloads; no job, queue or Gemini call.
+    record = session.exec(
+        select(ResumeRecord).where(ResumeRecord.id == record_id).where(ResumeRecord.user_id == current_user.id)
+    ).first()
+    if not record:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Record not found")
+
+    started = time.perf_counter()
+    markdown, cached = render_record_markdown(
+        get_resume_runtime(),
+        record,
+        template_key,
+        get_api_settings().storage_dir,
+    )
+    return RecordTemplateResponse(
+        record_id=record.id,
+        template_key=template_key,
+        markdown=markdown,
+        pdf_download_url=f"/api/v1/resumes/records/{record.id}/templates/{template_key}/pdf",
+        cached=cached,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+
+
+@router.get("/records/{record_id}/templates/{template_key}/pdf")
+def get_record_template_pdf(
+    record_id: UUID,
+    template_key: ResumeTemplateKey,
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: Annotated[Session, Depends(get_session)],
+):
+    record = session.exec(
+        select(ResumeRecord).where(ResumeRecord.id == record_id).where(ResumeRecord.user_id == current_user.id)
+    ).first()
+    if not record:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Record not found")
+
+    pdf_path, _ = render_record_pdf(get_resume_runtime(), record, template_key, get_api_settings().storage_dir)
+    if pdf_path is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to generate PDF")
+
+    return FileResponse(
+        path=str(pdf_path),
+        media_type="application/pdf",
+        filename=f"resume-{record.id}-{template_key}.pdf",
+    )
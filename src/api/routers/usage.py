@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from sqlmodel import Session
+
+from src.api.db import get_session
+from src.api.models_db import User
+from src.api.schemas import UsageDailyResponse
+from src.api.security import get_current_user
+from src.api.usage import list_daily_usage
+
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+
+@router.get("/daily", response_model=list[UsageDailyResponse])
+def daily_usage(
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: Annotated[Session, Depends(get_session)],
+    days: int = 30,
+):
+    safe_days = min(max(days, 1), 366)
+    rows = list_daily_usage(session, current_user.id, days=safe_days)
+    return [UsageDailyResponse.model_validate(row) for row in rows]
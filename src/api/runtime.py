@@ -5,6 +5,12 @@ from src.config.settings import get_settings
 from src.features.ats.analyzer import ATSAnalyzer
 from src.features.job_matching.matcher import JobDescriptionMatcher
 from src.services.ai.gemini_client import GeminiClient
+from src.services.ai.hedging import HedgePolicy
+from src.services.ai.key_pool import ApiKeyPool
+from src.services.ai.model_health import ModelHealthRegistry
+from src.services.ai.model_router import ModelRouter, parse_model_routes
+from src.services.ai.rate_limiter import build_rate_limiter
+from src.services.ai.response_cache import build_response_cache
 from src.services.pdf.renderer import ResumePdfRenderer
 from src.services.resume_optimizer import ResumeOptimizer
 from src.services.resume.formatter import ResumeFormatter
@@ -29,17 +35,67 @@ def get_resume_runtime() -> ResumeRuntime:
         model=settings.gemini_model,
         timeout_seconds=settings.gemini_timeout_seconds,
         max_retries=settings.gemini_max_retries,
+        http2=settings.gemini_http2,
+        max_connections=settings.gemini_max_connections,
+        cache=build_response_cache(
+            backend=settings.gemini_cache_backend,
+            ttl_seconds=settings.gemini_cache_ttl_seconds,
+            max_entries=settings.gemini_cache_max_entries,
+            directory=settings.gemini_cache_dir,
+            redis_url=settings.gemini_cache_redis_url,
+        ),
+        health_registry=ModelHealthRegistry(
+            failure_threshold=settings.gemini_circuit_failure_threshold,
+            cooldown_seconds=settings.gemini_circuit_cooldown_seconds,
+            not_found_cooldown_seconds=settings.gemini_not_found_cooldown_seconds,
+        ),
+        key_pool=ApiKeyPool(
+            settings.gemini_api_keys,
+            requests_per_minute=settings.gemini_key_requests_per_minute,
+            default_cooldown_seconds=settings.gemini_key_cooldown_seconds,
+        ),
+        rate_limiter=build_rate_limiter(
+            requests_per_minute=settings.gemini_rate_limit_rpm,
+            tokens_per_minute=settings.gemini_rate_limit_tpm,
+            redis_url=settings.gemini_rate_limit_redis_url,
+        ),
+        rate_limit_max_wait_seconds=settings.gemini_rate_limit_max_wait_seconds,
+        hedge_policy=(
+            HedgePolicy(
+                percentile=settings.gemini_hedge_percentile,
+                max_hedge_ratio=settings.gemini_hedge_max_ratio,
+            )
+            if settings.gemini_hedging
+            else None
+        ),
+        base_url=settings.gemini_base_url,
     )
+    model_router = None
+    if settings.gemini_model_routing:
+        model_router = ModelRouter(
+            routes=parse_model_routes(settings.gemini_model_routes) or None,
+            health_registry=client.health_registry,
+            default_model=settings.gemini_model,
+        )
 
     return ResumeRuntime(
         generator=ResumeGenerator(
             gemini_client=client,
             temperature=settings.generation_temperature,
             max_output_tokens=settings.generation_max_tokens,
+            section_concurrency=settings.generation_section_concurrency,
+            deadline_seconds=settings.generation_deadline_seconds,
+            strategy=settings.generation_strategy,
+            structured_output=settings.gemini_structured_output,
+            model_router=model_router,
         ),
         formatter=ResumeFormatter(),
         pdf_renderer=ResumePdfRenderer(),
         ats_analyzer=ATSAnalyzer(),
         jd_matcher=JobDescriptionMatcher(),
-        resume_optimizer=ResumeOptimizer(gemini_client=client),
+        resume_optimizer=ResumeOptimizer(
+            gemini_client=client,
+            structured_output=settings.gemini_structured_output,
+            model_router=model_router,
+        ),
     )
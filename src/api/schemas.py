@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import Any, Dict, List, Literal
 from uuid import UUID
 
@@ -8,7 +8,10 @@ from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 
 ResumeTemplateKey = Literal["classic", "compact", "modern"]
-JobStatus = Literal["queued", "processing", "completed", "failed"]
+GenerationStrategy = Literal["sectional", "batched"]
+GenerationMode = Literal["ai", "local"]
+LocalResponseFormat = Literal["json", "pdf"]
+JobStatus = Literal["queued", "processing", "preview_ready", "completed", "failed"]
 
 
 class PersonalInfoPayload(BaseModel):
@@ -93,6 +96,34 @@ class ParseUploadResponse(BaseModel):
 class ResumeGenerationRequest(BaseModel):
     resume_input: ResumeInputPayload
     template_key: ResumeTemplateKey = "classic"
+    generation_strategy: GenerationStrategy | None = None
+    generation_mode: GenerationMode = "ai"
+    preview_first: bool = True
+    # Regenerate against a stored record: only sections whose inputs changed call Gemini.
+    previous_record_id: UUID | None = None
+    # None follows the user's deduplicate_jobs preference.
+    deduplicate: bool | None = None
+
+
+class ResumeTargetPayload(BaseModel):
+    target_role: str = ""
+    target_company: str = ""
+    job_description: str = ""
+
+
+class ResumeBatchGenerationRequest(BaseModel):
+    # The profile's own target fields are ignored; each target supplies role, company and JD.
+    resume_input: ResumeInputPayload
+    targets: List[ResumeTargetPayload] = Field(min_length=1, max_length=20)
+    template_key: ResumeTemplateKey = "classic"
+
+
+class LocalGenerationResponse(BaseModel):
+    resume_output: ResumeOutputPayload
+    markdown: str
+    ats_result: Dict[str, Any] = Field(default_factory=dict)
+    jd_result: Dict[str, Any] = Field(default_factory=dict)
+    elapsed_ms: float = 0.0
 
 
 class UserRegisterRequest(BaseModel):
@@ -110,9 +141,14 @@ class UserResponse(BaseModel):
 
     id: UUID
     email: str
+    deduplicate_jobs: bool = True
     created_at: datetime
 
 
+class UserPreferencesUpdate(BaseModel):
+    deduplicate_jobs: bool | None = None
+
+
 class AuthTokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -123,6 +159,26 @@ class ResumeJobQueuedResponse(BaseModel):
     job_id: UUID
     status: JobStatus
     queue_backend: str
+    deduplicated: bool = False
+    record_id: UUID | None = None
+
+
+class ResumeBatchJobQueuedResponse(BaseModel):
+    job_id: UUID
+    status: JobStatus
+    queue_backend: str
+    targets: int
+
+
+class ResumeBatchJobStatusResponse(BaseModel):
+    job_id: UUID
+    status: JobStatus
+    template_key: ResumeTemplateKey
+    created_at: datetime
+    updated_at: datetime
+    error_message: str = ""
+    result_payload: Dict[str, Any] = Field(default_factory=dict)
+    record_ids: List[UUID] = Field(default_factory=list)
 
 
 class ResumeJobStatusResponse(BaseModel):
@@ -150,6 +206,33 @@ class ResumeRecordResponse(BaseModel):
     created_at: datetime
 
 
+class RecordTemplateResponse(BaseModel):
+    record_id: UUID
+    template_key: ResumeTemplateKey
+    markdown: str
+    pdf_download_url: str
+    cached: bool = False
+    elapsed_ms: float = 0.0
+
+
+class UsageDailyResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    day: date
+    jobs: int
+    calls: int
+    failed_calls: int
+    cache_hits: int
+    prompt_tokens: int
+    output_tokens: int
+    total_tokens: int
+    latency_ms: int
+    attempts: int
+    fallbacks: int
+    hedges: int
+    wall_ms: int
+
+
 class ATSAnalyzeResponse(BaseModel):
     score: int
     verdict: Literal["reject", "borderline", "strong"]
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, List
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from src.api.models_db import UsageDaily, utc_now
+from src.services.ai.usage import USAGE_COUNTERS
+
+
+DAILY_COUNTERS = (*USAGE_COUNTERS, "wall_ms")
+
+
+def record_job_usage(session: Session, user_id: UUID, summary: Dict[str, Any], day: date | None = None) -> None:
+    day = day or utc_now().date()
+    counters = {name: int(summary.get(name) or 0) for name in DAILY_COUNTERS}
+    # Increments happen in the database (col = col + n), so workers finishing jobs for the
+    # same user and day never overwrite each other's totals.
+    increment = (
+        update(UsageDaily)
+        .where(UsageDaily.user_id == user_id)
+        .where(UsageDaily.day == day)
+        .values(
+            jobs=UsageDaily.jobs + 1,
+            updated_at=utc_now(),
+            **{name: getattr(UsageDaily, name) + value for name, value in counters.items()},
+        )
+    )
+    for _ in range(2):
+        if session.execute(increment).rowcount:
+            session.commit()
+            return
+        # First job of the day; if another worker inserts the row first, the retry updates it.
+        session.add(UsageDaily(user_id=user_id, day=day, jobs=1, **counters))
+        try:
+            session.commit()
+            return
+        except IntegrityError:
+            session.rollback()
+
+
+def list_daily_usage(session: Session, user_id: UUID, days: int = 30) -> List[UsageDaily]:
+    since = utc_now().date() - timedelta(days=max(1, days) - 1)
+    return list(
+        session.exec(
+            select(UsageDaily)
+            .where(UsageDaily.user_id == user_id)
+            .where(UsageDaily.day >= since)
+            .order_by(UsageDaily.day.desc())
+        ).all()
+    )
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from pathlib import Path
+import threading
+from typing import Any, Callable, Dict, List
 from uuid import UUID
 
 from sqlmodel import Session, select
@@ -14,18 +16,154 @@ from src.api.models_db import (
     ATS_JOB_STATUS_PROCESSING,
     JOB_STATUS_COMPLETED,
     JOB_STATUS_FAILED,
+    JOB_STATUS_PREVIEW_READY,
     JOB_STATUS_PROCESSING,
     ATSOptimizeJob,
+    ResumeBatchJob,
     ResumeJob,
     ResumeRecord,
     utc_now,
 )
 from src.api.runtime import get_resume_runtime
-from src.api.schemas import ResumeGenerationRequest
+from src.api.schemas import ResumeBatchGenerationRequest, ResumeGenerationRequest, ResumeInputPayload
+from src.api.usage import record_job_usage
+from src.domain.models import ResumeInput, ResumeOutput
 from src.features.ats.jd_loader import get_role, parse_jd_text
+from src.services.ai.usage import UsageTracker, track_usage
 from src.services.resume.parsing.parser import parse_resume
 
 
+JOB_ACTIVE_STATUSES = {JOB_STATUS_PROCESSING, JOB_STATUS_PREVIEW_READY}
+
+
+class _JobProgress:
+    # Sections complete on generator worker threads, so every update uses its own
+    # short-lived session instead of the one owned by the job runner.
+    def __init__(
+        self,
+        engine: Any,
+        job_id: UUID,
+        preview_output: Dict[str, Any],
+        preview_result: Dict[str, Any] | None = None,
+        render_markdown: Callable[[Dict[str, Any]], str] | None = None,
+    ):
+        self.engine = engine
+        self.job_id = job_id
+        self.resume_output = dict(preview_output)
+        self.preview_result = dict(preview_result or {})
+        self.render_markdown = render_markdown
+        self.completed_sections: List[str] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self._write(JOB_STATUS_PREVIEW_READY if self.preview_result else "")
+
+    def section_completed(self, section_name: str, lines: List[str]) -> None:
+        with self._lock:
+            self.resume_output[section_name] = list(lines)
+            if section_name not in self.completed_sections:
+                self.completed_sections.append(section_name)
+            self._write()
+
+    def _write(self, status: str = "") -> None:
+        result_payload = {
+            **self.preview_result,
+            "partial": True,
+            # Sections not listed here still show the deterministic preview.
+            "completed_sections": list(self.completed_sections),
+            "resume_output": dict(self.resume_output),
+        }
+        if self.render_markdown is not None and self.completed_sections:
+            result_payload["markdown"] = self.render_markdown(self.resume_output)
+
+        with Session(self.engine) as session:
+            job = session.get(ResumeJob, self.job_id)
+            if job is None or job.status not in JOB_ACTIVE_STATUSES:
+                return
+            if status:
+                job.status = status
+            job.result_payload = result_payload
+            job.updated_at = utc_now()
+            session.add(job)
+            session.commit()
+
+
+def _render_result(
+    runtime: Any,
+    request: ResumeGenerationRequest,
+    resume_input: ResumeInput,
+    resume_output: ResumeOutput,
+) -> Dict[str, Any]:
+    markdown = runtime.formatter.to_markdown(
+        resume_input,
+        resume_output,
+        template_key=request.template_key,
+    )
+    return {
+        "markdown": markdown,
+        "ats_result": runtime.ats_analyzer.analyze(markdown, resume_input.job_description),
+        "jd_result": runtime.jd_matcher.match(markdown, resume_input.job_description),
+    }
+
+
+def _generate_with_progress(
+    engine: Any,
+    job_id: UUID,
+    runtime: Any,
+    request: ResumeGenerationRequest,
+    resume_input: ResumeInput,
+    previous_record: ResumeRecord | None = None,
+) -> ResumeOutput:
+    # Two-phase mode: a locally built resume with scores is published straight away
+    # (status preview_ready) and the AI rewrite replaces it when done.
+    preview_output = runtime.generator.preview_output(resume_input)
+    preview_result = None
+    if request.preview_first:
+        preview_result = {"preview": True, **_render_result(runtime, request, resume_input, preview_output)}
+
+    def _render_partial_markdown(output: Dict[str, Any]) -> str:
+        return runtime.formatter.to_markdown(
+            resume_input,
+            ResumeOutput.from_dict(output),
+            template_key=request.template_key,
+        )
+
+    progress = _JobProgress(
+        engine,
+        job_id,
+        from_domain_resume_output(preview_output).model_dump(),
+        preview_result=preview_result,
+        render_markdown=_render_partial_markdown if request.preview_first else None,
+    )
+    progress.start()
+
+    previous_input = None
+    previous_output = None
+    if previous_record is not None:
+        previous_input = to_domain_resume_input(
+            ResumeInputPayload.model_validate(previous_record.input_payload)
+        )
+        previous_output = ResumeOutput.from_dict(previous_record.output_payload or {})
+        previous_output.raw_response = dict(previous_record.diagnostics or {})
+
+    return runtime.generator.generate(
+        resume_input,
+        strategy=request.generation_strategy or "",
+        on_section=progress.section_completed,
+        previous_input=previous_input,
+        previous_output=previous_output,
+    )
+
+
+def _record_daily_usage(session: Session, user_id: UUID, usage: Dict[str, Any]) -> None:
+    # Accounting must never turn a finished job into a failed one.
+    try:
+        record_job_usage(session, user_id, usage)
+    except Exception:
+        session.rollback()
+
+
 def run_resume_job(job_id: str) -> None:
     try:
         parsed_job_id = UUID(str(job_id))
@@ -47,25 +185,36 @@ def run_resume_job(job_id: str) -> None:
         session.commit()
         session.refresh(job)
 
+        # Every Gemini call made for this job, including section worker threads, lands here.
+        usage_tracker = UsageTracker()
         try:
             request = ResumeGenerationRequest.model_validate(job.request_payload)
             resume_input = to_domain_resume_input(request.resume_input)
 
-            resume_output = runtime.generator.generate(resume_input)
-            markdown = runtime.formatter.to_markdown(
-                resume_input,
-                resume_output,
-                template_key=request.template_key,
-            )
+            with track_usage(usage_tracker):
+                if request.generation_mode == "local":
+                    resume_output = runtime.generator.generate_local(resume_input)
+                else:
+                    previous_record = None
+                    if request.previous_record_id is not None:
+                        previous_record = session.exec(
+                            select(ResumeRecord)
+                            .where(ResumeRecord.id == request.previous_record_id)
+                            .where(ResumeRecord.user_id == job.user_id)
+                        ).first()
+                    resume_output = _generate_with_progress(
+                        engine, job.id, runtime, request, resume_input, previous_record=previous_record
+                    )
+            rendered = _render_result(runtime, request, resume_input, resume_output)
+            markdown = rendered["markdown"]
+            ats_result = rendered["ats_result"]
+            jd_result = rendered["jd_result"]
             pdf_bytes = runtime.pdf_renderer.render(
                 resume_input,
                 resume_output,
                 template_key=request.template_key,
             )
 
-            ats_result = runtime.ats_analyzer.analyze(markdown, resume_input.job_description)
-            jd_result = runtime.jd_matcher.match(markdown, resume_input.job_description)
-
             storage_root = Path(settings.storage_dir)
             pdf_dir = storage_root / "pdf"
             pdf_dir.mkdir(parents=True, exist_ok=True)
@@ -77,10 +226,12 @@ def run_resume_job(job_id: str) -> None:
 
             output_payload = from_domain_resume_output(resume_output)
             diagnostics = dict(resume_output.raw_response or {})
+            diagnostics["usage"] = usage_tracker.summary()
 
             record = ResumeRecord(
                 user_id=job.user_id,
                 template_key=request.template_key,
+                request_hash=job.request_hash,
                 title=resume_input.personal_info.full_name.strip() or "Resume",
                 input_payload=request.resume_input.model_dump(),
                 output_payload=output_payload.model_dump(),
@@ -109,12 +260,126 @@ def run_resume_job(job_id: str) -> None:
 
             session.add(job)
             session.commit()
+            _record_daily_usage(session, job.user_id, diagnostics["usage"])
+        except Exception as error:
+            session.rollback()
+            usage = usage_tracker.summary()
+            job.status = JOB_STATUS_FAILED
+            job.error_message = str(error)
+            job.result_payload = {**dict(job.result_payload or {}), "diagnostics": {"usage": usage}}
+            job.updated_at = utc_now()
+            session.add(job)
+            session.commit()
+            _record_daily_usage(session, job.user_id, usage)
+
+
+def run_resume_batch_job(job_id: str) -> None:
+    try:
+        parsed_job_id = UUID(str(job_id))
+    except ValueError:
+        return
+
+    engine = get_engine()
+    runtime = get_resume_runtime()
+    settings = get_api_settings()
+
+    with Session(engine) as session:
+        job = session.exec(select(ResumeBatchJob).where(ResumeBatchJob.id == parsed_job_id)).first()
+        if not job:
+            return
+
+        job.status = JOB_STATUS_PROCESSING
+        job.updated_at = utc_now()
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+
+        usage_tracker = UsageTracker()
+        try:
+            batch = ResumeBatchGenerationRequest.model_validate(job.request_payload)
+            # Each target is stored as an ordinary generation request. Its JD-aware sections match a
+            # single job; education, certifications and achievements are shared, target-neutral text.
+            requests = [
+                ResumeGenerationRequest(
+                    resume_input=batch.resume_input.model_copy(update=target.model_dump()),
+                    template_key=batch.template_key,
+                )
+                for target in batch.targets
+            ]
+            profile_input = to_domain_resume_input(batch.resume_input)
+            target_inputs = [to_domain_resume_input(request.resume_input) for request in requests]
+
+            with track_usage(usage_tracker):
+                outputs = runtime.generator.generate_for_targets(profile_input, target_inputs)
+
+            pdf_dir = Path(settings.storage_dir) / "pdf"
+            pdf_dir.mkdir(parents=True, exist_ok=True)
+            usage = usage_tracker.summary()
+            records: List[ResumeRecord] = []
+            for request, resume_input, resume_output in zip(requests, target_inputs, outputs):
+                rendered = _render_result(runtime, request, resume_input, resume_output)
+                pdf_bytes = runtime.pdf_renderer.render(resume_input, resume_output, template_key=request.template_key)
+                record = ResumeRecord(
+                    user_id=job.user_id,
+                    template_key=request.template_key,
+                    # No request hash: these sections were written alongside the other targets,
+                    # so a standalone /jobs submission must not be deduplicated onto them.
+                    title=" - ".join(
+                        part
+                        for part in (
+                            resume_input.personal_info.full_name.strip() or "Resume",
+                            resume_input.target_role.strip() or resume_input.target_company.strip(),
+                        )
+                        if part
+                    ),
+                    input_payload=request.resume_input.model_dump(),
+                    output_payload=from_domain_resume_output(resume_output).model_dump(),
+                    markdown_content=rendered["markdown"],
+                    # raw_response carries this target's own usage; the shared sections are
+                    # metered once, on the batch job's usage.
+                    diagnostics={**dict(resume_output.raw_response or {}), "batch_job_id": str(job.id)},
+                    ats_result=rendered["ats_result"],
+                    jd_result=rendered["jd_result"],
+                )
+                if pdf_bytes:
+                    pdf_file = pdf_dir / f"{record.id}.pdf"
+                    pdf_file.write_bytes(pdf_bytes)
+                    record.pdf_path = str(pdf_file)
+                session.add(record)
+                records.append(record)
+            session.commit()
+
+            job.status = JOB_STATUS_COMPLETED
+            job.result_payload = {
+                "records": [
+                    {
+                        "record_id": str(record.id),
+                        "title": record.title,
+                        "target_role": request.resume_input.target_role,
+                        "target_company": request.resume_input.target_company,
+                        "mode": str((record.diagnostics or {}).get("mode", "")),
+                        "ats_score": (record.ats_result or {}).get("score"),
+                        "match_score": (record.jd_result or {}).get("match_score"),
+                    }
+                    for request, record in zip(requests, records)
+                ],
+                "diagnostics": {"usage": usage},
+            }
+            job.error_message = ""
+            job.updated_at = utc_now()
+            session.add(job)
+            session.commit()
+            _record_daily_usage(session, job.user_id, usage)
         except Exception as error:
+            session.rollback()
+            usage = usage_tracker.summary()
             job.status = JOB_STATUS_FAILED
             job.error_message = str(error)
+            job.result_payload = {"diagnostics": {"usage": usage}}
             job.updated_at = utc_now()
             session.add(job)
             session.commit()
+            _record_daily_usage(session, job.user_id, usage)
 
 
 def run_ats_optimize_job(job_id: str) -> None:
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from functools import lru_cache
 import os
+from typing import Tuple
 
 
 def _load_env_file(path: str = ".env") -> None:
@@ -33,25 +34,74 @@ def _read_env(*names: str, default: str = "") -> str:
     return default
 
 
+def _read_bool_env(*names: str, default: bool = False) -> bool:
+    raw = _read_env(*names, default="").lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
 @dataclass(frozen=True)
 class Settings:
     app_title: str
     app_subtitle: str
     app_icon: str
     gemini_api_key: str
+    gemini_api_keys: Tuple[str, ...]
+    gemini_key_requests_per_minute: int
+    gemini_key_cooldown_seconds: int
     gemini_model: str
+    gemini_base_url: str
     gemini_timeout_seconds: int
     gemini_max_retries: int
+    gemini_http2: bool
+    gemini_max_connections: int
+    gemini_structured_output: bool
+    gemini_cache_backend: str
+    gemini_cache_ttl_seconds: int
+    gemini_cache_max_entries: int
+    gemini_cache_dir: str
+    gemini_cache_redis_url: str
+    gemini_rate_limit_rpm: int
+    gemini_rate_limit_tpm: int
+    gemini_rate_limit_max_wait_seconds: int
+    gemini_rate_limit_redis_url: str
+    gemini_hedging: bool
+    gemini_hedge_percentile: float
+    gemini_hedge_max_ratio: float
+    gemini_model_routing: bool
+    gemini_model_routes: str
+    gemini_circuit_failure_threshold: int
+    gemini_circuit_cooldown_seconds: int
+    gemini_not_found_cooldown_seconds: int
     generation_temperature: float
     generation_max_tokens: int
+    generation_section_concurrency: int
+    generation_deadline_seconds: int
+    generation_strategy: str
 
 
 @lru_cache
 def get_settings() -> Settings:
     timeout_raw = _read_env("GEMINI_TIMEOUT_SECONDS", default="60")
     retries_raw = _read_env("GEMINI_MAX_RETRIES", default="2")
+    max_connections_raw = _read_env("GEMINI_MAX_CONNECTIONS", default="32")
+    cache_ttl_raw = _read_env("GEMINI_CACHE_TTL_SECONDS", default="3600")
+    cache_entries_raw = _read_env("GEMINI_CACHE_MAX_ENTRIES", default="512")
+    circuit_threshold_raw = _read_env("GEMINI_CIRCUIT_FAILURE_THRESHOLD", default="3")
+    circuit_cooldown_raw = _read_env("GEMINI_CIRCUIT_COOLDOWN_SECONDS", default="60")
+    not_found_cooldown_raw = _read_env("GEMINI_NOT_FOUND_COOLDOWN_SECONDS", default="1800")
     temperature_raw = _read_env("GENERATION_TEMPERATURE", default="0.35")
     tokens_raw = _read_env("GENERATION_MAX_TOKENS", default="1400")
+    section_concurrency_raw = _read_env("GENERATION_SECTION_CONCURRENCY", default="4")
+    deadline_raw = _read_env("GENERATION_DEADLINE_SECONDS", default="600")
+    key_rpm_raw = _read_env("GEMINI_KEY_REQUESTS_PER_MINUTE", default="0")
+    key_cooldown_raw = _read_env("GEMINI_KEY_COOLDOWN_SECONDS", default="2")
+    rate_rpm_raw = _read_env("GEMINI_RATE_LIMIT_RPM", default="0")
+    rate_tpm_raw = _read_env("GEMINI_RATE_LIMIT_TPM", default="0")
+    rate_wait_raw = _read_env("GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS", default="30")
+    hedge_percentile_raw = _read_env("GEMINI_HEDGE_PERCENTILE", default="95")
+    hedge_ratio_raw = _read_env("GEMINI_HEDGE_MAX_RATIO", default="0.1")
 
     try:
         timeout = int(timeout_raw)
@@ -63,6 +113,36 @@ def get_settings() -> Settings:
     except ValueError:
         retries = 2
 
+    try:
+        max_connections = int(max_connections_raw)
+    except ValueError:
+        max_connections = 32
+
+    try:
+        cache_ttl = int(cache_ttl_raw)
+    except ValueError:
+        cache_ttl = 3600
+
+    try:
+        cache_entries = int(cache_entries_raw)
+    except ValueError:
+        cache_entries = 512
+
+    try:
+        circuit_threshold = int(circuit_threshold_raw)
+    except ValueError:
+        circuit_threshold = 3
+
+    try:
+        circuit_cooldown = int(circuit_cooldown_raw)
+    except ValueError:
+        circuit_cooldown = 60
+
+    try:
+        not_found_cooldown = int(not_found_cooldown_raw)
+    except ValueError:
+        not_found_cooldown = 1800
+
     try:
         temperature = float(temperature_raw)
     except ValueError:
@@ -73,6 +153,58 @@ def get_settings() -> Settings:
     except ValueError:
         max_tokens = 1400
 
+    try:
+        section_concurrency = int(section_concurrency_raw)
+    except ValueError:
+        section_concurrency = 4
+
+    try:
+        deadline_seconds = int(deadline_raw)
+    except ValueError:
+        deadline_seconds = 600
+
+    try:
+        key_rpm = int(key_rpm_raw)
+    except ValueError:
+        key_rpm = 0
+
+    try:
+        key_cooldown = int(key_cooldown_raw)
+    except ValueError:
+        key_cooldown = 2
+
+    try:
+        rate_rpm = int(rate_rpm_raw)
+    except ValueError:
+        rate_rpm = 0
+
+    try:
+        rate_tpm = int(rate_tpm_raw)
+    except ValueError:
+        rate_tpm = 0
+
+    try:
+        rate_wait = int(rate_wait_raw)
+    except ValueError:
+        rate_wait = 30
+
+    try:
+        hedge_percentile = float(hedge_percentile_raw)
+    except ValueError:
+        hedge_percentile = 95.0
+
+    try:
+        hedge_ratio = float(hedge_ratio_raw)
+    except ValueError:
+        hedge_ratio = 0.1
+
+    api_key = _read_env("GEMINI_API_KEY", "gemini_api_key", default="")
+    api_keys = [api_key] if api_key else []
+    for extra_key in _read_env("GEMINI_API_KEYS", default="").split(","):
+        extra_key = extra_key.strip()
+        if extra_key and extra_key not in api_keys:
+            api_keys.append(extra_key)
+
     return Settings(
         app_title=_read_env("APP_TITLE", default="AI Resume Builder"),
         app_subtitle=_read_env(
@@ -80,10 +212,37 @@ def get_settings() -> Settings:
             default="Build ATS-friendly resumes with Gemini AI and export to PDF.",
         ),
         app_icon=_read_env("APP_ICON", default=":memo:"),
-        gemini_api_key=_read_env("GEMINI_API_KEY", "gemini_api_key", default=""),
+        gemini_api_key=api_key or (api_keys[0] if api_keys else ""),
+        gemini_api_keys=tuple(api_keys),
+        gemini_key_requests_per_minute=max(0, key_rpm),
+        gemini_key_cooldown_seconds=max(0, key_cooldown),
         gemini_model=_read_env("GEMINI_MODEL", "gemini_model", default=""),
+        gemini_base_url=_read_env("GEMINI_BASE_URL", default=""),
         gemini_timeout_seconds=timeout,
         gemini_max_retries=max(0, retries),
+        gemini_http2=_read_bool_env("GEMINI_HTTP2", default=False),
+        gemini_max_connections=max(1, max_connections),
+        gemini_structured_output=_read_bool_env("GEMINI_STRUCTURED_OUTPUT", default=True),
+        gemini_cache_backend=_read_env("GEMINI_CACHE_BACKEND", default="memory").lower(),
+        gemini_cache_ttl_seconds=max(1, cache_ttl),
+        gemini_cache_max_entries=max(1, cache_entries),
+        gemini_cache_dir=_read_env("GEMINI_CACHE_DIR", default="./data/cache/gemini"),
+        gemini_cache_redis_url=_read_env("GEMINI_CACHE_REDIS_URL", "REDIS_URL", default=""),
+        gemini_rate_limit_rpm=max(0, rate_rpm),
+        gemini_rate_limit_tpm=max(0, rate_tpm),
+        gemini_rate_limit_max_wait_seconds=max(0, rate_wait),
+        gemini_rate_limit_redis_url=_read_env("GEMINI_RATE_LIMIT_REDIS_URL", "REDIS_URL", default=""),
+        gemini_hedging=_read_bool_env("GEMINI_HEDGING", default=False),
+        gemini_hedge_percentile=min(99.9, max(1.0, hedge_percentile)),
+        gemini_hedge_max_ratio=min(1.0, max(0.0, hedge_ratio)),
+        gemini_model_routing=_read_bool_env("GEMINI_MODEL_ROUTING", default=False),
+        gemini_model_routes=_read_env("GEMINI_MODEL_ROUTES", default=""),
+        gemini_circuit_failure_threshold=max(1, circuit_threshold),
+        gemini_circuit_cooldown_seconds=max(0, circuit_cooldown),
+        gemini_not_found_cooldown_seconds=max(0, not_found_cooldown),
         generation_temperature=temperature,
         generation_max_tokens=max_tokens,
+        generation_section_concurrency=max(1, section_concurrency),
+        generation_deadline_seconds=max(0, deadline_seconds),
+        generation_strategy=_read_env("GENERATION_STRATEGY", default="sectional").lower(),
     )
@@ -1,14 +1,14 @@
 from __future__ import annotations
 
-import json
-
 from src.domain.ats_models import OptimizedResume, ResumeData, RoleSpec
+from src.prompts.prompt_encoding import compact_json
 
 
 def build_ats_optimizer_prompt(
     resume_data: ResumeData,
     role_spec: RoleSpec,
     keyword_gaps: list[str],
+    structured_output: bool = False,
 ) -> tuple[str, str]:
     system_prompt = (
         "You are an ATS resume optimizer. "
@@ -35,16 +35,20 @@ def build_ats_optimizer_prompt(
     }
 
     output_schema = OptimizedResume().to_dict()
+    schema_text = (
+        "Follow the response schema enforced by the API.\n\n"
+        if structured_output
+        else f"Schema:\n{compact_json(output_schema, prune=False)}\n\n"
+    )
 
     user_prompt = (
         "Rules you MUST follow:\n"
         "1. Only use information present in the original resume. Do not add any experience, skills, project, education, or achievement that is not in the original.\n"
         "2. Rewrite each section to be more ATS-parseable and keyword-aligned to the role.\n"
         "3. Use exact keywords from the gaps list where they are genuinely present in the context.\n"
-        "4. Return structured JSON only. Schema:\n"
-        f"{json.dumps(output_schema, indent=2)}\n\n"
+        f"4. Return structured JSON only. {schema_text}"
         "Input context:\n"
-        f"{json.dumps(source_payload, indent=2)}"
+        f"{compact_json(source_payload)}"
     )
 
     return system_prompt, user_prompt
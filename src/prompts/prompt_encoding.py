@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterable, List, Sequence
+
+
+JD_MAX_CHARS = 1200
+JD_MAX_SENTENCES = 10
+
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?;])\s+|\n+")
+TERM_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9+#./-]*")
+TECH_TERM_PATTERN = re.compile(r"[A-Z]{2,}|[a-z]+[A-Z]|\d|[+#./]")
+
+JD_STOPWORDS = {
+    "about",
+    "ability",
+    "also",
+    "and",
+    "are",
+    "candidate",
+    "company",
+    "for",
+    "from",
+    "have",
+    "including",
+    "into",
+    "join",
+    "looking",
+    "must",
+    "our",
+    "role",
+    "team",
+    "that",
+    "the",
+    "their",
+    "this",
+    "well",
+    "what",
+    "will",
+    "with",
+    "work",
+    "you",
+    "your",
+}
+
+
+def prune_empty(value: Any) -> Any:
+    if isinstance(value, dict):
+        pruned = {key: prune_empty(item) for key, item in value.items()}
+        return {key: item for key, item in pruned.items() if item not in ("", None, [], {})}
+    if isinstance(value, (list, tuple)):
+        items: List[Any] = []
+        seen = set()
+        for item in value:
+            item = prune_empty(item)
+            if item in ("", None, [], {}):
+                continue
+            key = json.dumps(item, sort_keys=True, ensure_ascii=False) if not isinstance(item, str) else item.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            items.append(item)
+        return items
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def compact_json(value: Any, prune: bool = True) -> str:
+    return json.dumps(prune_empty(value) if prune else value, ensure_ascii=False, separators=(",", ":"))
+
+
+def compress_job_description(
+    text: str,
+    keywords: Sequence[str] = (),
+    max_chars: int = JD_MAX_CHARS,
+    max_sentences: int = JD_MAX_SENTENCES,
+) -> str:
+    normalized = " ".join((text or "").split())
+    if len(normalized) <= max_chars:
+        return normalized
+
+    sentences: List[str] = []
+    seen = set()
+    for sentence in SENTENCE_SPLIT_PATTERN.split(text or ""):
+        sentence = " ".join(sentence.split())
+        if sentence and sentence.lower() not in seen:
+            seen.add(sentence.lower())
+            sentences.append(sentence)
+
+    strong_terms, repeated_terms = _signal_terms(sentences, keywords)
+
+    scored = []
+    for index, sentence in enumerate(sentences):
+        terms = {_clean_term(term).lower() for term in TERM_PATTERN.findall(sentence)}
+        score = 2 * len(terms & strong_terms) + len(terms & repeated_terms)
+        score += 2 * sum(1 for keyword in keywords if keyword and keyword.lower() in sentence.lower())
+        if score:
+            scored.append((score, index, sentence))
+
+    # Keep the most keyword-dense sentences, then restore their original order.
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    selected: List[tuple] = []
+    used_chars = 0
+    for score, index, sentence in scored:
+        if len(selected) >= max_sentences or used_chars + len(sentence) > max_chars:
+            continue
+        selected.append((index, sentence))
+        used_chars += len(sentence) + 1
+
+    if not selected:
+        return normalized[:max_chars]
+    return " ".join(sentence for _, sentence in sorted(selected))
+
+
+def _signal_terms(sentences: Iterable[str], keywords: Sequence[str]) -> tuple:
+    counts: dict = {}
+    tech_terms = set()
+    for sentence in sentences:
+        sentence_terms = set()
+        for position, match in enumerate(TERM_PATTERN.finditer(sentence)):
+            term = _clean_term(match.group(0))
+            lowered = term.lower()
+            if len(lowered) < 3 or lowered in JD_STOPWORDS:
+                continue
+            sentence_terms.add(lowered)
+            # Tool and product names are usually capitalised mid-sentence or carry digits/symbols.
+            if TECH_TERM_PATTERN.search(term) or (position > 0 and term[:1].isupper()):
+                tech_terms.add(lowered)
+        for lowered in sentence_terms:
+            counts[lowered] = counts.get(lowered, 0) + 1
+
+    repeated = {term for term, count in counts.items() if count >= 2}
+    keyword_terms = {
+        _clean_term(term).lower()
+        for keyword in keywords
+        for term in TERM_PATTERN.findall(keyword or "")
+        if len(term) >= 3
+    }
+    return tech_terms | keyword_terms, repeated
+
+
+def _clean_term(term: str) -> str:
+    return term.rstrip("./-")
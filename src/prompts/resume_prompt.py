@@ -1,7 +1,7 @@
-import json
 from typing import Any, Dict
 
 from src.domain.models import ResumeInput
+from src.prompts.prompt_encoding import compact_json, compress_job_description
 
 
 RESPONSE_SCHEMA = {
@@ -72,6 +72,14 @@ SECTION_OUTPUT_SCHEMAS = {
 }
 
 
+BATCHED_OUTPUT_SCHEMA = {
+    section_name: schema["items"] for section_name, schema in SECTION_OUTPUT_SCHEMAS.items()
+}
+
+# Only these sections are rewritten towards the job description; the others get no JD context.
+JD_AWARE_SECTIONS = {"professional_summary", "skills", "experience", "projects"}
+
+
 def _target_context_from_payload(payload: Dict[str, Any]) -> Dict[str, str]:
     targeting = payload.get("targeting", {})
     role = str(targeting.get("target_role", "")).strip()
@@ -95,12 +103,27 @@ def _target_line(role: str, company: str) -> str:
     return "General software role"
 
 
+def _schema_rule(schema: Dict[str, Any], structured_output: bool, label: str = "Use this exact schema:") -> str:
+    # With structured output the API enforces the schema, so it is not repeated in the prompt.
+    if structured_output:
+        return "Follow the response schema enforced by the API exactly.\n"
+    return f"{label}\n{compact_json(schema, prune=False)}\n"
+
+
 def build_ats_cleaning_prompt(
     resume_input: ResumeInput,
     local_clean_payload: Dict[str, Any],
+    structured_output: bool = False,
 ) -> tuple[str, str]:
     raw_payload = resume_input.to_prompt_payload()
     context = _target_context_from_payload(raw_payload)
+    job_description = compress_job_description(
+        context["job_description"],
+        local_clean_payload.get("job_description_keywords", []),
+    )
+    # The job description is sent once, compressed, in the context block below.
+    raw_payload = {key: value for key, value in raw_payload.items() if key != "job_description"}
+    local_clean_payload = {key: value for key, value in local_clean_payload.items() if key != "job_description"}
 
     system_prompt = (
         "You are an ATS resume data normalization engine. "
@@ -113,8 +136,7 @@ def build_ats_cleaning_prompt(
         "Normalize and clean the resume input into ATS-ready structured JSON.\n\n"
         "Return rules:\n"
         "1) Return valid JSON only. No markdown, no prose.\n"
-        "2) Use this exact schema:\n"
-        f"{json.dumps(CLEANING_OUTPUT_SCHEMA, indent=2)}\n"
+        f"2) {_schema_rule(CLEANING_OUTPUT_SCHEMA, structured_output)}"
         "3) Remove section labels, repeated lines, placeholders, and noise lines before structuring.\n"
         "4) Fix obvious spelling/formatting mistakes conservatively; do not alter factual meaning.\n"
         "5) If experience/project content is massive, summarize aggressively and keep only high-impact facts.\n"
@@ -130,32 +152,17 @@ def build_ats_cleaning_prompt(
         f"Target context: {_target_line(context['role'], context['company'])}\n"
         f"Requested tone: {context['tone']}\n"
         "Job description context (may be empty):\n"
-        f"{context['job_description'] or 'N/A'}\n\n"
+        f"{job_description or 'N/A'}\n\n"
         "Raw user payload JSON:\n"
-        f"{json.dumps(raw_payload, indent=2)}\n\n"
+        f"{compact_json(raw_payload)}\n\n"
         "Local pre-cleaned fallback JSON:\n"
-        f"{json.dumps(local_clean_payload, indent=2)}"
+        f"{compact_json(local_clean_payload)}"
     )
 
     return system_prompt, user_prompt
 
 
-def build_section_generation_prompt(
-    section_name: str,
-    cleaned_payload: Dict[str, Any],
-) -> tuple[str, str]:
-    section_schema = SECTION_OUTPUT_SCHEMAS.get(section_name)
-    if section_schema is None:
-        raise ValueError(f"Unsupported section name: {section_name}")
-
-    base_context = {
-        "target_role": cleaned_payload.get("target_role", ""),
-        "target_company": cleaned_payload.get("target_company", ""),
-        "tone": cleaned_payload.get("tone", "professional"),
-        "job_description": cleaned_payload.get("job_description", ""),
-        "job_description_keywords": cleaned_payload.get("job_description_keywords", []),
-    }
-
+def _section_source_and_rules(section_name: str, cleaned_payload: Dict[str, Any]) -> tuple[Dict[str, Any], str]:
     if section_name == "professional_summary":
         section_source = {
             "professional_summary_seed": cleaned_payload.get("professional_summary_seed", ""),
@@ -216,6 +223,49 @@ def build_section_generation_prompt(
             "Return concise achievement bullets with outcomes or recognition context when available."
         )
 
+    return section_source, section_rules
+
+
+def section_source_payload(section_name: str, cleaned_payload: Dict[str, Any]) -> Dict[str, Any]:
+    section_source, _ = _section_source_and_rules(section_name, cleaned_payload)
+    return section_source
+
+
+def section_prompt_inputs(section_name: str, cleaned_payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Everything a section prompt is built from; equal inputs produce an identical prompt.
+    return {
+        "context": _targeting_context(cleaned_payload, section_name),
+        "source": section_source_payload(section_name, cleaned_payload),
+    }
+
+
+def _targeting_context(cleaned_payload: Dict[str, Any], section_name: str = "") -> Dict[str, Any]:
+    context = {
+        "target_role": cleaned_payload.get("target_role", ""),
+        "target_company": cleaned_payload.get("target_company", ""),
+        "tone": cleaned_payload.get("tone", "professional"),
+    }
+    if section_name and section_name not in JD_AWARE_SECTIONS:
+        return context
+
+    keywords = cleaned_payload.get("job_description_keywords", [])
+    context["job_description"] = compress_job_description(cleaned_payload.get("job_description", ""), keywords)
+    context["job_description_keywords"] = keywords
+    return context
+
+
+def build_section_generation_prompt(
+    section_name: str,
+    cleaned_payload: Dict[str, Any],
+    structured_output: bool = False,
+) -> tuple[str, str]:
+    section_schema = SECTION_OUTPUT_SCHEMAS.get(section_name)
+    if section_schema is None:
+        raise ValueError(f"Unsupported section name: {section_name}")
+
+    base_context = _targeting_context(cleaned_payload, section_name)
+    section_source, section_rules = _section_source_and_rules(section_name, cleaned_payload)
+
     system_prompt = (
         "You are an ATS-focused resume writer specialized in one section at a time. "
         "Be factual, concise, and keyword-aware. "
@@ -226,8 +276,7 @@ def build_section_generation_prompt(
         f"Generate only the '{section_name}' section.\n\n"
         "Output rules:\n"
         "1) Return valid JSON only.\n"
-        "2) Use this exact schema:\n"
-        f"{json.dumps(section_schema, indent=2)}\n"
+        f"2) {_schema_rule(section_schema, structured_output)}"
         "3) Keep wording concise and ATS-friendly.\n"
         "4) Start bullets with strong action verbs where possible.\n"
         "5) Preserve user facts; do not fabricate details.\n"
@@ -235,9 +284,52 @@ def build_section_generation_prompt(
         "7) Never output duplicate or near-duplicate bullet lines.\n"
         f"8) {section_rules}\n\n"
         "Targeting and JD context:\n"
-        f"{json.dumps(base_context, indent=2)}\n\n"
+        f"{compact_json(base_context)}\n\n"
         "Section source data:\n"
-        f"{json.dumps(section_source, indent=2)}"
+        f"{compact_json(section_source)}"
+    )
+
+    return system_prompt, user_prompt
+
+
+def build_batched_generation_prompt(
+    cleaned_payload: Dict[str, Any],
+    structured_output: bool = False,
+) -> tuple[str, str]:
+    base_context = _targeting_context(cleaned_payload)
+
+    section_rules = []
+    section_sources: Dict[str, Any] = {}
+    for section_name in BATCHED_OUTPUT_SCHEMA:
+        section_source, rules = _section_source_and_rules(section_name, cleaned_payload)
+        section_rules.append(f"- {section_name}: {rules}")
+        for key, value in section_source.items():
+            section_sources.setdefault(key, value)
+
+    system_prompt = (
+        "You are an ATS-focused resume writer. "
+        "Rewrite every resume section in one response. "
+        "Be factual, concise, and keyword-aware. "
+        "Do not invent facts or placeholders."
+    )
+
+    user_prompt = (
+        "Generate all resume sections.\n\n"
+        "Output rules:\n"
+        "1) Return valid JSON only.\n"
+        f"2) {_schema_rule(BATCHED_OUTPUT_SCHEMA, structured_output, 'Use this exact schema, with one key per section:')}"
+        "3) Keep wording concise and ATS-friendly.\n"
+        "4) Start bullets with strong action verbs where possible.\n"
+        "5) Preserve user facts; do not fabricate details.\n"
+        "6) Never output placeholders like Organization, Company, Core Technologies, TBD, or N/A.\n"
+        "7) Never output duplicate or near-duplicate bullet lines.\n"
+        "8) Section-specific rules:\n"
+        + "\n".join(section_rules)
+        + "\n\n"
+        "Targeting and JD context:\n"
+        f"{compact_json(base_context)}\n\n"
+        "Source data:\n"
+        f"{compact_json(section_sources)}"
     )
 
     return system_prompt, user_prompt
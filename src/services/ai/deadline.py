@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import time
+
+
+class DeadlineExceededError(RuntimeError):
+    pass
+
+
+class Deadline:
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + max(0.0, seconds))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def clamp(self, timeout_seconds: float) -> float:
+        return min(float(timeout_seconds), self.remaining())
+
+    def check(self, context: str = "") -> None:
+        if self.expired():
+            suffix = f" ({context})" if context else ""
+            raise DeadlineExceededError(f"Generation deadline exceeded{suffix}.")
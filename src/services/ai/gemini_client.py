@@ -1,8 +1,38 @@
-from typing import Any, Dict, List
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Tuple
+import asyncio
+import contextvars
+import importlib
+import importlib.util
+import threading
 import time
 
 import requests
 
+from src.services.ai.deadline import Deadline, DeadlineExceededError
+from src.services.ai.hedging import HedgePolicy
+from src.services.ai.key_pool import ApiKeyPool
+from src.services.ai.model_health import ModelHealthRegistry
+from src.services.ai.rate_limiter import RateLimiter
+from src.services.ai.response_cache import CACHE_STATUS_MISS, ResponseCache
+from src.services.ai.usage import current_usage_tracker, extract_usage
+from src.utils.token_estimator import estimate_tokens
+
+try:
+    httpx = importlib.import_module("httpx")
+except Exception:  # pragma: no cover
+    httpx = None
+
+
+_CALL_DETAILS: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+    "gemini_call_details",
+    default={"status": "not_started"},
+)
+
+
+class GeminiUnavailableError(RuntimeError):
+    pass
+
 
 class GeminiClient:
     DEFAULT_MODELS = [
@@ -21,7 +51,10 @@ class GeminiClient:
         "https://generativelanguage.googleapis.com/v1/models/{model}:generateContent",
     ]
 
+    DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+
     RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+    MAX_KEY_WAIT_SECONDS = 10.0
 
     def __init__(
         self,
@@ -29,14 +62,47 @@ class GeminiClient:
         model: str = "",
         timeout_seconds: int = 60,
         max_retries: int = 2,
+        http2: bool = False,
+        max_connections: int = 32,
+        cache: ResponseCache | None = None,
+        health_registry: ModelHealthRegistry | None = None,
+        key_pool: ApiKeyPool | None = None,
+        rate_limiter: RateLimiter | None = None,
+        rate_limit_max_wait_seconds: float = 30.0,
+        hedge_policy: HedgePolicy | None = None,
+        base_url: str = "",
     ):
         self.api_key = (api_key or "").strip()
+        self.key_pool = key_pool if key_pool is not None else ApiKeyPool([self.api_key])
         self.model = (model or "").strip()
         self.timeout_seconds = timeout_seconds
         self.max_retries = max(0, max_retries)
         self.session = requests.Session()
-        self._last_request_attempts = 0
-        self._last_call_details: Dict[str, Any] = {"status": "not_started"}
+        self.http2 = http2
+        self.max_connections = max(1, max_connections)
+        self.cache = cache
+        self.health_registry = health_registry or ModelHealthRegistry()
+        self.rate_limiter = rate_limiter
+        self.rate_limit_max_wait_seconds = max(0.0, rate_limit_max_wait_seconds)
+        self.hedge_policy = hedge_policy
+        self.base_url = (base_url or "").strip().rstrip("/")
+        self.api_templates = self._api_templates(self.base_url)
+        self._hedge_executor: ThreadPoolExecutor | None = None
+        self._hedge_executor_lock = threading.Lock()
+        self._async_session = None
+        self._async_session_loop = None
+        self._async_session_closer = None
+        self._schema_unsupported_targets: set[Tuple[str, str]] = set()
+
+    @property
+    def _last_call_details(self) -> Dict[str, Any]:
+        # Call details are context-local: each thread (or asyncio task) sees its own
+        # last call, so one client can serve many concurrent jobs and sections.
+        return _CALL_DETAILS.get()
+
+    @_last_call_details.setter
+    def _last_call_details(self, details: Dict[str, Any]) -> None:
+        _CALL_DETAILS.set(details)
 
     def get_last_call_details(self) -> Dict[str, Any]:
         details = dict(self._last_call_details)
@@ -44,15 +110,34 @@ class GeminiClient:
             details["errors"] = list(details["errors"])
         return details
 
-    def _candidate_models(self) -> List[str]:
+    def _api_templates(self, base_url: str) -> List[str]:
+        # A custom base URL (e.g. the local stand-in server) keeps the same route layout.
+        if not base_url or base_url == self.DEFAULT_BASE_URL:
+            return list(self.API_TEMPLATES)
+        return [template.replace(self.DEFAULT_BASE_URL, base_url, 1) for template in self.API_TEMPLATES]
+
+    def _candidate_models(self, model: str = "") -> List[str]:
         models: List[str] = []
-        if self.model:
-            models.append(self.model)
-        for model in self.DEFAULT_MODELS:
-            if model not in models:
-                models.append(model)
+        for candidate in [model, self.model, *self.DEFAULT_MODELS]:
+            if candidate and candidate not in models:
+                models.append(candidate)
         return models
 
+    def _ordered_targets(self, model: str = "") -> List[Tuple[str, str]]:
+        targets = [
+            (candidate, template)
+            for candidate in self._candidate_models(model)
+            for template in self.api_templates
+        ]
+        ordered = self.health_registry.order(targets)
+        if model:
+            # A routed model goes first even when another model has a better track record.
+            ordered.sort(key=lambda target: target[0] != model)
+        return ordered
+
+    def is_available(self) -> bool:
+        return bool(self._ordered_targets())
+
     @staticmethod
     def _extract_text(body: Dict[str, Any]) -> str:
         candidates = body.get("candidates", [])
@@ -62,7 +147,7 @@ class GeminiClient:
         return "".join(part.get("text", "") for part in parts).strip()
 
     @staticmethod
-    def _extract_error_message(response: requests.Response) -> str:
+    def _extract_error_message(response: Any) -> str:
         try:
             payload = response.json()
             return payload.get("error", {}).get("message", response.text)
@@ -76,16 +161,469 @@ class GeminiClient:
         temperature: float,
         max_output_tokens: int,
         response_mime_type: str = "",
+        deadline: Deadline | None = None,
+        response_schema: Dict[str, Any] | None = None,
+        model: str = "",
     ) -> str:
-        if not self.api_key:
-            self._last_call_details = {
-                "status": "error",
-                "provider": "gemini",
-                "error": "GEMINI_API_KEY is missing",
-                "errors": ["missing_api_key"],
-            }
-            raise RuntimeError("GEMINI_API_KEY is missing. Add it to your .env file.")
+        self._ensure_api_key()
+        payload = self._build_payload(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            response_mime_type=response_mime_type,
+            response_schema=response_schema,
+        )
+
+        if self.cache is None:
+            return self._generate_uncached(payload, response_mime_type, deadline, model)
+
+        cache_key = self._cache_key(
+            system_prompt, user_prompt, temperature, max_output_tokens, response_mime_type, response_schema, model
+        )
+
+        def _produce() -> Dict[str, Any]:
+            text = self._generate_uncached(payload, response_mime_type, deadline, model)
+            return {"text": text, "details": self.get_last_call_details()}
+
+        try:
+            entry, cache_status = self.cache.get_or_compute(
+                cache_key,
+                _produce,
+                timeout_seconds=deadline.remaining() if deadline is not None else None,
+            )
+        except TimeoutError as error:
+            raise self._deadline_exceeded_error([], context="waiting_for_coalesced_call") from error
+        self._last_call_details = {**dict(entry.get("details") or {}), "cache": cache_status}
+        if cache_status != CACHE_STATUS_MISS:
+            self._record_cache_hit()
+        return str(entry.get("text", ""))
+
+    def _generate_uncached(
+        self,
+        payload: Dict[str, Any],
+        response_mime_type: str,
+        deadline: Deadline | None = None,
+        preferred_model: str = "",
+    ) -> str:
+        errors: List[str] = []
+        targets = self._targets_or_raise(preferred_model)
+        if self.hedge_policy is not None:
+            return self._generate_hedged(payload, response_mime_type, deadline, targets, errors)
 
+        for index, (model, template) in enumerate(targets):
+            if deadline is not None and deadline.expired():
+                raise self._deadline_exceeded_error(errors)
+
+            text = self._call_target(
+                payload, model, template, response_mime_type, deadline, errors, fallback=index > 0
+            )
+            if text:
+                return text
+
+        return self._raise_no_compatible_model(errors)
+
+    def _call_target(
+        self,
+        payload: Dict[str, Any],
+        model: str,
+        template: str,
+        response_mime_type: str,
+        deadline: Deadline | None,
+        errors: List[str],
+        fallback: bool = False,
+        hedge: bool = False,
+    ) -> str:
+        url = template.format(model=model)
+        started = time.monotonic()
+        target_payload = self._payload_for_target(payload, model, template)
+        response, attempts = self._post_with_retry(url=url, payload=target_payload, deadline=deadline)
+        if self._rejected_response_schema(response, target_payload, model, template):
+            response, retry_attempts = self._post_with_retry(
+                url=url,
+                payload=self._payload_for_target(payload, model, template),
+                deadline=deadline,
+            )
+            attempts += retry_attempts
+
+        text = self._read_response(model, template, response, attempts, errors, response_mime_type)
+        self._record_health(model, template, response, time.monotonic() - started, deadline)
+        self._record_usage(model, bool(text), time.monotonic() - started, attempts, fallback, hedge)
+        return text
+
+    def _generate_hedged(
+        self,
+        payload: Dict[str, Any],
+        response_mime_type: str,
+        deadline: Deadline | None,
+        targets: List[Tuple[str, str]],
+        errors: List[str],
+    ) -> str:
+        hedges = 0
+        hedge_wins = 0
+        position = 0
+        while position < len(targets):
+            if deadline is not None and deadline.expired():
+                raise self._deadline_exceeded_error(errors)
+
+            model, template = targets[position]
+            position += 1
+            self.hedge_policy.record_call()
+            primary = self._submit_target(
+                payload, model, template, response_mime_type, deadline, fallback=position > 1
+            )
+            pending: Dict[Future, bool] = {primary: False}
+
+            # A call still running past the usual latency for its model gets a duplicate on
+            # the next candidate (or the same one when it is the last).
+            delay = self.hedge_policy.hedge_delay(model)
+            if delay is not None:
+                wait([primary], timeout=delay)
+                if not primary.done() and self.hedge_policy.try_start_hedge():
+                    (hedge_model, hedge_template), position = self._hedge_target(targets, position)
+                    hedge = self._submit_target(
+                        payload, hedge_model, hedge_template, response_mime_type, deadline, hedge=True
+                    )
+                    pending[hedge] = True
+                    hedges += 1
+
+            try:
+                while pending:
+                    timeout = deadline.remaining() if deadline is not None else None
+                    done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                    if not done:
+                        raise self._deadline_exceeded_error(errors)
+
+                    for future in done:
+                        is_hedge = pending.pop(future)
+                        text, details, target_errors = future.result()
+                        errors.extend(error for error in target_errors if error not in errors)
+                        self._last_call_details = details
+                        if not text:
+                            continue
+
+                        if is_hedge:
+                            hedge_wins += 1
+                            self.hedge_policy.record_hedge_win()
+                        self._last_call_details = {**details, "hedges": hedges, "hedge_wins": hedge_wins}
+                        return text
+            finally:
+                # The loser's response is discarded; a request already on the wire cannot be
+                # interrupted from a thread, only one that has not started yet.
+                for loser in pending:
+                    loser.cancel()
+
+        return self._raise_no_compatible_model(errors)
+
+    @staticmethod
+    def _hedge_target(targets: List[Tuple[str, str]], position: int) -> Tuple[Tuple[str, str], int]:
+        # The duplicate goes to the next candidate, or repeats the last one when none is left.
+        if position < len(targets):
+            return targets[position], position + 1
+        return targets[position - 1], position
+
+    def _submit_target(
+        self,
+        payload: Dict[str, Any],
+        model: str,
+        template: str,
+        response_mime_type: str,
+        deadline: Deadline | None,
+        fallback: bool = False,
+        hedge: bool = False,
+    ) -> Future:
+        def _run() -> Tuple[str, Dict[str, Any], List[str]]:
+            target_errors: List[str] = []
+            text = self._call_target(
+                payload, model, template, response_mime_type, deadline, target_errors, fallback=fallback, hedge=hedge
+            )
+            return text, self.get_last_call_details(), target_errors
+
+        # Each attempt runs in its own context so racing calls do not overwrite each other's details.
+        context = contextvars.copy_context()
+        return self._get_hedge_executor().submit(context.run, _run)
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._hedge_executor_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=self.max_connections,
+                    thread_name_prefix="gemini-hedge",
+                )
+            return self._hedge_executor
+
+    async def agenerate_text(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_output_tokens: int,
+        response_mime_type: str = "",
+        deadline: Deadline | None = None,
+        response_schema: Dict[str, Any] | None = None,
+        model: str = "",
+    ) -> str:
+        if httpx is None:
+            raise RuntimeError("httpx is required for async Gemini calls. Install it with `pip install httpx`.")
+
+        self._ensure_api_key()
+        payload = self._build_payload(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            response_mime_type=response_mime_type,
+            response_schema=response_schema,
+        )
+
+        if self.cache is None:
+            return await self._agenerate_uncached(payload, response_mime_type, deadline, model)
+
+        cache_key = self._cache_key(
+            system_prompt, user_prompt, temperature, max_output_tokens, response_mime_type, response_schema, model
+        )
+
+        async def _produce() -> Dict[str, Any]:
+            text = await self._agenerate_uncached(payload, response_mime_type, deadline, model)
+            return {"text": text, "details": self.get_last_call_details()}
+
+        try:
+            entry, cache_status = await self.cache.aget_or_compute(
+                cache_key,
+                _produce,
+                timeout_seconds=deadline.remaining() if deadline is not None else None,
+            )
+        except TimeoutError as error:
+            raise self._deadline_exceeded_error([], context="waiting_for_coalesced_call") from error
+        self._last_call_details = {**dict(entry.get("details") or {}), "cache": cache_status}
+        if cache_status != CACHE_STATUS_MISS:
+            self._record_cache_hit()
+        return str(entry.get("text", ""))
+
+    async def _agenerate_uncached(
+        self,
+        payload: Dict[str, Any],
+        response_mime_type: str,
+        deadline: Deadline | None = None,
+        preferred_model: str = "",
+    ) -> str:
+        errors: List[str] = []
+        targets = self._targets_or_raise(preferred_model)
+        if self.hedge_policy is not None:
+            return await self._agenerate_hedged(payload, response_mime_type, deadline, targets, errors)
+
+        for index, (model, template) in enumerate(targets):
+            if deadline is not None and deadline.expired():
+                raise self._deadline_exceeded_error(errors)
+
+            text = await self._acall_target(
+                payload, model, template, response_mime_type, deadline, errors, fallback=index > 0
+            )
+            if text:
+                return text
+
+        return self._raise_no_compatible_model(errors)
+
+    async def _acall_target(
+        self,
+        payload: Dict[str, Any],
+        model: str,
+        template: str,
+        response_mime_type: str,
+        deadline: Deadline | None,
+        errors: List[str],
+        fallback: bool = False,
+        hedge: bool = False,
+    ) -> str:
+        url = template.format(model=model)
+        started = time.monotonic()
+        target_payload = self._payload_for_target(payload, model, template)
+        response, attempts = await self._apost_with_retry(url=url, payload=target_payload, deadline=deadline)
+        if self._rejected_response_schema(response, target_payload, model, template):
+            response, retry_attempts = await self._apost_with_retry(
+                url=url,
+                payload=self._payload_for_target(payload, model, template),
+                deadline=deadline,
+            )
+            attempts += retry_attempts
+
+        text = self._read_response(model, template, response, attempts, errors, response_mime_type)
+        self._record_health(model, template, response, time.monotonic() - started, deadline)
+        self._record_usage(model, bool(text), time.monotonic() - started, attempts, fallback, hedge)
+        return text
+
+    async def _agenerate_hedged(
+        self,
+        payload: Dict[str, Any],
+        response_mime_type: str,
+        deadline: Deadline | None,
+        targets: List[Tuple[str, str]],
+        errors: List[str],
+    ) -> str:
+        async def _run(
+            model: str,
+            template: str,
+            fallback: bool = False,
+            hedge: bool = False,
+        ) -> Tuple[str, Dict[str, Any], List[str]]:
+            # Tasks run in a copy of the caller's context, so call details stay per attempt.
+            target_errors: List[str] = []
+            text = await self._acall_target(
+                payload, model, template, response_mime_type, deadline, target_errors, fallback=fallback, hedge=hedge
+            )
+            return text, self.get_last_call_details(), target_errors
+
+        hedges = 0
+        hedge_wins = 0
+        position = 0
+        while position < len(targets):
+            if deadline is not None and deadline.expired():
+                raise self._deadline_exceeded_error(errors)
+
+            model, template = targets[position]
+            position += 1
+            self.hedge_policy.record_call()
+            primary = asyncio.ensure_future(_run(model, template, fallback=position > 1))
+            pending: Dict[asyncio.Future, bool] = {primary: False}
+
+            delay = self.hedge_policy.hedge_delay(model)
+            if delay is not None:
+                await asyncio.wait([primary], timeout=delay)
+                if not primary.done() and self.hedge_policy.try_start_hedge():
+                    (hedge_model, hedge_template), position = self._hedge_target(targets, position)
+                    pending[asyncio.ensure_future(_run(hedge_model, hedge_template, hedge=True))] = True
+                    hedges += 1
+
+            try:
+                while pending:
+                    timeout = deadline.remaining() if deadline is not None else None
+                    done, _ = await asyncio.wait(
+                        list(pending),
+                        timeout=timeout,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if not done:
+                        raise self._deadline_exceeded_error(errors)
+
+                    for future in done:
+                        is_hedge = pending.pop(future)
+                        text, details, target_errors = future.result()
+                        errors.extend(error for error in target_errors if error not in errors)
+                        self._last_call_details = details
+                        if not text:
+                            continue
+
+                        if is_hedge:
+                            hedge_wins += 1
+                            self.hedge_policy.record_hedge_win()
+                        self._last_call_details = {**details, "hedges": hedges, "hedge_wins": hedge_wins}
+                        return text
+            finally:
+                # The losing request is cancelled mid-flight.
+                for loser in pending:
+                    loser.cancel()
+
+        return self._raise_no_compatible_model(errors)
+
+    async def aclose(self) -> None:
+        session, closer, loop = self._async_session, self._async_session_closer, self._async_session_loop
+        self._async_session = None
+        self._async_session_loop = None
+        self._async_session_closer = None
+        if closer is None:
+            if session is not None:
+                await session.aclose()
+        elif loop is asyncio.get_running_loop():
+            closer.cancel()
+            await asyncio.gather(closer, return_exceptions=True)
+        else:
+            self._retire_async_session(closer, loop)
+
+    def _cache_key(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_output_tokens: int,
+        response_mime_type: str,
+        response_schema: Dict[str, Any] | None = None,
+        model: str = "",
+    ) -> str:
+        return ResponseCache.build_key(
+            model=model or self.model or "auto",
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            response_mime_type=response_mime_type,
+            response_schema=response_schema,
+        )
+
+    def _targets_or_raise(self, model: str = "") -> List[Tuple[str, str]]:
+        targets = self._ordered_targets(model)
+        if targets:
+            return targets
+
+        self._last_call_details = {
+            "status": "error",
+            "provider": "gemini",
+            "error": "all_models_unavailable",
+            "errors": ["circuit_open"],
+        }
+        raise GeminiUnavailableError("All Gemini models are temporarily unavailable (circuit open).")
+
+    def _deadline_exceeded_error(self, errors: List[str], context: str = "") -> DeadlineExceededError:
+        self._last_call_details = {
+            "status": "error",
+            "provider": "gemini",
+            "error": "deadline_exceeded",
+            "deadline_exceeded": True,
+            "errors": list(errors) + ["deadline_exceeded"],
+        }
+        suffix = f" ({context})" if context else ""
+        return DeadlineExceededError(f"Gemini call deadline exceeded{suffix}.")
+
+    def _record_health(
+        self,
+        model: str,
+        template: str,
+        response: Any,
+        elapsed_seconds: float,
+        deadline: Deadline | None = None,
+    ) -> None:
+        if response is None and deadline is not None and deadline.expired():
+            # The request was cut short by our own budget, not by the model.
+            return
+        if response is None:
+            self.health_registry.record_failure(model, template, None)
+        elif response.status_code >= 400:
+            self.health_registry.record_failure(model, template, response.status_code)
+        else:
+            self.health_registry.record_success(model, template, elapsed_seconds)
+            if self.hedge_policy is not None:
+                self.hedge_policy.record_latency(model, elapsed_seconds)
+
+    def _ensure_api_key(self) -> None:
+        if self.key_pool:
+            return
+
+        self._last_call_details = {
+            "status": "error",
+            "provider": "gemini",
+            "error": "GEMINI_API_KEY is missing",
+            "errors": ["missing_api_key"],
+        }
+        raise RuntimeError("GEMINI_API_KEY is missing. Add it to your .env file.")
+
+    def _build_payload(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_output_tokens: int,
+        response_mime_type: str,
+        response_schema: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
         combined_prompt = (
             f"System instruction:\n{system_prompt}\n\n"
             f"User request:\n{user_prompt}"
@@ -97,8 +635,10 @@ class GeminiClient:
         }
         if response_mime_type:
             generation_config["responseMimeType"] = response_mime_type
+        if response_schema and response_mime_type == "application/json":
+            generation_config["responseSchema"] = response_schema
 
-        payload = {
+        return {
             "contents": [
                 {
                     "role": "user",
@@ -108,77 +648,104 @@ class GeminiClient:
             "generationConfig": generation_config,
         }
 
-        errors: List[str] = []
-        for model in self._candidate_models():
-            for template in self.API_TEMPLATES:
-                url = template.format(model=model)
-                response = self._post_with_retry(url=url, payload=payload)
-                attempts = self._last_request_attempts
-
-                if response is None:
-                    errors.append(f"{model}:request_failed")
-                    self._last_call_details = {
-                        "status": "error",
-                        "provider": "gemini",
-                        "model": model,
-                        "endpoint": template,
-                        "attempts": attempts,
-                        "error": "request_failed",
-                        "errors": list(errors),
-                    }
-                    continue
+    def _payload_for_target(self, payload: Dict[str, Any], model: str, template: str) -> Dict[str, Any]:
+        generation_config = payload.get("generationConfig", {})
+        if "responseSchema" not in generation_config or (model, template) not in self._schema_unsupported_targets:
+            return payload
+        return {
+            **payload,
+            "generationConfig": {key: value for key, value in generation_config.items() if key != "responseSchema"},
+        }
 
-                if response.status_code == 404:
-                    errors.append(f"{model}:404")
-                    self._last_call_details = {
-                        "status": "error",
-                        "provider": "gemini",
-                        "model": model,
-                        "endpoint": template,
-                        "attempts": attempts,
-                        "error": "404_not_found",
-                        "errors": list(errors),
-                    }
-                    continue
+    def _rejected_response_schema(self, response: Any, payload: Dict[str, Any], model: str, template: str) -> bool:
+        # Older endpoints reject responseSchema with a 400; remember that and resend without it.
+        if response is None or response.status_code != 400:
+            return False
+        if "responseSchema" not in payload.get("generationConfig", {}):
+            return False
+        message = self._extract_error_message(response).lower()
+        if "schema" not in message:
+            return False
+        self._schema_unsupported_targets.add((model, template))
+        return True
 
-                if response.status_code >= 400:
-                    message = self._extract_error_message(response)
-                    errors.append(f"{model}:{response.status_code}:{message[:120]}")
-                    self._last_call_details = {
-                        "status": "error",
-                        "provider": "gemini",
-                        "model": model,
-                        "endpoint": template,
-                        "attempts": attempts,
-                        "error": f"http_{response.status_code}",
-                        "error_message": message[:240],
-                        "errors": list(errors),
-                    }
-                    continue
+    def _read_response(
+        self,
+        model: str,
+        template: str,
+        response: Any,
+        attempts: int,
+        errors: List[str],
+        response_mime_type: str,
+    ) -> str:
+        if response is None:
+            errors.append(f"{model}:request_failed")
+            self._last_call_details = {
+                "status": "error",
+                "provider": "gemini",
+                "model": model,
+                "endpoint": template,
+                "attempts": attempts,
+                "error": "request_failed",
+                "errors": list(errors),
+            }
+            return ""
 
-                text = self._extract_text(response.json())
-                if text:
-                    self._last_call_details = {
-                        "status": "success",
-                        "provider": "gemini",
-                        "model": model,
-                        "endpoint": template,
-                        "attempts": attempts,
-                        "response_mime_type": response_mime_type or "text/plain",
-                    }
-                    return text
-
-                errors.append(f"{model}:empty")
-                self._last_call_details = {
-                    "status": "error",
-                    "provider": "gemini",
-                    "model": model,
-                    "endpoint": template,
-                    "attempts": attempts,
-                    "error": "empty_response",
-                    "errors": list(errors),
-                }
+        if response.status_code == 404:
+            errors.append(f"{model}:404")
+            self._last_call_details = {
+                "status": "error",
+                "provider": "gemini",
+                "model": model,
+                "endpoint": template,
+                "attempts": attempts,
+                "error": "404_not_found",
+                "errors": list(errors),
+            }
+            return ""
+
+        if response.status_code >= 400:
+            message = self._extract_error_message(response)
+            errors.append(f"{model}:{response.status_code}:{message[:120]}")
+            self._last_call_details = {
+                "status": "error",
+                "provider": "gemini",
+                "model": model,
+                "endpoint": template,
+                "attempts": attempts,
+                "error": f"http_{response.status_code}",
+                "error_message": message[:240],
+                "errors": list(errors),
+            }
+            return ""
+
+        body = response.json()
+        text = self._extract_text(body)
+        if text:
+            self._last_call_details = {
+                "status": "success",
+                "provider": "gemini",
+                "model": model,
+                "endpoint": template,
+                "attempts": attempts,
+                "response_mime_type": response_mime_type or "text/plain",
+                "usage": extract_usage(body),
+            }
+            return text
 
+        errors.append(f"{model}:empty")
+        self._last_call_details = {
+            "status": "error",
+            "provider": "gemini",
+            "model": model,
+            "endpoint": template,
+            "attempts": attempts,
+            "error": "empty_response",
+            "errors": list(errors),
+        }
+        return ""
+
+    def _raise_no_compatible_model(self, errors: List[str]) -> str:
         self._last_call_details = {
             "status": "error",
             "provider": "gemini",
@@ -190,33 +757,302 @@ class GeminiClient:
             "No compatible Gemini model responded successfully. Tried: " + ", ".join(errors)
         )
 
-    def _post_with_retry(self, url: str, payload: Dict[str, Any]) -> requests.Response | None:
-        headers = {
+    def _request_headers(self, api_key: str) -> Dict[str, str]:
+        return {
             "Content-Type": "application/json",
-            "x-goog-api-key": self.api_key,
+            "x-goog-api-key": api_key,
+        }
+
+    def _record_usage(
+        self,
+        model: str,
+        succeeded: bool,
+        latency_seconds: float,
+        attempts: int,
+        fallback: bool,
+        hedge: bool,
+    ) -> None:
+        tracker = current_usage_tracker()
+        if tracker is None:
+            return
+        tracker.record_call(
+            model,
+            succeeded,
+            latency_seconds,
+            attempts,
+            usage=self._last_call_details.get("usage") if succeeded else None,
+            fallback=fallback,
+            hedge=hedge,
+        )
+
+    def _record_cache_hit(self) -> None:
+        tracker = current_usage_tracker()
+        if tracker is not None:
+            tracker.record_cache_hit()
+
+    def usage_snapshot(self) -> Dict[str, Any]:
+        return {
+            "api_keys": self.key_pool.snapshot(),
+            "models": self.health_registry.snapshot(),
+            "rate_limit": self.rate_limiter.snapshot() if self.rate_limiter is not None else None,
+            "hedging": self.hedge_policy.snapshot() if self.hedge_policy is not None else None,
+        }
+
+    @staticmethod
+    def _payload_tokens(payload: Dict[str, Any]) -> int:
+        # Quota counts input and output, so reserve the full output budget up front.
+        text = "".join(
+            part.get("text", "")
+            for content in payload.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        max_output = payload.get("generationConfig", {}).get("maxOutputTokens", 0)
+        return estimate_tokens(text) + int(max_output or 0)
+
+    def _rate_limit_wait_budget(self, deadline: Deadline | None) -> float:
+        if deadline is None:
+            return self.rate_limit_max_wait_seconds
+        return min(self.rate_limit_max_wait_seconds, deadline.remaining())
+
+    def _rate_limit_exceeded_error(self, deadline: Deadline | None) -> RuntimeError:
+        if deadline is not None and deadline.remaining() <= self.rate_limit_max_wait_seconds:
+            return self._deadline_exceeded_error(["rate_limited_locally"], context="waiting_for_rate_limit")
+        self._last_call_details = {
+            "status": "error",
+            "provider": "gemini",
+            "error": "rate_limited_locally",
+            "errors": ["rate_limited_locally"],
         }
+        return GeminiUnavailableError("Gemini request quota is exhausted; no capacity freed up in time.")
+
+    def _wait_for_rate_limit(self, payload: Dict[str, Any], deadline: Deadline | None) -> int:
+        if self.rate_limiter is None:
+            return 0
+        tokens = self._payload_tokens(payload)
+        if not self.rate_limiter.acquire(tokens, self._rate_limit_wait_budget(deadline)):
+            raise self._rate_limit_exceeded_error(deadline)
+        return tokens
+
+    async def _await_rate_limit(self, payload: Dict[str, Any], deadline: Deadline | None) -> int:
+        if self.rate_limiter is None:
+            return 0
+        tokens = self._payload_tokens(payload)
+        if not await self.rate_limiter.aacquire(tokens, self._rate_limit_wait_budget(deadline)):
+            raise self._rate_limit_exceeded_error(deadline)
+        return tokens
+
+    def _refund_rate_limit(self, reserved: int, response: Any) -> None:
+        # Each attempt reserves the full input+output estimate. Attempts that failed or
+        # were never sent are not billed, and a success usually uses far less output
+        # than its budget, so the difference goes back into the shared bucket.
+        if self.rate_limiter is None or reserved <= 0:
+            return
+        used = 0
+        if response is not None and response.status_code == 200:
+            try:
+                used = extract_usage(response.json())["total_tokens"] or reserved
+            except Exception:
+                used = reserved
+        if used < reserved:
+            self.rate_limiter.refund(reserved - used)
+
+    @staticmethod
+    def _retry_after_seconds(response: Any) -> float | None:
+        headers = getattr(response, "headers", None) or {}
+        raw = headers.get("Retry-After") or headers.get("retry-after")
+        if raw:
+            try:
+                return max(0.0, float(raw))
+            except (TypeError, ValueError):
+                pass
+
+        # Gemini reports quota back-off as a RetryInfo detail, e.g. {"retryDelay": "37s"}.
+        try:
+            details = response.json().get("error", {}).get("details", [])
+        except Exception:
+            return None
+        for detail in details if isinstance(details, list) else []:
+            delay = str(detail.get("retryDelay", "")) if isinstance(detail, dict) else ""
+            if delay.endswith("s"):
+                try:
+                    return max(0.0, float(delay[:-1]))
+                except ValueError:
+                    continue
+        return None
+
+    def _key_wait_seconds(self, scope: str, deadline: Deadline | None) -> float:
+        wait = self.key_pool.seconds_until_available(scope)
+        if deadline is not None:
+            wait = min(wait, max(0.0, deadline.remaining() - 1.0))
+        return wait
 
+    def _release_key(self, api_key: str, scope: str, response: Any) -> None:
+        if response is None:
+            self.key_pool.release(api_key, None, scope=scope)
+            return
+        retry_after = self._retry_after_seconds(response) if response.status_code == 429 else None
+        self.key_pool.release(api_key, response.status_code, retry_after, scope=scope)
+
+    def _post_with_retry(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        deadline: Deadline | None = None,
+    ) -> Tuple[requests.Response | None, int]:
         for attempt in range(self.max_retries + 1):
+            # Every key may be cooling down for this target, whether from our own 429 or one
+            # another caller hit: wait for the first one to come back rather than hammer it.
+            wait = self._key_wait_seconds(url, deadline)
+            if wait > 0:
+                time.sleep(wait)
+
+            reserved = self._wait_for_rate_limit(payload, deadline)
+            timeout = self._request_timeout(deadline)
+            if timeout <= 0:
+                self._refund_rate_limit(reserved, None)
+                return None, attempt
+
+            api_key = self.key_pool.acquire(url)
             try:
                 response = self.session.post(
                     url,
-                    headers=headers,
+                    headers=self._request_headers(api_key),
                     json=payload,
-                    timeout=self.timeout_seconds,
+                    timeout=timeout,
                 )
             except requests.RequestException:
-                if attempt >= self.max_retries:
-                    self._last_request_attempts = attempt + 1
-                    return None
-                time.sleep(0.6 * (attempt + 1))
+                self._release_key(api_key, url, None)
+                self._refund_rate_limit(reserved, None)
+                if attempt >= self.max_retries or not self._can_retry(attempt, deadline):
+                    return None, attempt + 1
+                time.sleep(self._retry_delay(attempt))
                 continue
+            self._release_key(api_key, url, response)
+            self._refund_rate_limit(reserved, response)
+
+            if (
+                response.status_code in self.RETRYABLE_STATUS_CODES
+                and attempt < self.max_retries
+                and self._can_retry(attempt, deadline)
+            ):
+                if response.status_code != 429:
+                    time.sleep(self._retry_delay(attempt))
+                    continue
+                # A rate-limited key waits out its cooldown at the top of the loop; long
+                # back-offs are left to the next model/endpoint instead.
+                if self._key_wait_seconds(url, deadline) <= self.MAX_KEY_WAIT_SECONDS:
+                    continue
 
-            if response.status_code in self.RETRYABLE_STATUS_CODES and attempt < self.max_retries:
-                time.sleep(0.6 * (attempt + 1))
+            return response, attempt + 1
+
+        return None, self.max_retries + 1
+
+    async def _apost_with_retry(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        deadline: Deadline | None = None,
+    ) -> Tuple[Any, int]:
+        session = self._get_async_session()
+
+        for attempt in range(self.max_retries + 1):
+            wait = self._key_wait_seconds(url, deadline)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            reserved = await self._await_rate_limit(payload, deadline)
+            timeout = self._request_timeout(deadline)
+            if timeout <= 0:
+                self._refund_rate_limit(reserved, None)
+                return None, attempt
+
+            api_key = self.key_pool.acquire(url)
+            try:
+                response = await session.post(
+                    url,
+                    headers=self._request_headers(api_key),
+                    json=payload,
+                    timeout=timeout,
+                )
+            except asyncio.CancelledError:
+                # A hedged request that lost the race; give the key back before unwinding.
+                self._release_key(api_key, url, None)
+                raise
+            except httpx.HTTPError:
+                self._release_key(api_key, url, None)
+                self._refund_rate_limit(reserved, None)
+                if attempt >= self.max_retries or not self._can_retry(attempt, deadline):
+                    return None, attempt + 1
+                await asyncio.sleep(self._retry_delay(attempt))
                 continue
+            self._release_key(api_key, url, response)
+            self._refund_rate_limit(reserved, response)
 
-            self._last_request_attempts = attempt + 1
-            return response
+            if (
+                response.status_code in self.RETRYABLE_STATUS_CODES
+                and attempt < self.max_retries
+                and self._can_retry(attempt, deadline)
+            ):
+                if response.status_code != 429:
+                    await asyncio.sleep(self._retry_delay(attempt))
+                    continue
+                if self._key_wait_seconds(url, deadline) <= self.MAX_KEY_WAIT_SECONDS:
+                    continue
 
-        self._last_request_attempts = self.max_retries + 1
-        return None
+            return response, attempt + 1
+
+        return None, self.max_retries + 1
+
+    def _request_timeout(self, deadline: Deadline | None) -> float:
+        if deadline is None:
+            return float(self.timeout_seconds)
+        return deadline.clamp(self.timeout_seconds)
+
+    def _can_retry(self, attempt: int, deadline: Deadline | None) -> bool:
+        # Only back off if there is budget left for the sleep plus a useful attempt.
+        if deadline is None:
+            return True
+        return deadline.remaining() > self._retry_delay(attempt) + 1.0
+
+    def _get_async_session(self):
+        # httpx connection pools are bound to the event loop that created them,
+        # so a new pool is opened if the client is reused from another loop.
+        loop = asyncio.get_running_loop()
+        if self._async_session is not None and self._async_session_loop is loop:
+            return self._async_session
+        if self._async_session_closer is not None:
+            self._retire_async_session(self._async_session_closer, self._async_session_loop)
+
+        use_http2 = self.http2 and importlib.util.find_spec("h2") is not None
+        session = httpx.AsyncClient(
+            http2=use_http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=30.0,
+            ),
+        )
+        self._async_session = session
+        self._async_session_loop = loop
+        # asyncio.run cancels leftover tasks before closing its loop, so the
+        # pool is closed while the loop that owns its sockets can still run.
+        self._async_session_closer = loop.create_task(self._close_async_session_on_cancel(session))
+        return session
+
+    @staticmethod
+    async def _close_async_session_on_cancel(session) -> None:
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            await session.aclose()
+
+    @staticmethod
+    def _retire_async_session(closer, loop) -> None:
+        # The old pool can only be closed on its own loop; once that loop is
+        # closed, its shutdown has already run the closer.
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(closer.cancel)
+
+    @staticmethod
+    def _retry_delay(attempt: int) -> float:
+        return 0.6 * (attempt + 1)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from collections import deque
+import threading
+import time
+from typing import Any, Deque, Dict
+
+
+LATENCY_SAMPLES = 200
+RATE_WINDOW_SECONDS = 60.0
+
+
+class HedgePolicy:
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        max_hedge_ratio: float = 0.1,
+        min_samples: int = 10,
+        min_delay_seconds: float = 0.5,
+    ):
+        self.percentile = min(99.9, max(1.0, percentile))
+        self.max_hedge_ratio = min(1.0, max(0.0, max_hedge_ratio))
+        self.min_samples = max(1, min_samples)
+        self.min_delay_seconds = max(0.0, min_delay_seconds)
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._calls: Deque[float] = deque()
+        self._hedges: Deque[float] = deque()
+        self._totals = {"calls": 0, "hedges": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+
+    def record_latency(self, model: str, latency_seconds: float) -> None:
+        with self._lock:
+            samples = self._latencies.setdefault(model, deque(maxlen=LATENCY_SAMPLES))
+            samples.append(max(0.0, latency_seconds))
+
+    def hedge_delay(self, model: str) -> float | None:
+        # No hedging until enough latencies are known to tell a slow call from a normal one.
+        with self._lock:
+            samples = sorted(self._latencies.get(model) or ())
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(self.min_delay_seconds, samples[index])
+
+    def record_call(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._calls.append(now)
+            self._totals["calls"] += 1
+
+    def try_start_hedge(self) -> bool:
+        # Hedges are capped to a share of recent calls so duplicates stay a bounded quota cost.
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            if len(self._hedges) + 1 > self.max_hedge_ratio * len(self._calls):
+                return False
+            self._hedges.append(now)
+            self._totals["hedges"] += 1
+            return True
+
+    def record_hedge_win(self) -> None:
+        with self._lock:
+            self._totals["hedge_wins"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            totals = dict(self._totals)
+            recent = {"calls_last_minute": len(self._calls), "hedges_last_minute": len(self._hedges)}
+            models = list(self._latencies)
+        delays = {model: self.hedge_delay(model) for model in models}
+        return {
+            **totals,
+            **recent,
+            "percentile": self.percentile,
+            "max_hedge_ratio": self.max_hedge_ratio,
+            "hedge_delay_seconds": {
+                model: round(delay, 3) if delay is not None else None for model, delay in delays.items()
+            },
+        }
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - RATE_WINDOW_SECONDS
+        for window in (self._calls, self._hedges):
+            while window and window[0] < cutoff:
+                window.popleft()
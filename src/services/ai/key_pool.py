@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+import threading
+import time
+from typing import Any, Deque, Dict, List, Sequence, Tuple
+
+
+USAGE_WINDOW_SECONDS = 60.0
+
+
+@dataclass
+class ApiKeyUsage:
+    requests: int = 0
+    successes: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    recent: Deque[float] = field(default_factory=deque)
+
+    def requests_in_window(self, now: float) -> int:
+        while self.recent and self.recent[0] <= now - USAGE_WINDOW_SECONDS:
+            self.recent.popleft()
+        return len(self.recent)
+
+
+class ApiKeyPool:
+    def __init__(
+        self,
+        api_keys: Sequence[str],
+        requests_per_minute: int = 0,
+        default_cooldown_seconds: float = 2.0,
+    ):
+        keys: List[str] = []
+        for key in api_keys:
+            key = (key or "").strip()
+            if key and key not in keys:
+                keys.append(key)
+        self.api_keys = keys
+        self.requests_per_minute = max(0, requests_per_minute)
+        self.default_cooldown_seconds = max(0.0, default_cooldown_seconds)
+        self._usage: Dict[str, ApiKeyUsage] = {key: ApiKeyUsage() for key in keys}
+        # Quotas are tracked per key and model, so a 429 on one model leaves the key usable for others.
+        self._cooldowns: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.api_keys)
+
+    def acquire(self, scope: str = "") -> str:
+        if not self.api_keys:
+            raise RuntimeError("GEMINI_API_KEY is missing. Add it to your .env file.")
+
+        now = time.monotonic()
+        with self._lock:
+            available = [key for key in self.api_keys if self._cooldown_until(key, scope) <= now]
+            if available:
+                # Most remaining observed quota first, then fewest requests in flight.
+                key = min(
+                    available,
+                    key=lambda item: (-self._remaining_quota(item, now), self._usage[item].in_flight),
+                )
+            else:
+                key = min(self.api_keys, key=lambda item: self._cooldown_until(item, scope))
+
+            usage = self._usage[key]
+            usage.requests += 1
+            usage.in_flight += 1
+            usage.recent.append(now)
+            return key
+
+    def release(
+        self,
+        api_key: str,
+        status_code: int | None,
+        retry_after_seconds: float | None = None,
+        scope: str = "",
+    ) -> None:
+        with self._lock:
+            usage = self._usage.get(api_key)
+            if usage is None:
+                return
+            usage.in_flight = max(0, usage.in_flight - 1)
+
+            if status_code == 429:
+                usage.rate_limited += 1
+                cooldown = retry_after_seconds if retry_after_seconds is not None else self.default_cooldown_seconds
+                until = time.monotonic() + max(0.0, cooldown)
+                self._cooldowns[(api_key, scope)] = max(self._cooldown_until(api_key, scope), until)
+            elif status_code is not None and status_code < 400:
+                usage.successes += 1
+            else:
+                usage.errors += 1
+
+    def seconds_until_available(self, scope: str = "") -> float:
+        if not self.api_keys:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            return max(0.0, min(self._cooldown_until(key, scope) for key in self.api_keys) - now)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                self._label(key): {
+                    "requests": usage.requests,
+                    "successes": usage.successes,
+                    "rate_limited": usage.rate_limited,
+                    "errors": usage.errors,
+                    "in_flight": usage.in_flight,
+                    "requests_last_minute": usage.requests_in_window(now),
+                    "cooling_down": {
+                        scope or "*": round(until - now, 1)
+                        for (cooled_key, scope), until in self._cooldowns.items()
+                        if cooled_key == key and until > now
+                    },
+                }
+                for key, usage in self._usage.items()
+            }
+
+    def _cooldown_until(self, api_key: str, scope: str) -> float:
+        return self._cooldowns.get((api_key, scope), 0.0)
+
+    def _remaining_quota(self, api_key: str, now: float) -> int:
+        used = self._usage[api_key].requests_in_window(now)
+        if self.requests_per_minute:
+            return self.requests_per_minute - used
+        return -used
+
+    def _label(self, api_key: str) -> str:
+        # Keys are never reported in full.
+        return f"key_{self.api_keys.index(api_key) + 1}...{api_key[-4:]}"
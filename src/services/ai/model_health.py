@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import threading
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+CIRCUIT_TRIPPING_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class ModelEndpointHealth:
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_status: str = ""
+    open_until: float = 0.0
+    latency_ema_ms: float = 0.0
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_status": self.last_status,
+            "open_for_seconds": round(max(0.0, self.open_until - now), 1),
+            "latency_ema_ms": round(self.latency_ema_ms, 1),
+        }
+
+
+class ModelHealthRegistry:
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 60.0,
+        not_found_cooldown_seconds: float = 1800.0,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = max(0.0, cooldown_seconds)
+        self.not_found_cooldown_seconds = max(0.0, not_found_cooldown_seconds)
+        self._entries: Dict[Tuple[str, str], ModelEndpointHealth] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, model: str, endpoint: str) -> ModelEndpointHealth:
+        key = (model, endpoint)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = ModelEndpointHealth()
+            self._entries[key] = entry
+        return entry
+
+    def record_success(self, model: str, endpoint: str, latency_seconds: float) -> None:
+        latency_ms = max(0.0, latency_seconds) * 1000
+        with self._lock:
+            entry = self._entry(model, endpoint)
+            entry.successes += 1
+            entry.consecutive_failures = 0
+            entry.open_until = 0.0
+            entry.last_status = "ok"
+            if entry.latency_ema_ms <= 0:
+                entry.latency_ema_ms = latency_ms
+            else:
+                entry.latency_ema_ms = (entry.latency_ema_ms * 0.8) + (latency_ms * 0.2)
+
+    def record_failure(self, model: str, endpoint: str, status_code: int | None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(model, endpoint)
+            entry.failures += 1
+            entry.last_status = str(status_code) if status_code else "request_failed"
+
+            if status_code == 404:
+                # The model is not served on this endpoint; skip it for a long while.
+                entry.open_until = now + self.not_found_cooldown_seconds
+                return
+
+            if status_code is not None and status_code not in CIRCUIT_TRIPPING_STATUS_CODES:
+                # Other client errors describe the request, not the model's health.
+                return
+
+            entry.consecutive_failures += 1
+            if entry.consecutive_failures >= self.failure_threshold:
+                entry.open_until = now + self.cooldown_seconds
+
+    def is_available(self, model: str, endpoint: str) -> bool:
+        with self._lock:
+            entry = self._entries.get((model, endpoint))
+            return entry is None or entry.open_until <= time.monotonic()
+
+    def order(self, targets: Sequence[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        now = time.monotonic()
+        with self._lock:
+            available = [
+                (index, target)
+                for index, target in enumerate(targets)
+                if target not in self._entries or self._entries[target].open_until <= now
+            ]
+            # Combinations known to work move ahead; priority order is kept otherwise.
+            available.sort(
+                key=lambda item: (
+                    0 if item[1] in self._entries and self._entries[item[1]].last_status == "ok" else 1,
+                    item[0],
+                )
+            )
+        return [target for _, target in available]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {f"{model}@{endpoint}": entry.to_dict(now) for (model, endpoint), entry in self._entries.items()}
+
+    def model_available(self, model: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            entries = [entry for (name, _), entry in self._entries.items() if name == model]
+            return not entries or any(entry.open_until <= now for entry in entries)
+
+    def model_latency_ms(self, model: str) -> float:
+        # Latency of the fastest endpoint that has served the model; 0 when unknown.
+        with self._lock:
+            latencies = [
+                entry.latency_ema_ms
+                for (name, _), entry in self._entries.items()
+                if name == model and entry.latency_ema_ms > 0
+            ]
+        return min(latencies) if latencies else 0.0
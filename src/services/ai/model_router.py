@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from collections import deque
+import threading
+import time
+from typing import Any, Deque, Dict, Mapping, Sequence, Tuple
+
+from src.services.ai.model_health import ModelHealthRegistry
+
+
+TASK_CLEANING = "cleaning"
+TASK_BATCHED = "batched"
+TASK_REPAIR = "repair"
+TASK_OPTIMIZER = "optimizer"
+
+# Cheapest first; promotion walks one step up this ladder.
+MODEL_TIERS = (
+    "gemini-2.0-flash-lite",
+    "gemini-2.0-flash",
+    "gemini-2.5-flash",
+    "gemini-2.5-pro",
+)
+
+# Short, list-shaped sections and JSON repair do not need a strong model; rewriting
+# experience and projects does. Unlisted tasks use the client's default model.
+DEFAULT_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "skills": ("gemini-2.0-flash-lite",),
+    "certifications": ("gemini-2.0-flash-lite",),
+    "achievements": ("gemini-2.0-flash-lite",),
+    "education": ("gemini-2.0-flash-lite",),
+    TASK_REPAIR: ("gemini-2.0-flash-lite",),
+    "experience": ("gemini-2.5-flash",),
+    "projects": ("gemini-2.5-flash",),
+}
+
+QUALITY_WINDOW = 20
+QUALITY_WINDOW_SECONDS = 600.0
+QUALITY_MIN_SAMPLES = 4
+QUALITY_FAILURE_RATIO = 0.5
+
+
+def parse_model_routes(raw: str) -> Dict[str, Tuple[str, ...]]:
+    # "skills=gemini-2.0-flash-lite,experience=gemini-2.5-pro|gemini-2.5-flash"
+    routes: Dict[str, Tuple[str, ...]] = {}
+    for rule in (raw or "").split(","):
+        task, _, models = rule.partition("=")
+        task = task.strip()
+        candidates = tuple(model.strip() for model in models.split("|") if model.strip())
+        if task and candidates:
+            routes[task] = candidates
+    return routes
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        routes: Mapping[str, Sequence[str]] | None = None,
+        health_registry: ModelHealthRegistry | None = None,
+        default_model: str = "",
+    ):
+        source = DEFAULT_ROUTES if routes is None else routes
+        self.routes: Dict[str, Tuple[str, ...]] = {task: tuple(models) for task, models in source.items() if models}
+        self.health_registry = health_registry or ModelHealthRegistry()
+        self.default_model = (default_model or "").strip()
+        self._outcomes: Dict[Tuple[str, str], Deque[Tuple[float, bool]]] = {}
+        self._lock = threading.Lock()
+
+    def route(self, task: str, promote: bool = False) -> str:
+        candidates = self.routes.get(task) or (self.default_model,)
+        healthy = [model for model in candidates if not model or self.health_registry.model_available(model)]
+        # Among healthy alternatives the fastest observed one wins; unknown latency sorts first
+        # so new models get sampled.
+        model = min(healthy or candidates, key=self.health_registry.model_latency_ms)
+
+        if promote or self._is_failing(task, model):
+            return self.promote(model)
+        return model
+
+    def promote(self, model: str) -> str:
+        if model in MODEL_TIERS:
+            return MODEL_TIERS[min(MODEL_TIERS.index(model) + 1, len(MODEL_TIERS) - 1)]
+        if self.default_model and self.default_model != model:
+            return self.default_model
+        return MODEL_TIERS[-1]
+
+    def record_quality(self, task: str, model: str, passed: bool) -> None:
+        if not model:
+            return
+        with self._lock:
+            outcomes = self._outcomes.setdefault((task, model), deque(maxlen=QUALITY_WINDOW))
+            outcomes.append((time.monotonic(), passed))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            quality = {}
+            for (task, model), outcomes in self._outcomes.items():
+                results = self._recent(outcomes)
+                quality[f"{task}@{model}"] = {
+                    "samples": len(results),
+                    "failures": results.count(False),
+                }
+        return {
+            "routes": {task: list(models) for task, models in self.routes.items()},
+            "default_model": self.default_model,
+            "quality": quality,
+        }
+
+    def _is_failing(self, task: str, model: str) -> bool:
+        # A model that keeps failing the quality checks for a task is skipped until its
+        # failures age out of the window, after which it gets another chance.
+        with self._lock:
+            results = self._recent(self._outcomes.get((task, model)) or deque())
+        if len(results) < QUALITY_MIN_SAMPLES:
+            return False
+        return results.count(False) / len(results) >= QUALITY_FAILURE_RATIO
+
+    @staticmethod
+    def _recent(outcomes: Deque[Tuple[float, bool]]) -> list:
+        cutoff = time.monotonic() - QUALITY_WINDOW_SECONDS
+        while outcomes and outcomes[0][0] < cutoff:
+            outcomes.popleft()
+        return [passed for _, passed in outcomes]
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import asyncio
+from dataclasses import dataclass
+import threading
+import time
+from typing import Any, Dict
+
+
+WINDOW_SECONDS = 60.0
+MAX_POLL_SECONDS = 1.0
+
+
+@dataclass
+class BucketState:
+    requests: float
+    tokens: float
+    updated: float
+
+
+def refill(state: BucketState, now: float, requests_per_minute: int, tokens_per_minute: int) -> None:
+    elapsed = max(0.0, now - state.updated)
+    state.updated = now
+    if requests_per_minute:
+        state.requests = min(requests_per_minute, state.requests + elapsed * requests_per_minute / WINDOW_SECONDS)
+    if tokens_per_minute:
+        state.tokens = min(tokens_per_minute, state.tokens + elapsed * tokens_per_minute / WINDOW_SECONDS)
+
+
+def refill_and_take(
+    state: BucketState,
+    now: float,
+    requests_per_minute: int,
+    tokens_per_minute: int,
+    tokens: int,
+) -> float:
+    # Both buckets refill continuously; a call is admitted only when it fits in both.
+    # Returns 0 when admitted, otherwise the seconds until it would fit.
+    refill(state, now, requests_per_minute, tokens_per_minute)
+    if tokens_per_minute:
+        # A single oversized call can never exceed the bucket capacity.
+        tokens = min(tokens, tokens_per_minute)
+
+    wait = 0.0
+    if requests_per_minute and state.requests < 1:
+        wait = max(wait, (1 - state.requests) * WINDOW_SECONDS / requests_per_minute)
+    if tokens_per_minute and state.tokens < tokens:
+        wait = max(wait, (tokens - state.tokens) * WINDOW_SECONDS / tokens_per_minute)
+    if wait > 0:
+        return wait
+
+    if requests_per_minute:
+        state.requests -= 1
+    if tokens_per_minute:
+        state.tokens -= tokens
+    return 0.0
+
+
+class RateLimiter(ABC):
+    backend = "none"
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.requests_per_minute = max(0, requests_per_minute)
+        self.tokens_per_minute = max(0, tokens_per_minute)
+        self._waiting = 0
+        self._throttled = 0
+        self._counter_lock = threading.Lock()
+
+    @abstractmethod
+    def reserve(self, tokens: int) -> float:
+        ...
+
+    @abstractmethod
+    def state(self) -> BucketState:
+        ...
+
+    def refund(self, tokens: int) -> None:
+        # Gives back the part of a reservation a call did not use; backends that
+        # cannot do this simply keep the full estimate reserved.
+        return None
+
+    def acquire(self, tokens: int, timeout_seconds: float) -> bool:
+        give_up_at = time.monotonic() + max(0.0, timeout_seconds)
+        wait = self.reserve(tokens)
+        if wait <= 0:
+            return True
+
+        self._track_waiting(1)
+        try:
+            while wait > 0:
+                # Give up early when the bucket cannot refill in time; other callers may
+                # still drain it while we sleep, so poll rather than sleep the full wait.
+                if time.monotonic() + wait > give_up_at:
+                    return False
+                time.sleep(min(wait, MAX_POLL_SECONDS))
+                wait = self.reserve(tokens)
+            return True
+        finally:
+            self._track_waiting(-1)
+
+    async def aacquire(self, tokens: int, timeout_seconds: float) -> bool:
+        give_up_at = time.monotonic() + max(0.0, timeout_seconds)
+        wait = self.reserve(tokens)
+        if wait <= 0:
+            return True
+
+        self._track_waiting(1)
+        try:
+            while wait > 0:
+                if time.monotonic() + wait > give_up_at:
+                    return False
+                await asyncio.sleep(min(wait, MAX_POLL_SECONDS))
+                wait = self.reserve(tokens)
+            return True
+        finally:
+            self._track_waiting(-1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state()
+        return {
+            "backend": self.backend,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "requests_available": round(state.requests, 2),
+            "tokens_available": int(state.tokens),
+            "requests_fill": self._fill(state.requests, self.requests_per_minute),
+            "tokens_fill": self._fill(state.tokens, self.tokens_per_minute),
+            "waiting": self._waiting,
+            "throttled": self._throttled,
+        }
+
+    def _track_waiting(self, delta: int) -> None:
+        with self._counter_lock:
+            self._waiting += delta
+            if delta > 0:
+                self._throttled += 1
+
+    @staticmethod
+    def _fill(available: float, capacity: int) -> float:
+        if not capacity:
+            return 1.0
+        return round(max(0.0, min(1.0, available / capacity)), 3)
+
+
+class InProcessRateLimiter(RateLimiter):
+    backend = "memory"
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self._state = BucketState(
+            requests=float(self.requests_per_minute),
+            tokens=float(self.tokens_per_minute),
+            updated=time.monotonic(),
+        )
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        with self._lock:
+            return refill_and_take(
+                self._state, time.monotonic(), self.requests_per_minute, self.tokens_per_minute, tokens
+            )
+
+    def refund(self, tokens: int) -> None:
+        with self._lock:
+            refill(self._state, time.monotonic(), self.requests_per_minute, self.tokens_per_minute)
+            if self.tokens_per_minute:
+                self._state.tokens = min(self.tokens_per_minute, self._state.tokens + max(0, tokens))
+
+    def state(self) -> BucketState:
+        with self._lock:
+            refill(self._state, time.monotonic(), self.requests_per_minute, self.tokens_per_minute)
+            return BucketState(self._state.requests, self._state.tokens, self._state.updated)
+
+
+# Same algorithm as refill_and_take, run atomically inside Redis so every worker
+# shares one bucket. Redis TIME is used so worker clock skew does not matter.
+# ARGV[4] is 1 to take, 0 to only read the state and -1 to refund tokens.
+_REDIS_BUCKET_SCRIPT = """
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local take = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local saved = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated')
+local requests = tonumber(saved[1]) or rpm
+local tokens = tonumber(saved[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(saved[3]) or now))
+if rpm > 0 then requests = math.min(rpm, requests + elapsed * rpm / 60) end
+if tpm > 0 then
+  tokens = math.min(tpm, tokens + elapsed * tpm / 60)
+  cost = math.min(cost, tpm)
+end
+local wait = 0
+if take < 0 and tpm > 0 then tokens = math.min(tpm, tokens + cost) end
+if take > 0 then
+  if rpm > 0 and requests < 1 then wait = math.max(wait, (1 - requests) * 60 / rpm) end
+  if tpm > 0 and tokens < cost then wait = math.max(wait, (cost - tokens) * 60 / tpm) end
+  if wait == 0 then
+    if rpm > 0 then requests = requests - 1 end
+    if tpm > 0 then tokens = tokens - cost end
+  end
+end
+redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], 120)
+return {tostring(wait), tostring(requests), tostring(tokens)}
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    backend = "redis"
+
+    def __init__(
+        self,
+        redis_url: str,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        key: str = "gemini:rate_limit",
+    ):
+        from redis import Redis
+
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self.key = key
+        self._redis = Redis.from_url(redis_url)
+        self._script = self._redis.register_script(_REDIS_BUCKET_SCRIPT)
+        # Used only while Redis is unreachable, so generation keeps a local brake.
+        self._fallback = InProcessRateLimiter(requests_per_minute, tokens_per_minute)
+
+    def reserve(self, tokens: int) -> float:
+        try:
+            wait, _, _ = self._run(tokens, mode=1)
+        except Exception:
+            return self._fallback.reserve(tokens)
+        return wait
+
+    def refund(self, tokens: int) -> None:
+        try:
+            self._run(tokens, mode=-1)
+        except Exception:
+            # Which bucket the reservation came from is unknown, so it stays reserved.
+            pass
+
+    def state(self) -> BucketState:
+        try:
+            _, requests, tokens = self._run(0, mode=0)
+        except Exception:
+            return self._fallback.state()
+        return BucketState(requests=requests, tokens=tokens, updated=time.monotonic())
+
+    def _run(self, tokens: int, mode: int) -> tuple:
+        raw = self._script(
+            keys=[self.key],
+            args=[self.requests_per_minute, self.tokens_per_minute, max(0, int(tokens)), mode],
+        )
+        return tuple(float(item.decode() if isinstance(item, bytes) else item) for item in raw)
+
+
+def build_rate_limiter(
+    requests_per_minute: int = 0,
+    tokens_per_minute: int = 0,
+    redis_url: str = "",
+) -> RateLimiter | None:
+    if requests_per_minute <= 0 and tokens_per_minute <= 0:
+        return None
+
+    if redis_url:
+        try:
+            return RedisRateLimiter(redis_url, requests_per_minute, tokens_per_minute)
+        except Exception:
+            # Fall back to a process-local bucket when Redis is unavailable.
+            pass
+
+    return InProcessRateLimiter(requests_per_minute, tokens_per_minute)
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+CACHE_STATUS_HIT = "hit"
+CACHE_STATUS_MISS = "miss"
+CACHE_STATUS_COALESCED = "coalesced"
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Dict[str, Any] | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_entries: int = 512, ttl_seconds: int = 3600):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = max(1, ttl_seconds)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return dict(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DiskCacheBackend(CacheBackend):
+    def __init__(self, directory: str, ttl_seconds: int = 3600):
+        self.directory = Path(directory)
+        self.ttl_seconds = max(1, ttl_seconds)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        if float(entry.get("expires_at", 0)) <= time.time():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+
+        value = entry.get("value")
+        return dict(value) if isinstance(value, dict) else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        temp_path.write_text(
+            json.dumps({"expires_at": time.time() + self.ttl_seconds, "value": value}),
+            encoding="utf-8",
+        )
+        os.replace(temp_path, path)
+
+
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, redis_url: str, ttl_seconds: int = 3600, prefix: str = "gemini:response:"):
+        from redis import Redis
+
+        self.ttl_seconds = max(1, ttl_seconds)
+        self.prefix = prefix
+        self._redis = Redis.from_url(redis_url)
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        raw = self._redis.get(self.prefix + key)
+        if not raw:
+            return None
+        value = json.loads(raw)
+        return value if isinstance(value, dict) else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._redis.set(self.prefix + key, json.dumps(value), ex=self.ttl_seconds)
+
+
+@dataclass
+class _Flight:
+    event: threading.Event = field(default_factory=threading.Event)
+    value: Dict[str, Any] | None = None
+    error: BaseException | None = None
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._flights: Dict[str, _Flight] = {}
+        # Futures belong to one event loop, so async flights are keyed by loop as well.
+        self._async_flights: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build_key(
+        model: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_output_tokens: int,
+        response_mime_type: str,
+        response_schema: Dict[str, Any] | None = None,
+    ) -> str:
+        parts: list = [model, system_prompt, user_prompt, round(float(temperature), 4), int(max_output_tokens), response_mime_type]
+        if response_schema:
+            parts.append(response_schema)
+        material = json.dumps(parts, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        # A broken cache backend must never break generation; treat errors as misses.
+        try:
+            return self.backend.get(key)
+        except Exception:
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            self.backend.set(key, value)
+        except Exception:
+            return
+
+    def get_or_compute(
+        self,
+        key: str,
+        producer: Callable[[], Dict[str, Any]],
+        timeout_seconds: float | None = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        cached = self.get(key)
+        if cached is not None:
+            return cached, CACHE_STATUS_HIT
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+
+        if not leader:
+            if not flight.event.wait(timeout=timeout_seconds):
+                raise TimeoutError("Timed out waiting for an in-flight identical request.")
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.value or {}), CACHE_STATUS_COALESCED
+
+        try:
+            value = producer()
+            flight.value = value
+            self.set(key, value)
+            return value, CACHE_STATUS_MISS
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    async def aget_or_compute(
+        self,
+        key: str,
+        producer: Callable[[], Awaitable[Dict[str, Any]]],
+        timeout_seconds: float | None = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        cached = self.get(key)
+        if cached is not None:
+            return cached, CACHE_STATUS_HIT
+
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        while True:
+            flight = self._async_flights.get(flight_key)
+            if flight is None:
+                break
+            try:
+                value = await asyncio.wait_for(asyncio.shield(flight), timeout=timeout_seconds)
+            except asyncio.CancelledError:
+                # The leader was cancelled (e.g. a lost hedge); take over unless we were too.
+                if flight.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+            except asyncio.TimeoutError as error:
+                raise TimeoutError("Timed out waiting for an in-flight identical request.") from error
+            return dict(value or {}), CACHE_STATUS_COALESCED
+
+        flight = loop.create_future()
+        # Mark a failure as retrieved even when nobody was waiting on it.
+        flight.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._async_flights[flight_key] = flight
+        try:
+            value = await producer()
+            flight.set_result(value)
+            self.set(key, value)
+            return value, CACHE_STATUS_MISS
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as error:
+            flight.set_exception(error)
+            raise
+        finally:
+            self._async_flights.pop(flight_key, None)
+
+
+def build_response_cache(
+    backend: str,
+    ttl_seconds: int = 3600,
+    max_entries: int = 512,
+    directory: str = "",
+    redis_url: str = "",
+) -> ResponseCache | None:
+    name = (backend or "").strip().lower()
+    if name in {"", "none", "off", "disabled"}:
+        return None
+
+    if name == "disk":
+        return ResponseCache(DiskCacheBackend(directory or "./data/cache/gemini", ttl_seconds=ttl_seconds))
+
+    if name == "redis" and redis_url:
+        try:
+            return ResponseCache(RedisCacheBackend(redis_url, ttl_seconds=ttl_seconds))
+        except Exception:
+            # Fall back to a process-local cache when Redis is unavailable.
+            pass
+
+    return ResponseCache(MemoryCacheBackend(max_entries=max_entries, ttl_seconds=ttl_seconds))
@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+from pathlib import Path
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import requests
+
+from src.utils.token_estimator import estimate_tokens
+
+
+# Local stand-in for the Gemini generateContent API, for offline and reproducible load tests.
+# Point GEMINI_BASE_URL at it, e.g.:
+#   python -m src.services.ai.standin_server --mode replay --latency lognormal:800:0.4 --rate-429 0.05
+#   GEMINI_BASE_URL=http://127.0.0.1:8089 GEMINI_API_KEY=local uvicorn src.api.main:app
+
+MODE_SYNTHETIC = "synthetic"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MODES = (MODE_SYNTHETIC, MODE_RECORD, MODE_REPLAY)
+
+FAULT_NOT_FOUND = "404"
+FAULT_RATE_LIMITED = "429"
+FAULT_SERVER_ERROR = "503"
+FAULT_MALFORMED = "malformed"
+
+DEFAULT_UPSTREAM_URL = "https://generativelanguage.googleapis.com"
+
+_ROUTE = re.compile(r"^/(v1beta|v1)/models/([^/:]+):generateContent$")
+_WORD = re.compile(r"[A-Za-z][A-Za-z+#.-]{3,}")
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    # fixed:MS, uniform:MIN_MS:MAX_MS, normal:MEAN_MS:STD_MS or lognormal:MEDIAN_MS:SIGMA
+    kind: str = "fixed"
+    first: float = 0.0
+    second: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        parts = [part.strip() for part in (spec or "0").split(":") if part.strip()]
+        if len(parts) == 1:
+            return cls("fixed", float(parts[0]))
+        kind = parts[0].lower()
+        if kind not in {"fixed", "uniform", "normal", "lognormal"}:
+            raise ValueError(f"Unsupported latency distribution: {kind}")
+        values = [float(part) for part in parts[1:3]] + [0.0, 0.0]
+        return cls(kind, values[0], values[1])
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            milliseconds = rng.uniform(self.first, self.second)
+        elif self.kind == "normal":
+            milliseconds = rng.gauss(self.first, self.second)
+        elif self.kind == "lognormal":
+            milliseconds = rng.lognormvariate(math.log(max(self.first, 1.0)), self.second)
+        else:
+            milliseconds = self.first
+        return max(0.0, milliseconds) / 1000
+
+
+@dataclass(frozen=True)
+class FaultPlan:
+    not_found_rate: float = 0.0
+    rate_limited_rate: float = 0.0
+    server_error_rate: float = 0.0
+    malformed_rate: float = 0.0
+
+    def pick(self, rng: random.Random) -> str:
+        roll = rng.random()
+        for fault, rate in (
+            (FAULT_NOT_FOUND, self.not_found_rate),
+            (FAULT_RATE_LIMITED, self.rate_limited_rate),
+            (FAULT_SERVER_ERROR, self.server_error_rate),
+            (FAULT_MALFORMED, self.malformed_rate),
+        ):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return ""
+
+
+class RecordingStore:
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        path = self.directory / f"{key}.json"
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, body: Dict[str, Any]) -> None:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temporary = self.directory / f"{key}.tmp"
+            temporary.write_text(json.dumps(body, ensure_ascii=False), encoding="utf-8")
+            temporary.replace(self.directory / f"{key}.json")
+
+
+def request_key(body: Dict[str, Any]) -> str:
+    # Keyed by prompt and generation settings but not the model, so a replay still hits
+    # when routing or fallback picks a different model than the recording run.
+    material = {
+        "systemInstruction": body.get("systemInstruction"),
+        "contents": body.get("contents"),
+        "generationConfig": body.get("generationConfig"),
+    }
+    canonical = json.dumps(material, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    texts: List[str] = []
+    for block in [body.get("systemInstruction") or {}, *(body.get("contents") or [])]:
+        texts.extend(str(part.get("text", "")) for part in block.get("parts", []) if isinstance(part, dict))
+    return "\n".join(texts)
+
+
+def _synthesize_value(schema: Dict[str, Any], words: Sequence[str], rng: random.Random, depth: int = 0) -> Any:
+    kind = str(schema.get("type", "STRING")).upper()
+    if kind == "OBJECT":
+        return {
+            key: _synthesize_value(child, words, rng, depth + 1)
+            for key, child in (schema.get("properties") or {}).items()
+        }
+    if kind == "ARRAY":
+        count = rng.randint(2, 3) if depth < 2 else rng.randint(1, 3)
+        return [_synthesize_value(schema.get("items") or {}, words, rng, depth + 1) for _ in range(count)]
+    if kind == "INTEGER":
+        return rng.randint(1, 100)
+    if kind == "NUMBER":
+        return round(rng.uniform(1, 100), 2)
+    if kind == "BOOLEAN":
+        return rng.random() < 0.5
+    picked = [rng.choice(words) for _ in range(3)] if words else ["delivery", "quality", "systems"]
+    return f"Improved {picked[0]} and {picked[1]} workflows, raising {picked[2]} throughput by {rng.randint(10, 60)}%"
+
+
+def synthesize_body(body: Dict[str, Any]) -> Dict[str, Any]:
+    # Deterministic per prompt: the same request always gets the same synthetic answer.
+    prompt = _prompt_text(body)
+    rng = random.Random(request_key(body))
+    words = sorted(set(_WORD.findall(prompt)))[:200]
+    config = body.get("generationConfig") or {}
+    schema = config.get("responseSchema")
+    if schema:
+        text = json.dumps(_synthesize_value(schema, words, rng), ensure_ascii=False)
+    elif config.get("responseMimeType") == "application/json":
+        text = json.dumps({"items": [_synthesize_value({}, words, rng) for _ in range(3)]})
+    else:
+        text = _synthesize_value({}, words, rng)
+
+    prompt_tokens = estimate_tokens(prompt)
+    output_tokens = estimate_tokens(text)
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        },
+    }
+
+
+def _malformed(body: Dict[str, Any]) -> Dict[str, Any]:
+    # Cuts the answer mid-JSON, like a response truncated by maxOutputTokens.
+    damaged = json.loads(json.dumps(body))
+    for candidate in damaged.get("candidates", []):
+        for part in candidate.get("content", {}).get("parts", []):
+            text = str(part.get("text", ""))
+            part["text"] = text[: max(1, len(text) // 2)]
+        candidate["finishReason"] = "MAX_TOKENS"
+    return damaged
+
+
+def _error_body(code: int, status: str, message: str, details: List[Dict[str, Any]] | None = None) -> Dict[str, Any]:
+    error: Dict[str, Any] = {"code": code, "message": message, "status": status}
+    if details:
+        error["details"] = details
+    return {"error": error}
+
+
+class GeminiStandIn:
+    def __init__(
+        self,
+        mode: str = MODE_SYNTHETIC,
+        recordings_dir: str = "./data/gemini-recordings",
+        latency: LatencyModel | None = None,
+        faults: FaultPlan | None = None,
+        seed: int | None = None,
+        upstream_url: str = DEFAULT_UPSTREAM_URL,
+        upstream_timeout_seconds: float = 120.0,
+        synthesize_on_miss: bool = True,
+        retry_after_seconds: int = 1,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unsupported mode: {mode}")
+        self.mode = mode
+        self.store = RecordingStore(recordings_dir)
+        self.latency = latency or LatencyModel()
+        self.faults = faults or FaultPlan()
+        self.upstream_url = upstream_url.rstrip("/")
+        self.upstream_timeout_seconds = upstream_timeout_seconds
+        self.synthesize_on_miss = synthesize_on_miss
+        self.retry_after_seconds = max(0, retry_after_seconds)
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+
+    def handle(self, path: str, body: Dict[str, Any], api_key: str = "") -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        match = _ROUTE.match(path.split("?", 1)[0])
+        if not match:
+            return 404, {}, _error_body(404, "NOT_FOUND", f"Unknown route {path}")
+        model = match.group(2)
+
+        # One draw per request under the lock keeps a seeded run reproducible.
+        with self._rng_lock:
+            delay = self.latency.sample(self._rng)
+            fault = self.faults.pick(self._rng)
+        time.sleep(delay)
+        self._count("requests")
+
+        if fault == FAULT_NOT_FOUND:
+            self._count("injected_404")
+            return 404, {}, _error_body(404, "NOT_FOUND", f"models/{model} is not found")
+        if fault == FAULT_RATE_LIMITED:
+            self._count("injected_429")
+            retry_delay = f"{self.retry_after_seconds}s"
+            details = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": retry_delay}]
+            headers = {"Retry-After": str(self.retry_after_seconds)}
+            return 429, headers, _error_body(429, "RESOURCE_EXHAUSTED", "Quota exceeded (injected)", details)
+        if fault == FAULT_SERVER_ERROR:
+            self._count("injected_5xx")
+            return 503, {}, _error_body(503, "UNAVAILABLE", "The model is overloaded (injected)")
+
+        status, response_body = self._respond(path, body, api_key)
+        if status == 200 and fault == FAULT_MALFORMED:
+            self._count("injected_malformed")
+            response_body = _malformed(response_body)
+        return status, {}, response_body
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {"mode": self.mode, **self._stats}
+
+    def _respond(self, path: str, body: Dict[str, Any], api_key: str) -> Tuple[int, Dict[str, Any]]:
+        if self.mode == MODE_SYNTHETIC:
+            self._count("synthesized")
+            return 200, synthesize_body(body)
+
+        key = request_key(body)
+        if self.mode == MODE_REPLAY:
+            recorded = self.store.get(key)
+            if recorded is not None:
+                self._count("replayed")
+                return 200, recorded
+            self._count("replay_misses")
+            if self.synthesize_on_miss:
+                return 200, synthesize_body(body)
+            return 503, _error_body(503, "UNAVAILABLE", f"No recording for request {key[:12]}")
+
+        try:
+            upstream = requests.post(
+                f"{self.upstream_url}{path}",
+                headers={"Content-Type": "application/json", "x-goog-api-key": api_key},
+                json=body,
+                timeout=self.upstream_timeout_seconds,
+            )
+            upstream_body = upstream.json()
+        except (requests.RequestException, ValueError) as error:
+            self._count("upstream_errors")
+            return 502, _error_body(502, "UNAVAILABLE", f"Upstream request failed: {error}")
+
+        if upstream.status_code == 200:
+            self.store.put(key, upstream_body)
+            self._count("recorded")
+        return upstream.status_code, upstream_body
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] = self._stats.get(name, 0) + 1
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    standin: GeminiStandIn
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {}, _error_body(400, "INVALID_ARGUMENT", "Request body is not JSON"))
+            return
+        api_key = self.headers.get("x-goog-api-key", "")
+        status, headers, response_body = self.standin.handle(self.path, body, api_key)
+        self._send(status, headers, response_body)
+
+    def do_GET(self) -> None:
+        if self.path == "/healthz":
+            self._send(200, {}, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send(200, {}, self.standin.stats())
+        else:
+            self._send(404, {}, _error_body(404, "NOT_FOUND", f"Unknown route {self.path}"))
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+    def _send(self, status: int, headers: Dict[str, str], body: Dict[str, Any]) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def build_server(standin: GeminiStandIn, host: str = "127.0.0.1", port: int = 8089) -> ThreadingHTTPServer:
+    handler = type("GeminiStandInHandler", (_StandInHandler,), {"standin": standin})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Local Gemini generateContent stand-in.")
+    parser.add_argument("--mode", choices=MODES, default=MODE_SYNTHETIC)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--recordings", default="./data/gemini-recordings")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM_URL)
+    parser.add_argument("--latency", default="0", help="fixed:MS, uniform:MIN:MAX, normal:MEAN:STD, lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--rate-404", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--rate-malformed", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-synthesize-on-miss", action="store_true")
+    args = parser.parse_args(argv)
+
+    standin = GeminiStandIn(
+        mode=args.mode,
+        recordings_dir=args.recordings,
+        latency=LatencyModel.parse(args.latency),
+        faults=FaultPlan(args.rate_404, args.rate_429, args.rate_5xx, args.rate_malformed),
+        seed=args.seed,
+        upstream_url=args.upstream,
+        synthesize_on_miss=not args.no_synthesize_on_miss,
+        retry_after_seconds=args.retry_after,
+    )
+    server = build_server(standin, args.host, args.port)
+    print(f"Gemini stand-in ({args.mode}) listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
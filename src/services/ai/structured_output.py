@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+
+def build_response_schema(example: Any) -> Dict[str, Any]:
+    # Converts the example-shaped schemas used in prompts into the OpenAPI subset
+    # Gemini accepts as generationConfig.responseSchema.
+    if isinstance(example, dict):
+        return {
+            "type": "OBJECT",
+            "properties": {key: build_response_schema(value) for key, value in example.items()},
+            "required": list(example.keys()),
+        }
+    if isinstance(example, list):
+        return {
+            "type": "ARRAY",
+            "items": build_response_schema(example[0]) if example else {"type": "STRING"},
+        }
+    if isinstance(example, bool):
+        return {"type": "BOOLEAN"}
+    if isinstance(example, int):
+        return {"type": "INTEGER"}
+    if isinstance(example, float):
+        return {"type": "NUMBER"}
+    return {"type": "STRING"}
+
+
+def schema_violations(value: Any, response_schema: Dict[str, Any], path: str = "$") -> List[str]:
+    expected = response_schema.get("type", "STRING")
+
+    if expected == "OBJECT":
+        if not isinstance(value, dict):
+            return [f"{path}:expected_object"]
+        violations: List[str] = []
+        properties = response_schema.get("properties", {})
+        for key in response_schema.get("required", []):
+            if key not in value:
+                violations.append(f"{path}.{key}:missing")
+        for key, child_schema in properties.items():
+            if key in value:
+                violations.extend(schema_violations(value[key], child_schema, f"{path}.{key}"))
+        return violations
+
+    if expected == "ARRAY":
+        if not isinstance(value, list):
+            return [f"{path}:expected_array"]
+        item_schema = response_schema.get("items", {"type": "STRING"})
+        violations = []
+        for index, item in enumerate(value):
+            violations.extend(schema_violations(item, item_schema, f"{path}[{index}]"))
+        return violations
+
+    if expected == "STRING" and not isinstance(value, str):
+        return [f"{path}:expected_string"]
+    if expected in {"INTEGER", "NUMBER"} and (isinstance(value, bool) or not isinstance(value, (int, float))):
+        return [f"{path}:expected_number"]
+    if expected == "BOOLEAN" and not isinstance(value, bool):
+        return [f"{path}:expected_boolean"]
+    return []
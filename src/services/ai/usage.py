@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+import contextvars
+import threading
+import time
+from typing import Any, Dict, Iterator
+
+
+USAGE_COUNTERS = (
+    "calls",
+    "failed_calls",
+    "cache_hits",
+    "prompt_tokens",
+    "output_tokens",
+    "total_tokens",
+    "latency_ms",
+    "attempts",
+    "fallbacks",
+    "hedges",
+)
+
+_CURRENT_TRACKER: contextvars.ContextVar["UsageTracker | None"] = contextvars.ContextVar(
+    "gemini_usage_tracker",
+    default=None,
+)
+
+
+def extract_usage(body: Dict[str, Any]) -> Dict[str, int]:
+    metadata = body.get("usageMetadata") or {}
+    prompt_tokens = int(metadata.get("promptTokenCount") or 0)
+    # Thinking models bill reasoning tokens as output as well.
+    output_tokens = int(metadata.get("candidatesTokenCount") or 0) + int(metadata.get("thoughtsTokenCount") or 0)
+    total_tokens = int(metadata.get("totalTokenCount") or 0) or prompt_tokens + output_tokens
+    return {"prompt_tokens": prompt_tokens, "output_tokens": output_tokens, "total_tokens": total_tokens}
+
+
+class UsageTracker:
+    # Collects every Gemini call made while it is active (see track_usage), including
+    # calls from section worker threads that run in a copied context. A tracker with a
+    # parent also forwards every call to it, so a part of a job can be metered on its own.
+    def __init__(self, parent: "UsageTracker | None" = None):
+        self.parent = parent
+        self.started = time.monotonic()
+        self._totals: Dict[str, int] = {name: 0 for name in USAGE_COUNTERS}
+        self._models: Dict[str, Dict[str, int]] = {}
+        self._max_latency_ms = 0
+        self._lock = threading.Lock()
+
+    def record_call(
+        self,
+        model: str,
+        succeeded: bool,
+        latency_seconds: float,
+        attempts: int,
+        usage: Dict[str, int] | None = None,
+        fallback: bool = False,
+        hedge: bool = False,
+    ) -> None:
+        latency_ms = int(max(0.0, latency_seconds) * 1000)
+        values = {
+            "calls": 1,
+            "failed_calls": 0 if succeeded else 1,
+            "latency_ms": latency_ms,
+            "attempts": max(0, attempts),
+            "fallbacks": 1 if fallback else 0,
+            "hedges": 1 if hedge else 0,
+            **{name: int((usage or {}).get(name) or 0) for name in ("prompt_tokens", "output_tokens", "total_tokens")},
+        }
+        with self._lock:
+            per_model = self._models.setdefault(model or "unknown", {name: 0 for name in USAGE_COUNTERS})
+            for name, value in values.items():
+                self._totals[name] += value
+                per_model[name] += value
+            self._max_latency_ms = max(self._max_latency_ms, latency_ms)
+        if self.parent is not None:
+            self.parent.record_call(model, succeeded, latency_seconds, attempts, usage, fallback, hedge)
+
+    def record_cache_hit(self) -> None:
+        with self._lock:
+            self._totals["cache_hits"] += 1
+        if self.parent is not None:
+            self.parent.record_cache_hit()
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._totals,
+                "max_latency_ms": self._max_latency_ms,
+                "wall_ms": int((time.monotonic() - self.started) * 1000),
+                "models": {model: dict(counters) for model, counters in self._models.items()},
+            }
+
+
+def current_usage_tracker() -> UsageTracker | None:
+    return _CURRENT_TRACKER.get()
+
+
+@contextmanager
+def track_usage(tracker: UsageTracker | None = None) -> Iterator[UsageTracker]:
+    tracker = tracker or UsageTracker()
+    token = _CURRENT_TRACKER.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _CURRENT_TRACKER.reset(token)
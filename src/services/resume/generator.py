@@ -1,20 +1,50 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import contextvars
 import json
 import re
-from typing import Any, Dict, List, Sequence, Tuple
+import threading
+from typing import Any, Callable, Dict, List, Sequence, Tuple
 
 from src.domain.models import ResumeInput, ResumeOutput
+from src.prompts.prompt_encoding import compact_json
 from src.prompts.resume_prompt import (
+    BATCHED_OUTPUT_SCHEMA,
     CLEANING_OUTPUT_SCHEMA,
+    JD_AWARE_SECTIONS,
     RESPONSE_SCHEMA,
     SECTION_OUTPUT_SCHEMAS,
     build_ats_cleaning_prompt,
+    build_batched_generation_prompt,
     build_section_generation_prompt,
+    section_prompt_inputs,
+    section_source_payload,
 )
+from src.services.ai.deadline import Deadline
 from src.services.ai.gemini_client import GeminiClient
+from src.services.ai.model_router import TASK_BATCHED, TASK_CLEANING, TASK_REPAIR, ModelRouter
+from src.services.ai.structured_output import build_response_schema, schema_violations
+from src.services.ai.usage import UsageTracker, current_usage_tracker, track_usage
+from src.utils.json_repair import REPAIR_SOURCE_REMOTE, JsonRepairError, coerce_to_schema, parse_json_object
+from src.utils.token_estimator import estimate_tokens, size_output_budget
 
 
 RESPONSE_KEYS = list(RESPONSE_SCHEMA.keys())
 
+GENERATION_STRATEGY_SECTIONAL = "sectional"
+GENERATION_STRATEGY_BATCHED = "batched"
+GENERATION_STRATEGIES = {GENERATION_STRATEGY_SECTIONAL, GENERATION_STRATEGY_BATCHED}
+
+# Called with (section_name, lines) as soon as a section has been generated.
+SectionCallback = Callable[[str, List[str]], None]
+
+# Set while targets fan out so nested target and section pools share one concurrency cap.
+_SECTION_SLOTS: contextvars.ContextVar[threading.Semaphore | None] = contextvars.ContextVar(
+    "resume_section_slots",
+    default=None,
+)
+
 NOISE_TOKENS = {
     "skills",
     "skill",
@@ -172,6 +202,19 @@ SEMANTIC_STOPWORDS = {
     "into",
 }
 
+QUALITY_ISSUE_SECTIONS = {
+    "missing_skills": ("skills",),
+    "missing_experience": ("experience",),
+    "missing_projects": ("projects",),
+    "truncated_summary": ("professional_summary",),
+    "verbose_bullets": ("experience", "projects"),
+    "placeholder_content": ("experience", "projects"),
+    "sparse_experience_headers": ("experience",),
+    "redundant_experience_headers": ("experience",),
+    "sparse_project_headers": ("projects",),
+    "redundant_project_headers": ("projects",),
+}
+
 TRUNCATED_NAME_ENDINGS = {
     "in",
     "for",
@@ -189,15 +232,42 @@ class ResumeGenerator:
         gemini_client: GeminiClient,
         temperature: float = 0.35,
         max_output_tokens: int = 1400,
+        section_concurrency: int = 1,
+        deadline_seconds: float = 0,
+        strategy: str = GENERATION_STRATEGY_SECTIONAL,
+        structured_output: bool = True,
+        model_router: ModelRouter | None = None,
     ):
         self.gemini_client = gemini_client
         self.temperature = temperature
         self.max_output_tokens = max_output_tokens
+        self.section_concurrency = max(1, section_concurrency)
+        self.deadline_seconds = max(0.0, deadline_seconds)
+        self.strategy = strategy if strategy in GENERATION_STRATEGIES else GENERATION_STRATEGY_SECTIONAL
+        self.structured_output = structured_output
+        self.model_router = model_router
 
-    def generate(self, resume_input: ResumeInput) -> ResumeOutput:
+    def generate(
+        self,
+        resume_input: ResumeInput,
+        deadline: Deadline | None = None,
+        strategy: str = "",
+        on_section: SectionCallback | None = None,
+        previous_input: ResumeInput | None = None,
+        previous_output: ResumeOutput | None = None,
+        shared_sections: Dict[str, List[str]] | None = None,
+    ) -> ResumeOutput:
         if self.is_test_input(resume_input):
             return self._dummy_output()
 
+        strategy = strategy if strategy in GENERATION_STRATEGIES else self.strategy
+
+        if deadline is None and self.deadline_seconds:
+            deadline = Deadline.after(self.deadline_seconds)
+
+        if not self.gemini_client.is_available():
+            return self._circuit_open_output(resume_input)
+
         try:
             local_clean_payload = self._build_local_cleaning_payload(resume_input)
             # Permanent guardrail: keep structure deterministic from local parsing.
@@ -209,30 +279,88 @@ class ResumeGenerator:
                 "last_call_details": {},
             }
 
-            data, section_meta = self._generate_sectional_payload(cleaned_payload)
+            reused_sections = {
+                **(shared_sections or {}),
+                **self._reusable_sections(cleaned_payload, previous_input, previous_output),
+            }
+            if reused_sections:
+                # Only changed sections are requested, which one batched call cannot express.
+                strategy = GENERATION_STRATEGY_SECTIONAL
+
+            if strategy == GENERATION_STRATEGY_BATCHED:
+                data, section_meta = self._generate_batched_payload(
+                    cleaned_payload,
+                    deadline=deadline,
+                    on_section=on_section,
+                )
+            else:
+                data, section_meta = self._generate_sectional_payload(
+                    cleaned_payload,
+                    deadline=deadline,
+                    on_section=on_section,
+                    reused_sections=reused_sections,
+                )
+            generated_payload = dict(data)
             data = self._enrich_with_input_data(resume_input, data)
             data = self._enforce_section_constraints(data)
 
             quality_issues = self._quality_issues(data, resume_input)
+            if quality_issues and not self.gemini_client.is_available():
+                return self._circuit_open_output(resume_input)
+
+            if quality_issues and self._deadline_expired(deadline):
+                diagnostics = self._build_diagnostics_metadata(
+                    error_message="Generation deadline exceeded before AI output passed quality checks.",
+                    quality_issues=quality_issues,
+                    call_details=section_meta.get("last_call_details"),
+                )
+                diagnostics["deadline_exceeded"] = True
+                diagnostics["json_repair_sources"] = section_meta.get("repair_sources", {})
+                return self._fallback_output(
+                    resume_input,
+                    mode="fallback_deadline_exceeded",
+                    metadata=diagnostics,
+                )
+
             if quality_issues:
-                recovered = self._recover_low_quality_output(resume_input, cleaned_payload, quality_issues)
+                recovered = self._recover_low_quality_output(
+                    resume_input,
+                    cleaned_payload,
+                    quality_issues,
+                    strategy=strategy,
+                    generated_payload=generated_payload,
+                    checked_payload=data,
+                    deadline=deadline,
+                    on_section=on_section,
+                )
                 if recovered is not None:
                     return ResumeOutput.from_dict(recovered)
 
                 diagnostics = self._build_diagnostics_metadata(
-                    error_message="Low quality AI output after sectional generation.",
+                    error_message=f"Low quality AI output after {strategy} generation.",
                     quality_issues=quality_issues,
+                    call_details=section_meta.get("last_call_details"),
                 )
+                if self._deadline_expired(deadline):
+                    diagnostics["deadline_exceeded"] = True
+                diagnostics["json_repair_sources"] = section_meta.get("repair_sources", {})
                 return self._fallback_output(
                     resume_input,
                     mode="fallback_incomplete_ai",
                     metadata=diagnostics,
                 )
 
-            data["mode"] = "ai_sectional" if not section_meta["errors"] else "ai_sectional_partial"
+            data["mode"] = f"ai_{strategy}" if not section_meta["errors"] else f"ai_{strategy}_partial"
+            data["generation_strategy"] = strategy
             data["cleaning_mode"] = cleaning_meta.get("mode", "local_cleaned")
             data["section_calls"] = section_meta.get("section_calls", 0)
             data["successful_sections"] = section_meta.get("successful_sections", [])
+            if section_meta.get("retried_sections"):
+                data["retried_sections"] = section_meta.get("retried_sections", [])
+            if section_meta.get("reused_sections"):
+                data["reused_sections"] = section_meta.get("reused_sections", [])
+            data["json_repair_sources"] = section_meta.get("repair_sources", {})
+            data["token_estimates"] = section_meta.get("token_estimates", {})
 
             diagnostics_errors = []
             diagnostics_errors.extend(cleaning_meta.get("errors", []))
@@ -240,6 +368,9 @@ class ResumeGenerator:
             if diagnostics_errors:
                 data["errors"] = diagnostics_errors[:8]
 
+            if self._deadline_expired(deadline):
+                data["deadline_exceeded"] = True
+
             call_details = section_meta.get("last_call_details") or cleaning_meta.get("last_call_details") or {}
             self._attach_call_details(data, call_details)
 
@@ -248,6 +379,69 @@ class ResumeGenerator:
             diagnostics = self._build_diagnostics_metadata(error_message=str(error))
             return self._fallback_output(resume_input, mode="fallback", metadata=diagnostics)
 
+    def generate_for_targets(
+        self,
+        resume_input: ResumeInput,
+        targets: Sequence[ResumeInput],
+        deadline: Deadline | None = None,
+    ) -> List[ResumeOutput]:
+        # One profile tailored to many job descriptions: sections that do not read the JD are
+        # generated once, without any target, and shared, so each target only requests the
+        # JD-aware sections. Targets run in parallel and results keep the target order.
+        # Without an explicit deadline the shared pass and every target get their own
+        # deadline_seconds budget, so later targets do not inherit an exhausted one.
+        if not targets:
+            return []
+
+        token = _SECTION_SLOTS.set(threading.BoundedSemaphore(self.section_concurrency))
+        try:
+            shared_sections: Dict[str, List[str]] = {}
+            if not self.is_test_input(resume_input) and self.gemini_client.is_available():
+                shared_deadline = deadline
+                if shared_deadline is None and self.deadline_seconds:
+                    shared_deadline = Deadline.after(self.deadline_seconds)
+                shared_sections = self._generate_shared_sections(resume_input, shared_deadline)
+
+            def _run_target(target: ResumeInput) -> ResumeOutput:
+                # Each target is metered on its own; the caller's tracker still sees every call.
+                with track_usage(UsageTracker(parent=current_usage_tracker())) as tracker:
+                    output = self.generate(target, deadline=deadline, shared_sections=shared_sections)
+                output.raw_response = {**dict(output.raw_response or {}), "usage": tracker.summary()}
+                return output
+
+            max_workers = min(self.section_concurrency, len(targets))
+            if max_workers <= 1:
+                return [_run_target(target) for target in targets]
+
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resume-target") as executor:
+                futures = [executor.submit(contextvars.copy_context().run, _run_target, target) for target in targets]
+                return [future.result() for future in futures]
+        finally:
+            _SECTION_SLOTS.reset(token)
+
+    def _generate_shared_sections(self, resume_input: ResumeInput, deadline: Deadline | None) -> Dict[str, List[str]]:
+        # Failed sections are left out, so every target retries them like a standalone job would.
+        # Targeting is blanked so the shared prompt does not lean towards the profile's own role.
+        cleaned_payload = {
+            **self._build_local_cleaning_payload(resume_input),
+            "target_role": "",
+            "target_company": "",
+            "job_description": "",
+            "job_description_keywords": [],
+        }
+        section_names = [key for key in RESPONSE_KEYS if key not in JD_AWARE_SECTIONS]
+        payload: Dict[str, Any] = {}
+        successful_sections: List[str] = []
+        self._collect_section_results(
+            section_names,
+            cleaned_payload,
+            payload,
+            successful_sections,
+            [],
+            deadline=deadline,
+        )
+        return {section_name: payload[section_name] for section_name in successful_sections}
+
     def _run_cleaning_pass(
         self,
         resume_input: ResumeInput,
@@ -258,16 +452,22 @@ class ResumeGenerator:
         text = ""
 
         try:
-            system_prompt, user_prompt = build_ats_cleaning_prompt(resume_input, local_clean_payload)
+            system_prompt, user_prompt = build_ats_cleaning_prompt(
+                resume_input,
+                local_clean_payload,
+                structured_output=self.structured_output,
+            )
             text = self.gemini_client.generate_text(
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
                 temperature=max(0.15, self.temperature - 0.1),
                 max_output_tokens=min(self.max_output_tokens, 1200),
                 response_mime_type="application/json",
+                response_schema=self._response_schema(CLEANING_OUTPUT_SCHEMA),
+                model=self._route_model(TASK_CLEANING),
             )
             last_call_details = self.gemini_client.get_last_call_details()
-            parsed = self._parse_response_json(text)
+            parsed = self._parse_response_json(text, CLEANING_OUTPUT_SCHEMA)
             cleaned = self._normalize_cleaning_payload(parsed, local_clean_payload)
             return cleaned, {
                 "mode": "ai_cleaned",
@@ -301,68 +501,281 @@ class ResumeGenerator:
         self,
         cleaned_payload: Dict[str, Any],
         temperature_override: float | None = None,
+        deadline: Deadline | None = None,
+        on_section: SectionCallback | None = None,
+        reused_sections: Dict[str, List[str]] | None = None,
     ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         payload: Dict[str, Any] = {}
         section_errors: List[str] = []
         successful_sections: List[str] = []
-        last_call_details: Dict[str, Any] = {}
+        repair_sources: List[str] = []
+        token_estimates: Dict[str, Dict[str, int]] = {}
+        reused_sections = reused_sections or {}
+        section_names = [key for key in RESPONSE_KEYS if key not in reused_sections]
+
+        for section_name, values in reused_sections.items():
+            payload[section_name] = list(values)
+            successful_sections.append(section_name)
+            self._notify_section(on_section, section_name, values)
+
+        last_call_details = self._collect_section_results(
+            section_names,
+            cleaned_payload,
+            payload,
+            successful_sections,
+            section_errors,
+            temperature_override=temperature_override,
+            deadline=deadline,
+            repair_sources=repair_sources,
+            token_estimates=token_estimates,
+            on_section=on_section,
+        )
+
+        return payload, {
+            "errors": section_errors,
+            "successful_sections": [key for key in RESPONSE_KEYS if key in successful_sections],
+            "reused_sections": [key for key in RESPONSE_KEYS if key in reused_sections],
+            "section_calls": len(section_names) + repair_sources.count(REPAIR_SOURCE_REMOTE),
+            "repair_sources": dict(Counter(repair_sources)),
+            "token_estimates": token_estimates,
+            "last_call_details": last_call_details,
+        }
+
+    def _reusable_sections(
+        self,
+        cleaned_payload: Dict[str, Any],
+        previous_input: ResumeInput | None,
+        previous_output: ResumeOutput | None,
+    ) -> Dict[str, List[str]]:
+        # A stored section is reused only when its prompt would be built from the same
+        # inputs (section source plus targeting/JD) and the previous run got it from AI.
+        if previous_input is None or previous_output is None:
+            return {}
+
+        previous_meta = previous_output.raw_response or {}
+        if not str(previous_meta.get("mode", "")).startswith("ai_"):
+            return {}
 
+        generated_sections = set(previous_meta.get("successful_sections") or [])
+        previous_payload = self._build_local_cleaning_payload(previous_input)
+        reused: Dict[str, List[str]] = {}
         for section_name in RESPONSE_KEYS:
-            try:
-                values = self._generate_single_section(
-                    section_name=section_name,
-                    cleaned_payload=cleaned_payload,
-                    temperature_override=temperature_override,
-                )
-                if not values:
-                    raise ValueError("section returned no values")
+            lines = list(getattr(previous_output, section_name, []) or [])
+            if not lines or section_name not in generated_sections:
+                continue
+            if section_prompt_inputs(section_name, previous_payload) != section_prompt_inputs(
+                section_name, cleaned_payload
+            ):
+                continue
+            reused[section_name] = lines
+        return reused
+
+    def _generate_batched_payload(
+        self,
+        cleaned_payload: Dict[str, Any],
+        deadline: Deadline | None = None,
+        on_section: SectionCallback | None = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        payload: Dict[str, Any] = {}
+        section_errors: List[str] = []
+        successful_sections: List[str] = []
+        retry_sections: List[str] = []
+        repair_sources: List[str] = []
+        token_estimates: Dict[str, Dict[str, int]] = {}
+        last_call_details: Dict[str, Any] = {}
+        batched_calls = 0
+
+        try:
+            system_prompt, user_prompt = build_batched_generation_prompt(
+                cleaned_payload,
+                structured_output=self.structured_output,
+            )
+            batched_calls = 1
+            token_budget = self._batched_token_budget(cleaned_payload)
+            token_estimates["batched"] = self._token_estimate(system_prompt, user_prompt, token_budget)
+            text = self.gemini_client.generate_text(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                temperature=self.temperature,
+                max_output_tokens=token_budget,
+                response_mime_type="application/json",
+                deadline=deadline,
+                response_schema=self._response_schema(BATCHED_OUTPUT_SCHEMA),
+                model=self._route_model(TASK_BATCHED),
+            )
+            last_call_details = self.gemini_client.get_last_call_details()
+
+            parsed = self._parse_or_repair_json(text, BATCHED_OUTPUT_SCHEMA, deadline, repair_sources)
+            batched_calls += repair_sources.count(REPAIR_SOURCE_REMOTE)
+
+            for section_name in RESPONSE_KEYS:
+                try:
+                    values = self._normalize_generated_section(
+                        section_name,
+                        {"items": parsed.get(section_name, [])},
+                        cleaned_payload,
+                    )
+                except Exception:
+                    values = []
+
+                if not values or self._section_quality_issues(section_name, values):
+                    retry_sections.append(section_name)
+                    continue
 
                 payload[section_name] = values
                 successful_sections.append(section_name)
-                last_call_details = self.gemini_client.get_last_call_details()
-            except Exception as error:
-                payload[section_name] = self._fallback_section_from_cleaned(section_name, cleaned_payload)
-                section_errors.append(f"{section_name}:{self._safe_error(error)}")
-                last_call_details = self.gemini_client.get_last_call_details()
+                self._notify_section(on_section, section_name, values)
+        except Exception as error:
+            section_errors.append(f"batched:{self._safe_error(error)}")
+            retry_sections = [section_name for section_name in RESPONSE_KEYS if section_name not in payload]
+            last_call_details = self.gemini_client.get_last_call_details()
 
-        return payload, {
+        # Only sections the batched response could not cover are re-requested one by one.
+        retry_call_details = self._collect_section_results(
+            retry_sections,
+            cleaned_payload,
+            payload,
+            successful_sections,
+            section_errors,
+            deadline=deadline,
+            repair_sources=repair_sources,
+            token_estimates=token_estimates,
+            on_section=on_section,
+        )
+
+        return {key: payload[key] for key in RESPONSE_KEYS if key in payload}, {
             "errors": section_errors,
-            "successful_sections": successful_sections,
-            "section_calls": len(RESPONSE_KEYS),
-            "last_call_details": last_call_details,
+            "successful_sections": [key for key in RESPONSE_KEYS if key in successful_sections],
+            "retried_sections": retry_sections,
+            "section_calls": batched_calls + len(retry_sections),
+            "repair_sources": dict(Counter(repair_sources)),
+            "token_estimates": token_estimates,
+            "last_call_details": retry_call_details or last_call_details,
         }
 
+    def _collect_section_results(
+        self,
+        section_names: Sequence[str],
+        cleaned_payload: Dict[str, Any],
+        payload: Dict[str, Any],
+        successful_sections: List[str],
+        section_errors: List[str],
+        temperature_override: float | None = None,
+        deadline: Deadline | None = None,
+        repair_sources: List[str] | None = None,
+        token_estimates: Dict[str, Dict[str, int]] | None = None,
+        promote: bool = False,
+        on_section: SectionCallback | None = None,
+    ) -> Dict[str, Any]:
+        def _run_section(section_name: str) -> Tuple[str, List[str], str, Dict[str, Any]]:
+            # Call details are read in the worker that made the call; they are context-local
+            # to that thread and would be lost if read from the caller afterwards.
+            try:
+                with self._section_slot():
+                    values = self._generate_single_section(
+                        section_name=section_name,
+                        cleaned_payload=cleaned_payload,
+                        temperature_override=temperature_override,
+                        deadline=deadline,
+                        repair_sources=repair_sources,
+                        token_estimates=token_estimates,
+                        promote=promote,
+                    )
+                call_details = self.gemini_client.get_last_call_details()
+                self._record_section_quality(section_name, values, call_details)
+                if not values:
+                    raise ValueError("section returned no values")
+                self._notify_section(on_section, section_name, values)
+                return section_name, values, "", call_details
+            except Exception as error:
+                return section_name, [], self._safe_error(error), self.gemini_client.get_last_call_details()
+
+        last_call_details: Dict[str, Any] = {}
+
+        # Sections share no state, so they can be requested in parallel; results
+        # are merged back in the requested order to keep output deterministic.
+        for section_name, values, error, call_details in self._map_sections(_run_section, section_names):
+            if call_details:
+                last_call_details = call_details
+            if error:
+                payload[section_name] = self._fallback_section_from_cleaned(section_name, cleaned_payload)
+                section_errors.append(f"{section_name}:{error}")
+                continue
+
+            payload[section_name] = values
+            successful_sections.append(section_name)
+
+        return last_call_details
+
+    def _section_slot(self) -> Any:
+        slots = _SECTION_SLOTS.get()
+        return slots if slots is not None else nullcontext()
+
+    def _notify_section(self, on_section: SectionCallback | None, section_name: str, values: List[str]) -> None:
+        if on_section is None:
+            return
+        try:
+            on_section(section_name, list(values))
+        except Exception:
+            # Progress reporting must never fail the generation itself.
+            pass
+
+    def _map_sections(
+        self,
+        worker: Callable[[str], Any],
+        section_names: Sequence[str],
+    ) -> List[Any]:
+        names = list(section_names)
+        max_workers = min(self.section_concurrency, len(names))
+        if max_workers <= 1:
+            return [worker(section_name) for section_name in names]
+
+        # Each section runs in a copy of the caller's context so per-job state such as the
+        # usage tracker follows the call into the worker thread.
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resume-section") as executor:
+            futures = [executor.submit(contextvars.copy_context().run, worker, name) for name in names]
+            return [future.result() for future in futures]
+
     def _generate_single_section(
         self,
         section_name: str,
         cleaned_payload: Dict[str, Any],
         temperature_override: float | None = None,
+        deadline: Deadline | None = None,
+        repair_sources: List[str] | None = None,
+        token_estimates: Dict[str, Dict[str, int]] | None = None,
+        promote: bool = False,
     ) -> List[str]:
         if section_name not in RESPONSE_KEYS:
             raise ValueError(f"Unsupported section: {section_name}")
 
-        system_prompt, user_prompt = build_section_generation_prompt(section_name, cleaned_payload)
-        token_budget = self._section_token_budget(section_name)
+        system_prompt, user_prompt = build_section_generation_prompt(
+            section_name,
+            cleaned_payload,
+            structured_output=self.structured_output,
+        )
+        token_budget = self._section_token_budget(section_name, cleaned_payload)
+        if token_estimates is not None:
+            token_estimates[section_name] = self._token_estimate(system_prompt, user_prompt, token_budget)
         text = self.gemini_client.generate_text(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=temperature_override if temperature_override is not None else self.temperature,
             max_output_tokens=token_budget,
             response_mime_type="application/json",
+            deadline=deadline,
+            response_schema=self._response_schema(SECTION_OUTPUT_SCHEMAS[section_name]),
+            model=self._route_model(section_name, promote=promote),
         )
 
-        try:
-            parsed = self._parse_response_json(text)
-        except Exception:
-            repaired = self._repair_json_with_gemini(text, SECTION_OUTPUT_SCHEMAS[section_name])
-            parsed = self._parse_response_json(repaired)
+        parsed = self._parse_or_repair_json(text, SECTION_OUTPUT_SCHEMAS[section_name], deadline, repair_sources)
 
         values = self._normalize_generated_section(section_name, parsed, cleaned_payload)
         if not values:
             raise ValueError("normalized section is empty")
         return values
 
-    def _section_token_budget(self, section_name: str) -> int:
+    def _section_token_budget(self, section_name: str, cleaned_payload: Dict[str, Any] | None = None) -> int:
         preferred = {
             "professional_summary": 360,
             "skills": 320,
@@ -372,7 +785,21 @@ class ResumeGenerator:
             "certifications": 260,
             "achievements": 280,
         }
-        return max(220, min(self.max_output_tokens, preferred.get(section_name, 420)))
+        ceiling = max(220, min(self.max_output_tokens, preferred.get(section_name, 420)))
+        if cleaned_payload is None:
+            return ceiling
+
+        source_tokens = estimate_tokens(compact_json(section_source_payload(section_name, cleaned_payload)))
+        return size_output_budget(ceiling, source_tokens, floor=min(ceiling, 220))
+
+    def _batched_token_budget(self, cleaned_payload: Dict[str, Any] | None = None) -> int:
+        return sum(self._section_token_budget(section_name, cleaned_payload) for section_name in RESPONSE_KEYS)
+
+    def _token_estimate(self, system_prompt: str, user_prompt: str, max_output_tokens: int) -> Dict[str, int]:
+        return {
+            "input": estimate_tokens(system_prompt) + estimate_tokens(user_prompt),
+            "max_output": max_output_tokens,
+        }
 
     def _normalize_generated_section(
         self,
@@ -1681,6 +2108,9 @@ class ResumeGenerator:
         value = value.strip(" :.-")
         return value
 
+    def _deadline_expired(self, deadline: Deadline | None) -> bool:
+        return deadline is not None and deadline.expired()
+
     def _safe_error(self, error: Exception) -> str:
         return str(error).replace("\n", " ").strip()[:120]
 
@@ -1692,6 +2122,8 @@ class ResumeGenerator:
             payload["endpoint_used"] = call_details.get("endpoint")
         if call_details.get("attempts") is not None:
             payload["attempts"] = call_details.get("attempts")
+        if call_details.get("cache"):
+            payload["cache_status"] = call_details.get("cache")
 
     def is_test_input(self, resume_input: ResumeInput) -> bool:
         values: List[str] = []
@@ -1719,24 +2151,38 @@ class ResumeGenerator:
         _collect(payload)
         return bool(values) and all(value == "test" for value in values)
 
-    def _parse_response_json(self, text: str) -> Dict[str, Any]:
-        content = text.strip()
-
-        if content.startswith("```"):
-            content = re.sub(r"^```(?:json)?", "", content).strip()
-            content = re.sub(r"```$", "", content).strip()
-
-        start = content.find("{")
-        end = content.rfind("}")
-        if start >= 0 and end > start:
-            content = content[start : end + 1]
+    def _parse_response_json(self, text: str, schema: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        data, _ = parse_json_object(text, schema)
+        return data
 
-        data = json.loads(content)
-        if not isinstance(data, dict):
-            raise ValueError("Gemini response is not a JSON object")
+    def _parse_or_repair_json(
+        self,
+        text: str,
+        schema: Dict[str, Any],
+        deadline: Deadline | None = None,
+        repair_sources: List[str] | None = None,
+    ) -> Dict[str, Any]:
+        try:
+            data, source = parse_json_object(text, schema)
+        except JsonRepairError:
+            # Local repair could not recover anything usable; spend a model round trip on it.
+            repaired = self._repair_json_with_gemini(text, schema, deadline=deadline)
+            data, _ = parse_json_object(repaired, schema)
+            source = REPAIR_SOURCE_REMOTE
+
+        if self.structured_output and schema_violations(data, build_response_schema(schema)):
+            data = coerce_to_schema(data, schema)
+
+        if repair_sources is not None:
+            repair_sources.append(source)
         return data
 
-    def _repair_json_with_gemini(self, invalid_output: str, schema: Dict[str, Any]) -> str:
+    def _repair_json_with_gemini(
+        self,
+        invalid_output: str,
+        schema: Dict[str, Any],
+        deadline: Deadline | None = None,
+    ) -> str:
         repair_system = (
             "You are a strict JSON repair assistant. "
             "Return valid JSON only with the exact schema."
@@ -1758,8 +2204,30 @@ class ResumeGenerator:
             temperature=0.1,
             max_output_tokens=self.max_output_tokens,
             response_mime_type="application/json",
+            deadline=deadline,
+            response_schema=self._response_schema(schema),
+            model=self._route_model(TASK_REPAIR),
         )
 
+    def _route_model(self, task: str, promote: bool = False) -> str:
+        if self.model_router is None:
+            return ""
+        return self.model_router.route(task, promote=promote)
+
+    def _record_section_quality(self, section_name: str, values: Sequence[str], call_details: Dict[str, Any]) -> None:
+        if self.model_router is None:
+            return
+        # An empty answer counts against the model too, or a cheap route could never be promoted.
+        passed = any(str(value or "").strip() for value in values) and not self._section_quality_issues(
+            section_name, values
+        )
+        self.model_router.record_quality(section_name, str(call_details.get("model", "")), passed)
+
+    def _response_schema(self, schema: Dict[str, Any]) -> Dict[str, Any] | None:
+        if not self.structured_output:
+            return None
+        return build_response_schema(schema)
+
     def _normalize_list(self, value: Any) -> List[str]:
         if value is None:
             return []
@@ -1949,36 +2417,40 @@ class ResumeGenerator:
         if resume_input.projects and not payload.get("projects"):
             issues.append("missing_projects")
 
-        truncated_summary = any(self._is_truncated_line(line) for line in payload.get("professional_summary", []))
-        if truncated_summary:
-            issues.append("truncated_summary")
+        for section_name in ["professional_summary", "experience", "projects"]:
+            issues.extend(self._section_quality_issues(section_name, payload.get(section_name, [])))
 
-        verbose_lines = any(
-            len((line or "").strip()) > 220
-            for section in ["experience", "projects"]
-            for line in payload.get(section, [])
-            if "|" not in (line or "")
-        )
-        if verbose_lines:
-            issues.append("verbose_bullets")
+        return list(dict.fromkeys(issues))
 
-        if self._has_placeholder_content(payload.get("experience", [])) or self._has_placeholder_content(
-            payload.get("projects", [])
-        ):
-            issues.append("placeholder_content")
+    def _section_quality_issues(self, section_name: str, lines: Sequence[str]) -> List[str]:
+        issues: List[str] = []
 
-        if self._has_sparse_headers(payload.get("experience", []), min_parts=4):
-            issues.append("sparse_experience_headers")
+        if section_name == "professional_summary":
+            if any(self._is_truncated_line(line) for line in lines):
+                issues.append("truncated_summary")
+            return issues
 
-        if self._has_sparse_headers(payload.get("projects", []), min_parts=3):
-            issues.append("sparse_project_headers")
+        if section_name in {"skills", "education", "certifications", "achievements"}:
+            if self._has_placeholder_content(lines):
+                issues.append("placeholder_content")
+            if section_name == "skills" and any(len((line or "").strip()) > 60 for line in lines):
+                issues.append("verbose_skills")
+            return issues
 
-        if self._has_redundant_headers(payload.get("experience", []), min_parts=4):
-            issues.append("redundant_experience_headers")
+        if section_name not in {"experience", "projects"}:
+            return issues
 
-        if self._has_redundant_headers(payload.get("projects", []), min_parts=3):
-            issues.append("redundant_project_headers")
+        min_parts = 4 if section_name == "experience" else 3
+        header_label = "experience" if section_name == "experience" else "project"
 
+        if any(len((line or "").strip()) > 220 for line in lines if "|" not in (line or "")):
+            issues.append("verbose_bullets")
+        if self._has_placeholder_content(lines):
+            issues.append("placeholder_content")
+        if self._has_sparse_headers(lines, min_parts=min_parts):
+            issues.append(f"sparse_{header_label}_headers")
+        if self._has_redundant_headers(lines, min_parts=min_parts):
+            issues.append(f"redundant_{header_label}_headers")
         return issues
 
     def _is_truncated_line(self, line: str) -> bool:
@@ -2037,39 +2509,95 @@ class ResumeGenerator:
         resume_input: ResumeInput,
         cleaned_payload: Dict[str, Any],
         quality_issues: List[str],
+        strategy: str = GENERATION_STRATEGY_SECTIONAL,
+        generated_payload: Dict[str, Any] | None = None,
+        checked_payload: Dict[str, Any] | None = None,
+        deadline: Deadline | None = None,
+        on_section: SectionCallback | None = None,
     ) -> Dict[str, Any] | None:
         retry_temperature = max(0.16, self.temperature - 0.12)
+        generated_payload = generated_payload or {}
+        target_sections = self._sections_for_quality_issues(checked_payload or generated_payload, quality_issues)
 
         try:
-            payload, section_meta = self._generate_sectional_payload(
+            # Sections that passed the checks are kept; only the ones behind an issue are re-requested.
+            regenerated: Dict[str, Any] = {}
+            section_errors: List[str] = []
+            successful_sections: List[str] = []
+            repair_sources: List[str] = []
+            token_estimates: Dict[str, Dict[str, int]] = {}
+            last_call_details = self._collect_section_results(
+                target_sections,
                 cleaned_payload,
+                regenerated,
+                successful_sections,
+                section_errors,
                 temperature_override=retry_temperature,
+                deadline=deadline,
+                repair_sources=repair_sources,
+                token_estimates=token_estimates,
+                promote=True,
+                on_section=on_section,
             )
+
+            payload = {
+                key: regenerated[key] if key in regenerated else generated_payload[key]
+                for key in RESPONSE_KEYS
+                if key in regenerated or key in generated_payload
+            }
             payload = self._enrich_with_input_data(resume_input, payload)
             payload = self._enforce_section_constraints(payload)
 
             if self._quality_issues(payload, resume_input):
                 return None
 
-            payload["mode"] = "ai_sectional_recovered"
+            payload["mode"] = f"ai_{strategy}_recovered"
+            payload["generation_strategy"] = strategy
             payload["quality_issues"] = list(quality_issues)
-            payload["section_calls"] = section_meta.get("section_calls", 0)
-            payload["successful_sections"] = section_meta.get("successful_sections", [])
-
-            if section_meta.get("errors"):
-                payload["errors"] = list(section_meta.get("errors", []))[:8]
-
-            self._attach_call_details(payload, section_meta.get("last_call_details", {}))
+            payload["recovered_sections"] = list(target_sections)
+            payload["section_calls"] = len(target_sections) + repair_sources.count(REPAIR_SOURCE_REMOTE)
+            payload["json_repair_sources"] = dict(Counter(repair_sources))
+            payload["token_estimates"] = token_estimates
+            payload["successful_sections"] = [
+                key
+                for key in RESPONSE_KEYS
+                if key in successful_sections or (key in generated_payload and key not in target_sections)
+            ]
+
+            if section_errors:
+                payload["errors"] = section_errors[:8]
+
+            self._attach_call_details(payload, last_call_details)
             return payload
         except Exception:
             return None
 
+    def _sections_for_quality_issues(self, payload: Dict[str, Any], quality_issues: Sequence[str]) -> List[str]:
+        targets = set()
+        for issue in quality_issues:
+            if issue == "too_few_sections_or_lines":
+                empty_sections = [key for key in RESPONSE_KEYS if not payload.get(key)]
+                targets.update(empty_sections or RESPONSE_KEYS)
+            elif issue in QUALITY_ISSUE_SECTIONS:
+                candidates = QUALITY_ISSUE_SECTIONS[issue]
+                # Issues shared by several sections only target the sections that actually show them.
+                flagged = [
+                    key
+                    for key in candidates
+                    if len(candidates) == 1 or issue in self._section_quality_issues(key, payload.get(key, []))
+                ]
+                targets.update(flagged or candidates)
+            else:
+                targets.update(RESPONSE_KEYS)
+        return [key for key in RESPONSE_KEYS if key in targets]
+
     def _build_diagnostics_metadata(
         self,
         error_message: str,
         quality_issues: List[str] | None = None,
+        call_details: Dict[str, Any] | None = None,
     ) -> Dict[str, Any]:
-        details = self.gemini_client.get_last_call_details()
+        details = call_details or self.gemini_client.get_last_call_details()
         metadata: Dict[str, Any] = {
             "provider": "gemini",
             "error": (error_message or "")[:240],
@@ -2088,6 +2616,20 @@ class ResumeGenerator:
 
         return metadata
 
+    def preview_output(self, resume_input: ResumeInput) -> ResumeOutput:
+        # Deterministic, model-free rendering of the input; shown while sections are generated.
+        return self._fallback_output(resume_input, mode="preview")
+
+    def generate_local(self, resume_input: ResumeInput) -> ResumeOutput:
+        # Same deterministic pipeline, used as the final result when no AI call is wanted.
+        return self._fallback_output(resume_input, mode="local")
+
+    def _circuit_open_output(self, resume_input: ResumeInput) -> ResumeOutput:
+        diagnostics = self._build_diagnostics_metadata(
+            error_message="All Gemini models are temporarily unavailable; skipped AI generation.",
+        )
+        return self._fallback_output(resume_input, mode="fallback_circuit_open", metadata=diagnostics)
+
     def _fallback_output(
         self,
         resume_input: ResumeInput,
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import json
 import importlib
 import re
 from typing import Any
@@ -8,6 +7,9 @@ from typing import Any
 from src.domain.ats_models import OptimizedResume, ResumeData, RoleSpec
 from src.prompts.ats_optimizer_prompt import build_ats_optimizer_prompt
 from src.services.ai.gemini_client import GeminiClient
+from src.services.ai.model_router import TASK_OPTIMIZER, ModelRouter
+from src.services.ai.structured_output import build_response_schema
+from src.utils.json_repair import parse_json_object
 
 try:
     spacy = importlib.import_module("spacy")
@@ -16,8 +18,15 @@ except Exception:  # pragma: no cover
 
 
 class ResumeOptimizer:
-    def __init__(self, gemini_client: GeminiClient):
+    def __init__(
+        self,
+        gemini_client: GeminiClient,
+        structured_output: bool = True,
+        model_router: ModelRouter | None = None,
+    ):
         self._client = gemini_client
+        self._structured_output = structured_output
+        self._model_router = model_router
         self._nlp = self._load_nlp()
 
     def _load_nlp(self):
@@ -38,6 +47,7 @@ class ResumeOptimizer:
             resume_data=resume_data,
             role_spec=role_spec,
             keyword_gaps=keyword_gaps,
+            structured_output=self._structured_output,
         )
         raw_response = self._client.generate_text(
             system_prompt=system_prompt,
@@ -45,6 +55,8 @@ class ResumeOptimizer:
             temperature=0.2,
             max_output_tokens=1800,
             response_mime_type="application/json",
+            response_schema=build_response_schema(OptimizedResume().to_dict()) if self._structured_output else None,
+            model=self._model_router.route(TASK_OPTIMIZER) if self._model_router is not None else "",
         )
         payload = self._parse_json_response(raw_response)
 
@@ -67,18 +79,8 @@ class ResumeOptimizer:
         return optimized
 
     def _parse_json_response(self, text: str) -> dict[str, Any]:
-        candidate = (text or "").strip()
-        if candidate.startswith("```"):
-            candidate = re.sub(r"^```(?:json)?", "", candidate).strip()
-            candidate = re.sub(r"```$", "", candidate).strip()
-        try:
-            return json.loads(candidate)
-        except json.JSONDecodeError:
-            start = candidate.find("{")
-            end = candidate.rfind("}")
-            if start >= 0 and end > start:
-                return json.loads(candidate[start : end + 1])
-            raise
+        payload, _ = parse_json_object(text, OptimizedResume().to_dict())
+        return payload
 
     def _extract_noun_phrases(self, text: str) -> set[str]:
         clean = (text or "").strip().lower()
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+
+REPAIR_SOURCE_DIRECT = "direct"
+REPAIR_SOURCE_LOCAL = "local"
+REPAIR_SOURCE_SCHEMA_PARTIAL = "schema_partial"
+REPAIR_SOURCE_REMOTE = "remote"
+
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+STRING_ITEM_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+
+class JsonRepairError(ValueError):
+    pass
+
+
+def extract_json_candidate(text: str) -> str:
+    content = (text or "").strip()
+    if content.startswith("```"):
+        content = re.sub(r"^```(?:json)?", "", content).strip()
+        content = re.sub(r"```$", "", content).strip()
+
+    start = content.find("{")
+    if start < 0:
+        return content
+    end = content.rfind("}")
+    # Keep everything after the first brace when the object was cut off mid-way.
+    if end > start and _is_balanced(content[start : end + 1]):
+        return content[start : end + 1]
+    return content[start:]
+
+
+def repair_json_text(text: str) -> str:
+    out: List[str] = []
+    stack: List[str] = []
+    expect_key: List[bool] = []
+    safe_points: List[Tuple[int, List[str]]] = []
+    quote = ""
+    string_is_key = False
+    escaped = False
+    index = 0
+
+    while index < len(text):
+        char = text[index]
+
+        if quote:
+            if escaped:
+                escaped = False
+                out.append("'" if char == "'" and quote == "'" else "\\" + char)
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                out.append('"')
+                quote = ""
+                if not string_is_key:
+                    safe_points.append((len(out), list(stack)))
+            elif char == '"':
+                out.append('\\"')
+            elif char == "\n":
+                out.append("\\n")
+            elif char == "\r":
+                out.append("\\r")
+            elif char == "\t":
+                out.append("\\t")
+            elif ord(char) < 0x20:
+                out.append(f"\\u{ord(char):04x}")
+            else:
+                out.append(char)
+            index += 1
+            continue
+
+        if char in "\"'":
+            quote = char
+            string_is_key = bool(stack) and stack[-1] == "{" and expect_key[-1]
+            out.append('"')
+        elif char in "{[":
+            stack.append(char)
+            expect_key.append(char == "{")
+            out.append(char)
+        elif char in "}]":
+            _strip_trailing_separators(out)
+            if stack:
+                stack.pop()
+                expect_key.pop()
+                out.append("}" if char == "}" else "]")
+                safe_points.append((len(out), list(stack)))
+        elif char == ":":
+            if expect_key:
+                expect_key[-1] = False
+            out.append(char)
+        elif char == ",":
+            _strip_trailing_separators(out)
+            safe_points.append((len(out), list(stack)))
+            if stack and stack[-1] == "{":
+                expect_key[-1] = True
+            out.append(char)
+        elif char.isalpha():
+            match = re.match(r"[A-Za-z_]+", text[index:])
+            word = match.group(0) if match else char
+            out.append(PYTHON_LITERALS.get(word, word))
+            index += len(word)
+            continue
+        else:
+            out.append(char)
+        index += 1
+
+    if quote:
+        if escaped:
+            out.append("\\\\")
+        out.append('"')
+        # A value cut off mid-string is a fragment, not a shorter answer; drop it so the
+        # field reads as missing and the caller's section recovery can fill it.
+        if not string_is_key:
+            _drop_trailing_string(out)
+
+    candidate = _close(out, stack)
+    if _loads_or_none(candidate) is not None or not safe_points:
+        return candidate
+
+    # The tail is a dangling key or half-written value; cut back to the last complete value.
+    position, open_stack = safe_points[-1]
+    return _close(out[:position], open_stack)
+
+
+def parse_json_object(text: str, schema: Dict[str, Any] | None = None) -> Tuple[Dict[str, Any], str]:
+    candidate = extract_json_candidate(text)
+
+    data = _loads_or_none(candidate)
+    if isinstance(data, dict):
+        return data, REPAIR_SOURCE_DIRECT
+
+    repaired = repair_json_text(candidate)
+    data = _loads_or_none(repaired)
+    if isinstance(data, dict):
+        return (coerce_to_schema(data, schema) if schema else data), REPAIR_SOURCE_LOCAL
+
+    if schema:
+        partial = extract_schema_fields(candidate, schema)
+        if partial:
+            return coerce_to_schema(partial, schema), REPAIR_SOURCE_SCHEMA_PARTIAL
+
+    raise JsonRepairError("Could not repair model output into a JSON object")
+
+
+def extract_schema_fields(text: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    decoder = json.JSONDecoder()
+    found: Dict[str, Any] = {}
+
+    for key, example in schema.items():
+        match = re.search(r'["\']' + re.escape(key) + r'["\']\s*:\s*', text)
+        if not match:
+            continue
+
+        remainder = text[match.end() :]
+        try:
+            value, _ = decoder.raw_decode(repair_json_text(remainder))
+        except ValueError:
+            value = None
+
+        if value is None and isinstance(example, list):
+            closing = remainder.find("]")
+            segment = remainder if closing < 0 else remainder[:closing]
+            value = [item for item in STRING_ITEM_PATTERN.findall(segment) if item.strip()]
+
+        if value is not None:
+            found[key] = value
+
+    return found
+
+
+def coerce_to_schema(data: Dict[str, Any], schema: Dict[str, Any]) -> Dict[str, Any]:
+    coerced = dict(data)
+    for key, example in schema.items():
+        if key not in coerced:
+            continue
+        value = coerced[key]
+        if isinstance(example, list) and not isinstance(value, list):
+            coerced[key] = [value] if value not in (None, "") else []
+        elif isinstance(example, str) and isinstance(value, list):
+            coerced[key] = " ".join(str(item) for item in value if item)
+    return coerced
+
+
+def _close(out: List[str], stack: List[str]) -> str:
+    out = list(out)
+    _strip_trailing_separators(out)
+    while out and out[-1] == ":":
+        out.pop()
+        _strip_trailing_whitespace(out)
+        _drop_trailing_string(out)
+        _strip_trailing_separators(out)
+    closers = "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+    return "".join(out) + closers
+
+
+def _strip_trailing_whitespace(out: List[str]) -> None:
+    while out and out[-1].isspace():
+        out.pop()
+
+
+def _strip_trailing_separators(out: List[str]) -> None:
+    _strip_trailing_whitespace(out)
+    while out and out[-1] == ",":
+        out.pop()
+        _strip_trailing_whitespace(out)
+
+
+def _drop_trailing_string(out: List[str]) -> None:
+    if not out or out[-1] != '"':
+        return
+    out.pop()
+    while out:
+        char = out.pop()
+        if char == '"':
+            return
+
+
+def _is_balanced(text: str) -> bool:
+    return text.count("{") == text.count("}") and text.count("[") == text.count("]")
+
+
+def _loads_or_none(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
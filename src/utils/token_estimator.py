@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import math
+import re
+
+
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Gemini tokenizes English prose at roughly four characters per token; JSON
+# punctuation and short identifiers push the ratio down, so both signals are used.
+CHARS_PER_TOKEN = 4.0
+TOKENS_PER_WORD = 0.75
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    by_chars = len(text) / CHARS_PER_TOKEN
+    by_pieces = len(WORD_PATTERN.findall(text)) * TOKENS_PER_WORD
+    return int(math.ceil(max(by_chars, by_pieces)))
+
+
+def size_output_budget(
+    base_budget: int,
+    source_tokens: int,
+    floor: int = 160,
+    expansion: float = 1.6,
+    overhead: int = 96,
+) -> int:
+    # Rewritten sections rarely grow past their source by much, so a small source
+    # does not need the full per-section ceiling.
+    ceiling = max(floor, base_budget)
+    wanted = int(source_tokens * expansion) + overhead
+    return max(floor, min(ceiling, wanted))
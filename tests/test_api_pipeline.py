@@ -1,9 +1,38 @@
+import os
+import statistics
+import tempfile
+import threading
 import time
 import unittest
+import uuid
+from datetime import timedelta
+from unittest import mock
 
 from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
+from sqlmodel import Session, SQLModel, create_engine, select
 
+from src.api.db import get_session
+from src.api.dedup import request_hash
 from src.api.main import app
+from src.api.mappers import from_domain_resume_output, to_domain_resume_input
+from src.api.migrate_dedup import migrate as migrate_dedup
+from src.api.models_db import (
+    JOB_STATUS_COMPLETED,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_PREVIEW_READY,
+    JOB_STATUS_PROCESSING,
+    ResumeJob,
+    ResumeRecord,
+    UsageDaily,
+    User,
+)
+from src.api.runtime import get_resume_runtime
+from src.api.schemas import ResumeGenerationRequest, ResumeInputPayload
+from src.api.security import get_current_user
+from src.api.usage import record_job_usage
+from src.api.worker_tasks import _JobProgress, run_resume_batch_job
+from src.services.ai.usage import UsageTracker, track_usage
 
 
 class ApiPipelineTests(unittest.TestCase):
@@ -90,6 +119,568 @@ class ApiPipelineTests(unittest.TestCase):
         self.assertEqual(final, "completed")
         self.assertTrue(self.client.get(f"/api/v1/resumes/jobs/{job_id}", headers=headers).json().get("result_payload"))
 
+    def test_gemini_health_reports_liveness_only(self):
+        response = self.client.get("/healthz/gemini")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {"available", "api_keys_configured"})
+
+
+
+class JobProgressTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{self._tmp.name}/jobs.db",
+            connect_args={"check_same_thread": False},
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.job_id = uuid.uuid4()
+        with Session(self.engine) as session:
+            session.add(ResumeJob(id=self.job_id, user_id=uuid.uuid4(), status=JOB_STATUS_PROCESSING))
+            session.commit()
+
+    def tearDown(self):
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def _result_payload(self):
+        with Session(self.engine) as session:
+            return session.get(ResumeJob, self.job_id).result_payload
+
+    def test_sections_are_written_as_they_complete(self):
+        progress = _JobProgress(self.engine, self.job_id, {"skills": ["Preview"], "experience": ["Preview role"]})
+        progress.start()
+        self.assertEqual(self._result_payload()["completed_sections"], [])
+
+        progress.section_completed("skills", ["Python", "SQL"])
+
+        payload = self._result_payload()
+        self.assertTrue(payload["partial"])
+        self.assertEqual(payload["completed_sections"], ["skills"])
+        self.assertEqual(payload["resume_output"]["skills"], ["Python", "SQL"])
+        self.assertEqual(payload["resume_output"]["experience"], ["Preview role"])
+
+    def test_preview_is_published_first_and_upgraded_per_section(self):
+        progress = _JobProgress(
+            self.engine,
+            self.job_id,
+            {"skills": ["Preview"]},
+            preview_result={"preview": True, "markdown": "preview", "ats_result": {"score": 61}},
+            render_markdown=lambda output: "## Skills\n" + ", ".join(output["skills"]),
+        )
+
+        progress.start()
+        with Session(self.engine) as session:
+            self.assertEqual(session.get(ResumeJob, self.job_id).status, JOB_STATUS_PREVIEW_READY)
+        self.assertEqual(self._result_payload()["markdown"], "preview")
+
+        progress.section_completed("skills", ["Python", "SQL"])
+
+        payload = self._result_payload()
+        self.assertTrue(payload["preview"])
+        self.assertEqual(payload["markdown"], "## Skills\nPython, SQL")
+        self.assertEqual(payload["ats_result"], {"score": 61})
+
+    def test_finished_job_is_not_overwritten_by_late_progress(self):
+        progress = _JobProgress(self.engine, self.job_id, {})
+        with Session(self.engine) as session:
+            job = session.get(ResumeJob, self.job_id)
+            job.status = JOB_STATUS_COMPLETED
+            job.result_payload = {"markdown": "final"}
+            session.add(job)
+            session.commit()
+
+        progress.section_completed("skills", ["Python"])
+
+        self.assertEqual(self._result_payload(), {"markdown": "final"})
+
+
+class LocalGenerationTests(unittest.TestCase):
+    # Local mode is meant to answer in tens of milliseconds; these budgets hold it there.
+    LATENCY_BUDGET_MS = 50.0
+
+    def setUp(self):
+        app.dependency_overrides[get_current_user] = lambda: User(email="local@example.com", hashed_password="x")
+        self.client = TestClient(app)
+        self.payload = {
+            "resume_input": {
+                "personal_info": {"full_name": "Asha Rao", "email": "asha@example.com", "location": "Remote"},
+                "career_summary": "Backend engineer building reliable Python services and data pipelines.",
+                "target_role": "Backend Engineer",
+                "job_description": "Backend engineer with Python, FastAPI, PostgreSQL, Redis and AWS.",
+                "skills": ["Python", "FastAPI", "PostgreSQL", "Docker", "Redis", "AWS"],
+                "experiences": [
+                    {
+                        "role": "Software Engineer",
+                        "company": "Acme Labs",
+                        "duration": "Jan 2024 - Jun 2024",
+                        "location": "Remote",
+                        "bullet_points": [
+                            "Built REST APIs in FastAPI serving 10k daily requests.",
+                            "Cut p95 latency by 40% with Redis caching.",
+                        ],
+                    }
+                ]
+                * 3,
+                "projects": [
+                    {
+                        "name": "Pipeline",
+                        "technologies": "Python, Airflow",
+                        "year": "2023",
+                        "bullet_points": ["Built an ETL pipeline for billing data."],
+                    }
+                ],
+            },
+            "template_key": "classic",
+        }
+
+    def tearDown(self):
+        app.dependency_overrides.pop(get_current_user, None)
+
+    def _median_ms(self, call, runs=15):
+        call()
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def test_returns_markdown_inline_without_a_job(self):
+        response = self.client.post("/api/v1/resumes/generate-local", json=self.payload)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertIn("Acme Labs", body["markdown"])
+        self.assertTrue(body["resume_output"]["experience"])
+        self.assertIn("score", body["ats_result"])
+
+    def test_returns_pdf_inline(self):
+        response = self.client.post(
+            "/api/v1/resumes/generate-local",
+            params={"response_format": "pdf"},
+            json=self.payload,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/pdf")
+        self.assertTrue(response.content.startswith(b"%PDF"))
+
+    def test_local_pipeline_is_deterministic_and_makes_no_gemini_calls(self):
+        runtime = get_resume_runtime()
+        resume_input = to_domain_resume_input(
+            ResumeGenerationRequest.model_validate(self.payload).resume_input
+        )
+        tracker = UsageTracker()
+
+        with track_usage(tracker):
+            first = runtime.generator.generate_local(resume_input)
+            second = runtime.generator.generate_local(resume_input)
+
+        self.assertEqual(tracker.summary()["calls"], 0)
+        self.assertEqual(first.raw_response["mode"], "local")
+        self.assertEqual(from_domain_resume_output(first).model_dump(), from_domain_resume_output(second).model_dump())
+        self.assertEqual(
+            runtime.formatter.to_markdown(resume_input, first),
+            runtime.formatter.to_markdown(resume_input, second),
+        )
+        self.assertTrue(runtime.pdf_renderer.render(resume_input, first, embed_fonts=False).startswith(b"%PDF"))
+
+    @unittest.skipUnless(os.getenv("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run wall-clock benchmarks")
+    def test_local_pipeline_stays_within_latency_budget(self):
+        runtime = get_resume_runtime()
+        resume_input = to_domain_resume_input(
+            ResumeGenerationRequest.model_validate(self.payload).resume_input
+        )
+
+        def _pipeline():
+            resume_output = runtime.generator.generate_local(resume_input)
+            runtime.formatter.to_markdown(resume_input, resume_output)
+            return runtime.pdf_renderer.render(resume_input, resume_output, embed_fonts=False)
+
+        self.assertLess(self._median_ms(_pipeline), self.LATENCY_BUDGET_MS)
+
+        def _endpoint():
+            response = self.client.post("/api/v1/resumes/generate-local", json=self.payload)
+            self.assertEqual(response.status_code, 200)
+
+        self.assertLess(self._median_ms(_endpoint), self.LATENCY_BUDGET_MS)
+
+
+class JobDeduplicationTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{self._tmp.name}/dedup.db",
+            connect_args={"check_same_thread": False},
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.user = User(email="dedup@example.com", hashed_password="x")
+        with Session(self.engine) as session:
+            session.add(self.user)
+            session.commit()
+            session.refresh(self.user)
+
+        def _session():
+            with Session(self.engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = _session
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        self.client = TestClient(app)
+        self.payload = {
+            "resume_input": {
+                "personal_info": {"full_name": "Asha Rao", "email": "asha@example.com"},
+                "skills": ["Python", "FastAPI"],
+            },
+            "template_key": "classic",
+        }
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def _submit(self, payload):
+        with mock.patch("src.api.routers.resumes.enqueue_resume_job", return_value="test") as enqueue:
+            response = self.client.post("/api/v1/resumes/jobs", json=payload)
+        return response, enqueue.call_count
+
+    def test_hash_ignores_whitespace_and_delivery_options(self):
+        first = ResumeGenerationRequest.model_validate(self.payload)
+        second = ResumeGenerationRequest.model_validate(
+            {
+                **self.payload,
+                "resume_input": {**self.payload["resume_input"], "skills": [" Python ", "FastAPI", ""]},
+                "preview_first": False,
+            }
+        )
+        changed = ResumeGenerationRequest.model_validate({**self.payload, "template_key": "compact"})
+
+        self.assertEqual(request_hash(first), request_hash(second))
+        self.assertNotEqual(request_hash(first), request_hash(changed))
+
+    def test_resubmission_attaches_to_in_flight_job(self):
+        first, first_enqueued = self._submit(self.payload)
+        second, second_enqueued = self._submit(self.payload)
+
+        self.assertEqual((first_enqueued, second_enqueued), (1, 0))
+        self.assertEqual(second.status_code, 202)
+        self.assertTrue(second.json()["deduplicated"])
+        self.assertEqual(second.json()["job_id"], first.json()["job_id"])
+
+    def test_completed_duplicate_returns_record_and_failed_job_is_retried(self):
+        first, _ = self._submit(self.payload)
+        record_id = uuid.uuid4()
+        with Session(self.engine) as session:
+            job = session.get(ResumeJob, uuid.UUID(first.json()["job_id"]))
+            job.status = JOB_STATUS_COMPLETED
+            job.record_id = record_id
+            session.add(job)
+            session.commit()
+
+        completed, enqueued = self._submit(self.payload)
+        self.assertEqual((completed.status_code, enqueued), (200, 0))
+        self.assertEqual(completed.json()["record_id"], str(record_id))
+
+        with Session(self.engine) as session:
+            job = session.get(ResumeJob, uuid.UUID(first.json()["job_id"]))
+            job.status = JOB_STATUS_FAILED
+            session.add(job)
+            session.commit()
+
+        retried, enqueued = self._submit(self.payload)
+        self.assertEqual(enqueued, 1)
+        self.assertFalse(retried.json()["deduplicated"])
+
+    def test_matching_record_is_returned_without_its_job(self):
+        hash_value = request_hash(ResumeGenerationRequest.model_validate(self.payload))
+        with Session(self.engine) as session:
+            record = ResumeRecord(
+                user_id=self.user.id,
+                request_hash=hash_value,
+                input_payload=self.payload["resume_input"],
+                markdown_content="# Asha Rao",
+            )
+            session.add(record)
+            session.commit()
+            record_id = str(record.id)
+
+        response, enqueued = self._submit(self.payload)
+
+        self.assertEqual((response.status_code, enqueued), (200, 0))
+        self.assertTrue(response.json()["deduplicated"])
+        self.assertEqual(response.json()["record_id"], record_id)
+        status_response = self.client.get(f"/api/v1/resumes/jobs/{response.json()['job_id']}")
+        self.assertEqual(status_response.json()["status"], JOB_STATUS_COMPLETED)
+        self.assertEqual(status_response.json()["result_payload"]["markdown"], "# Asha Rao")
+
+    def test_deduplication_can_be_disabled_per_request_and_per_user(self):
+        self._submit(self.payload)
+
+        _, enqueued = self._submit({**self.payload, "deduplicate": False})
+        self.assertEqual(enqueued, 1)
+
+        self.user.deduplicate_jobs = False
+        _, enqueued = self._submit(self.payload)
+        self.assertEqual(enqueued, 1)
+
+        _, enqueued = self._submit({**self.payload, "deduplicate": True})
+        self.assertEqual(enqueued, 0)
+
+    def test_racing_submissions_create_one_in_flight_job(self):
+        # Both requests pass the duplicate check before either has inserted its job.
+        with mock.patch("src.api.routers.resumes.find_duplicate_job", return_value=None):
+            first, first_enqueued = self._submit(self.payload)
+            second, second_enqueued = self._submit(self.payload)
+
+        self.assertEqual((first_enqueued, second_enqueued), (1, 0))
+        self.assertTrue(second.json()["deduplicated"])
+        self.assertEqual(second.json()["job_id"], first.json()["job_id"])
+        with Session(self.engine) as session:
+            self.assertEqual(len(session.exec(select(ResumeJob)).all()), 1)
+
+    def test_job_outside_the_window_releases_its_claim(self):
+        first, _ = self._submit(self.payload)
+        with Session(self.engine) as session:
+            job = session.get(ResumeJob, uuid.UUID(first.json()["job_id"]))
+            job.created_at = job.created_at - timedelta(days=1)
+            session.add(job)
+            session.commit()
+
+        second, enqueued = self._submit(self.payload)
+
+        self.assertEqual(enqueued, 1)
+        self.assertNotEqual(second.json()["job_id"], first.json()["job_id"])
+
+    def test_migration_upgrades_a_pre_dedup_database(self):
+        engine = create_engine(f"sqlite:///{self._tmp.name}/old.db")
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE users (id CHAR(32) PRIMARY KEY, email VARCHAR(255))"))
+            connection.execute(text("CREATE TABLE resume_jobs (id CHAR(32) PRIMARY KEY, user_id CHAR(32), status VARCHAR(32))"))
+            connection.execute(text("CREATE TABLE resume_records (id CHAR(32) PRIMARY KEY, user_id CHAR(32))"))
+            connection.execute(text("INSERT INTO users (id, email) VALUES ('u1', 'old@example.com')"))
+
+        self.assertEqual(
+            migrate_dedup(engine),
+            ["users.deduplicate_jobs", "resume_jobs.request_hash", "resume_jobs.dedup_key", "resume_records.request_hash"],
+        )
+        self.assertEqual(migrate_dedup(engine), [])
+
+        indexes = {index["name"]: index for index in inspect(engine).get_indexes("resume_jobs")}
+        self.assertTrue(indexes["uq_resume_jobs_in_flight_dedup"]["unique"])
+        with engine.connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT deduplicate_jobs FROM users")).scalar(), 1)
+        engine.dispose()
+
+
+class UsageAccountingTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{self._tmp.name}/usage.db",
+            connect_args={"check_same_thread": False},
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.user = User(email="usage@example.com", hashed_password="x")
+        with Session(self.engine) as session:
+            session.add(self.user)
+            session.commit()
+            session.refresh(self.user)
+
+        def _session():
+            with Session(self.engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = _session
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def test_jobs_roll_up_per_user_and_day(self):
+        summary = {"calls": 3, "failed_calls": 1, "prompt_tokens": 900, "output_tokens": 300, "total_tokens": 1200}
+        with Session(self.engine) as session:
+            record_job_usage(session, self.user.id, summary)
+            record_job_usage(session, self.user.id, {**summary, "wall_ms": 2500})
+
+        response = self.client.get("/api/v1/usage/daily")
+
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]["jobs"], rows[0]["calls"], rows[0]["total_tokens"]), (2, 6, 2400))
+        self.assertEqual(rows[0]["wall_ms"], 2500)
+
+    def test_concurrent_sessions_do_not_lose_increments(self):
+        summary = {"calls": 2, "total_tokens": 100}
+        with Session(self.engine) as first, Session(self.engine) as second:
+            record_job_usage(first, self.user.id, summary)
+            # The second session holds a stale copy of the row while the first one writes.
+            second.exec(select(UsageDaily).where(UsageDaily.user_id == self.user.id)).one()
+            record_job_usage(first, self.user.id, summary)
+            record_job_usage(second, self.user.id, summary)
+
+        def _record_many():
+            with Session(self.engine) as session:
+                for _ in range(10):
+                    record_job_usage(session, self.user.id, summary)
+
+        threads = [threading.Thread(target=_record_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with Session(self.engine) as session:
+            row = session.exec(select(UsageDaily).where(UsageDaily.user_id == self.user.id)).one()
+        self.assertEqual((row.jobs, row.calls, row.total_tokens), (43, 86, 4300))
+
+
+class BatchGenerationTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{self._tmp.name}/batch.db",
+            connect_args={"check_same_thread": False},
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.user = User(email="batch@example.com", hashed_password="x")
+        with Session(self.engine) as session:
+            session.add(self.user)
+            session.commit()
+            session.refresh(self.user)
+
+        def _session():
+            with Session(self.engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = _session
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def test_one_profile_produces_a_record_per_target(self):
+        payload = {
+            "resume_input": {"personal_info": {"full_name": "test", "email": "test"}, "skills": ["test"]},
+            "targets": [{"target_role": "test", "job_description": "test"}, {"target_company": "test"}],
+        }
+        settings = mock.Mock(storage_dir=self._tmp.name)
+        with mock.patch("src.api.routers.resumes.enqueue_resume_batch_job", return_value="local-thread"):
+            queued = self.client.post("/api/v1/resumes/batch-jobs", json=payload)
+        with mock.patch("src.api.worker_tasks.get_engine", return_value=self.engine), mock.patch(
+            "src.api.worker_tasks.get_api_settings", return_value=settings
+        ):
+            run_resume_batch_job(queued.json()["job_id"])
+
+        response = self.client.get(f"/api/v1/resumes/batch-jobs/{queued.json()['job_id']}")
+
+        self.assertEqual((queued.status_code, queued.json()["targets"]), (202, 2))
+        self.assertEqual(response.json()["status"], JOB_STATUS_COMPLETED)
+        self.assertEqual(len(response.json()["record_ids"]), 2)
+        with Session(self.engine) as session:
+            records = session.exec(select(ResumeRecord)).all()
+        self.assertEqual(sorted(record.input_payload["target_role"] for record in records), ["", "test"])
+        self.assertTrue(all(record.pdf_path and not record.request_hash for record in records))
+        self.assertTrue(all("calls" in record.diagnostics["usage"] for record in records))
+        self.assertEqual({record.diagnostics["batch_job_id"] for record in records}, {queued.json()["job_id"]})
+
+        standalone = {"resume_input": {**payload["resume_input"], **payload["targets"][0]}}
+        with mock.patch("src.api.routers.resumes.enqueue_resume_job", return_value="test") as enqueue:
+            resubmitted = self.client.post("/api/v1/resumes/jobs", json=standalone)
+        self.assertFalse(resubmitted.json()["deduplicated"])
+        self.assertEqual(enqueue.call_count, 1)
+
+    def test_targets_are_required(self):
+        payload = {"resume_input": {"personal_info": {"full_name": "Asha"}}, "targets": []}
+
+        response = self.client.post("/api/v1/resumes/batch-jobs", json=payload)
+
+        self.assertEqual(response.status_code, 422)
+
+
+class RecordTemplateTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{self._tmp.name}/templates.db",
+            connect_args={"check_same_thread": False},
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.user = User(email="templates@example.com", hashed_password="x")
+        runtime = get_resume_runtime()
+        resume_input = {
+            "personal_info": {"full_name": "Asha Rao", "email": "asha@example.com"},
+            "target_role": "Backend Engineer",
+            "skills": ["Python", "PostgreSQL"],
+        }
+        output = runtime.generator.generate_local(to_domain_resume_input(ResumeInputPayload.model_validate(resume_input)))
+        with Session(self.engine) as session:
+            session.add(self.user)
+            session.commit()
+            session.refresh(self.user)
+            self.record = ResumeRecord(
+                user_id=self.user.id,
+                template_key="classic",
+                input_payload=resume_input,
+                output_payload=from_domain_resume_output(output).model_dump(),
+                markdown_content="stored classic markdown",
+            )
+            session.add(self.record)
+            session.commit()
+            session.refresh(self.record)
+            session.refresh(self.user)
+
+        def _session():
+            with Session(self.engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = _session
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        self._settings = mock.patch(
+            "src.api.routers.resumes.get_api_settings",
+            return_value=mock.Mock(storage_dir=self._tmp.name),
+        )
+        self._settings.start()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self._settings.stop()
+        app.dependency_overrides.clear()
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def test_switching_templates_renders_once_then_serves_the_cache(self):
+        url = f"/api/v1/resumes/records/{self.record.id}/templates"
+
+        first = self.client.get(f"{url}/compact").json()
+        second = self.client.get(f"{url}/compact").json()
+        original = self.client.get(f"{url}/classic").json()
+
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(first["markdown"], second["markdown"])
+        self.assertIn("Asha Rao", first["markdown"])
+        self.assertEqual(original["markdown"], "stored classic markdown")
+
+        with mock.patch("src.api.runtime.ResumePdfRenderer.render", wraps=get_resume_runtime().pdf_renderer.render) as render:
+            pdf = self.client.get(first["pdf_download_url"])
+            again = self.client.get(f"{url}/compact/pdf")
+        self.assertTrue(pdf.content.startswith(b"%PDF"))
+        self.assertEqual(pdf.content, again.content)
+        self.assertEqual(render.call_count, 1)
+
+    def test_unknown_template_is_rejected(self):
+        response = self.client.get(f"/api/v1/resumes/records/{self.record.id}/templates/fancy")
+
+        self.assertEqual(response.status_code, 422)
+
 
 if __name__ == "__main__":
     unittest.main()
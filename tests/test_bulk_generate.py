@@ -0,0 +1,156 @@
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+import contextlib
+import io
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from src.api.bulk_generate import CHECKPOINT_FILE, BulkOptions, main, read_checkpoint, run_bulk
+
+
+def _document(name: str) -> dict:
+    return {
+        "id": name,
+        "personal_info": {"full_name": name.title(), "email": f"{name}@example.com", "location": "Remote"},
+        "target_role": "Backend Engineer",
+        "skills": ["Python", "PostgreSQL"],
+        "experiences": [
+            {
+                "title": "Engineer",
+                "company": "Acme",
+                "duration": "2021 - Present",
+                "bullet_points": ["Built billing APIs"],
+            }
+        ],
+    }
+
+
+class _InlineExecutor(Executor):
+    def __init__(self, crash: bool):
+        self.crash = crash
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        if self.crash:
+            future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        else:
+            future.set_result(fn(*args, **kwargs))
+        return future
+
+
+class BulkGenerateTests(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.root = Path(self._temp.name)
+        self.output = self.root / "out"
+        self.source = self.root / "inputs.jsonl"
+        lines = [json.dumps(_document(name)) for name in ("asha", "ben", "chen")]
+        lines.insert(1, json.dumps({"id": "broken", "personal_info": "not an object"}))
+        self.source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def test_inline_run_writes_outputs_and_checkpoints_every_item(self):
+        summary = run_bulk(str(self.source), str(self.output), BulkOptions(generation_mode="local", embed_fonts=False))
+
+        self.assertEqual((summary["completed"], summary["failed"], summary["skipped"]), (3, 1, 0))
+        self.assertTrue((self.output / "asha.pdf").read_bytes().startswith(b"%PDF"))
+        self.assertIn("Asha", (self.output / "asha.md").read_text(encoding="utf-8"))
+        record = json.loads((self.output / "chen.json").read_text(encoding="utf-8"))
+        self.assertEqual(record["diagnostics"]["mode"], "local")
+        self.assertEqual(read_checkpoint(self.output)["broken"]["status"], "failed")
+        self.assertGreaterEqual(summary["latency_ms"]["max"], summary["latency_ms"]["p50"])
+
+    def test_rerun_resumes_after_interruption(self):
+        seen = []
+
+        def interrupt_after_first(result):
+            seen.append(result["id"])
+            raise KeyboardInterrupt
+
+        options = BulkOptions(generation_mode="local", write_pdf=False)
+        with self.assertRaises(KeyboardInterrupt):
+            run_bulk(str(self.source), str(self.output), options, on_result=interrupt_after_first)
+        with (self.output / CHECKPOINT_FILE).open("a", encoding="utf-8") as checkpoint:
+            checkpoint.write('{"id": "ben", "sta')
+
+        summary = run_bulk(str(self.source), str(self.output), options)
+
+        self.assertEqual(seen, ["asha"])
+        self.assertEqual((summary["skipped"], summary["completed"], summary["failed"]), (1, 2, 1))
+        self.assertEqual(
+            sorted(item for item, entry in read_checkpoint(self.output).items() if entry["status"] == "completed"),
+            ["asha", "ben", "chen"],
+        )
+
+    def test_process_pool_run(self):
+        summary = run_bulk(
+            str(self.source),
+            str(self.output),
+            BulkOptions(generation_mode="local", write_pdf=False),
+            workers=2,
+        )
+
+        self.assertEqual((summary["completed"], summary["failed"]), (3, 1))
+        self.assertEqual(sorted(path.stem for path in self.output.glob("*.md")), ["asha", "ben", "chen"])
+
+    def test_bad_documents_fail_alone_and_repeated_ids_stay_apart(self):
+        lines = [
+            json.dumps(_document("asha")),
+            '{"id": "cut", "personal_info":',
+            json.dumps([_document("list")]),
+            json.dumps(_document("asha")),
+            json.dumps({**_document("dana"), "id": "dana x"}),
+            json.dumps({**_document("dana"), "id": "dana_x"}),
+        ]
+        self.source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        options = BulkOptions(generation_mode="local", write_pdf=False)
+
+        summary = run_bulk(str(self.source), str(self.output), options, workers=1)
+
+        self.assertEqual((summary["completed"], summary["failed"]), (4, 2))
+        checkpoint = read_checkpoint(self.output)
+        self.assertEqual(sorted(checkpoint), ["asha", "asha-2", "dana x", "dana_x-2", "inputs-000002", "inputs-000003"])
+        self.assertIn("Invalid JSON", checkpoint["inputs-000002"]["error"])
+        self.assertIn("got list", checkpoint["inputs-000003"]["error"])
+        self.assertEqual(
+            sorted(path.stem for path in self.output.glob("*.md")),
+            ["asha", "asha-2", "dana_x", "dana_x-2"],
+        )
+
+        rerun = run_bulk(str(self.source), str(self.output), options)
+        self.assertEqual((rerun["skipped"], rerun["failed"], rerun["completed"]), (4, 2, 0))
+
+    def test_broken_pool_fails_its_items_and_the_run_continues_on_a_new_pool(self):
+        pools = []
+
+        def factory(workers, options):
+            pools.append(_InlineExecutor(crash=not pools))
+            return pools[-1]
+
+        options = BulkOptions(generation_mode="local", write_pdf=False)
+        summary = run_bulk(str(self.source), str(self.output), options, workers=1, executor_factory=factory)
+
+        self.assertEqual(len(pools), 2)
+        self.assertEqual((summary["completed"], summary["failed"]), (2, 2))
+        checkpoint = read_checkpoint(self.output)
+        self.assertIn("BrokenProcessPool", checkpoint["asha"]["error"])
+        self.assertIn("BrokenProcessPool", checkpoint["broken"]["error"])
+        self.assertEqual([checkpoint[name]["status"] for name in ("ben", "chen")], ["completed", "completed"])
+
+        rerun = run_bulk(str(self.source), str(self.output), options, workers=1, executor_factory=factory)
+        self.assertEqual((rerun["skipped"], rerun["completed"], rerun["failed"]), (2, 1, 1))
+
+    def test_unknown_template_is_rejected_before_any_work(self):
+        with contextlib.redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit):
+            main([str(self.source), "--output", str(self.output), "--template", "fancy"])
+
+        self.assertIn("invalid choice: 'fancy'", stderr.getvalue())
+        self.assertFalse(self.output.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
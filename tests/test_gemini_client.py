@@ -0,0 +1,800 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import tempfile
+import threading
+import time
+import unittest
+
+import httpx
+
+from src.services.ai.deadline import Deadline, DeadlineExceededError
+from src.services.ai.gemini_client import GeminiClient, GeminiUnavailableError
+from src.services.ai.hedging import HedgePolicy
+from src.services.ai.key_pool import ApiKeyPool
+from src.services.ai.model_health import ModelHealthRegistry
+from src.services.ai.model_router import ModelRouter, parse_model_routes
+from src.services.ai.rate_limiter import InProcessRateLimiter, RateLimiter, build_rate_limiter
+from src.services.ai.response_cache import (
+    CacheBackend,
+    DiskCacheBackend,
+    MemoryCacheBackend,
+    ResponseCache,
+)
+from src.services.ai.structured_output import build_response_schema, schema_violations
+from src.services.ai.usage import UsageTracker, track_usage
+
+
+def _gemini_body(text: str) -> dict:
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self._body = body
+        self.text = json.dumps(body)
+
+    def json(self):
+        return self._body
+
+
+class _FakeSession:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return _FakeResponse(200, _gemini_body("cached text"))
+
+
+class GeminiResponseCacheTests(unittest.TestCase):
+    def _generate(self, client: GeminiClient, prompt: str = "user") -> str:
+        return client.generate_text(
+            system_prompt="sys",
+            user_prompt=prompt,
+            temperature=0.3,
+            max_output_tokens=200,
+            response_mime_type="application/json",
+        )
+
+    def test_identical_prompts_hit_the_cache(self):
+        client = GeminiClient(api_key="key", cache=ResponseCache(MemoryCacheBackend()))
+        client.session = _FakeSession()
+
+        self.assertEqual(self._generate(client), "cached text")
+        self.assertEqual(client.get_last_call_details()["cache"], "miss")
+        self.assertEqual(self._generate(client), "cached text")
+        details = client.get_last_call_details()
+        self.assertEqual(details["cache"], "hit")
+        self.assertEqual(details["model"], "gemini-2.5-flash")
+        self.assertEqual(client.session.calls, 1)
+
+        self._generate(client, prompt="different")
+        self.assertEqual(client.session.calls, 2)
+
+    def test_concurrent_identical_prompts_share_one_request(self):
+        client = GeminiClient(api_key="key", cache=ResponseCache(MemoryCacheBackend()))
+        client.session = _FakeSession(delay=0.1)
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(lambda _: self._generate(client), range(6)))
+
+        self.assertEqual(results, ["cached text"] * 6)
+        self.assertEqual(client.session.calls, 1)
+
+    def test_memory_backend_evicts_expired_and_oldest_entries(self):
+        backend = MemoryCacheBackend(max_entries=2, ttl_seconds=60)
+        backend.set("a", {"text": "1"})
+        backend.set("b", {"text": "2"})
+        backend.get("a")
+        backend.set("c", {"text": "3"})
+
+        self.assertIsNotNone(backend.get("a"))
+        self.assertIsNone(backend.get("b"))
+        self.assertIsNotNone(backend.get("c"))
+
+    def test_cache_backend_requires_get_and_set(self):
+        class _GetOnlyBackend(CacheBackend):
+            def get(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            _GetOnlyBackend()
+
+    def test_disk_backend_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = DiskCacheBackend(directory, ttl_seconds=60)
+            backend.set("abcdef", {"text": "stored"})
+            self.assertEqual(backend.get("abcdef"), {"text": "stored"})
+            self.assertIsNone(backend.get("missing"))
+
+
+class _RoutingSession:
+    def __init__(self, statuses: dict):
+        self.statuses = statuses
+        self.urls = []
+        self.timeouts = []
+        self.payloads = []
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        self.urls.append(url)
+        self.timeouts.append(timeout)
+        self.payloads.append(json)
+        for fragment, status_code in self.statuses.items():
+            if fragment in url:
+                return _FakeResponse(status_code, {"error": {"message": str(status_code)}})
+        return _FakeResponse(200, _gemini_body("ok"))
+
+
+class _MeteredSession(_RoutingSession):
+    def post(self, url, headers=None, json=None, timeout=None):
+        response = super().post(url, headers=headers, json=json, timeout=timeout)
+        if response.status_code == 200:
+            response._body = {
+                **_gemini_body("ok"),
+                "usageMetadata": {"promptTokenCount": 120, "candidatesTokenCount": 30, "totalTokenCount": 150},
+            }
+        return response
+
+
+class UsageTrackingTests(unittest.TestCase):
+    def _generate(self, client: GeminiClient, prompt: str = "u") -> str:
+        return client.generate_text(system_prompt="s", user_prompt=prompt, temperature=0.1, max_output_tokens=50)
+
+    def test_tokens_latency_and_fallbacks_are_recorded_per_call(self):
+        client = GeminiClient(api_key="key", max_retries=0, cache=ResponseCache(MemoryCacheBackend()))
+        client.session = _MeteredSession({"v1beta/models/gemini-2.5-flash:": 404})
+
+        with track_usage() as tracker:
+            self._generate(client)
+            self._generate(client)
+
+        usage = tracker.summary()
+        self.assertEqual(client.get_last_call_details()["cache"], "hit")
+        self.assertEqual((usage["calls"], usage["failed_calls"], usage["fallbacks"]), (2, 1, 1))
+        self.assertEqual(usage["cache_hits"], 1)
+        self.assertEqual((usage["prompt_tokens"], usage["output_tokens"], usage["total_tokens"]), (120, 30, 150))
+        self.assertEqual(usage["models"]["gemini-2.5-flash"]["total_tokens"], 150)
+        self.assertEqual(usage["attempts"], 2)
+
+    def test_calls_outside_a_tracker_are_not_recorded(self):
+        client = GeminiClient(api_key="key", max_retries=0)
+        client.session = _MeteredSession({})
+        tracker = UsageTracker()
+
+        self._generate(client)
+        with track_usage(tracker):
+            pass
+
+        self.assertEqual(tracker.summary()["calls"], 0)
+
+
+class ModelHealthTests(unittest.TestCase):
+    def _generate(self, client: GeminiClient) -> str:
+        return client.generate_text(system_prompt="s", user_prompt="u", temperature=0.1, max_output_tokens=50)
+
+    def test_dead_model_endpoint_is_skipped_on_later_calls(self):
+        client = GeminiClient(api_key="key", max_retries=0, health_registry=ModelHealthRegistry())
+        client.session = _RoutingSession({"v1beta/models/gemini-2.5-flash:": 404})
+
+        self._generate(client)
+        self.assertEqual(len(client.session.urls), 2)
+
+        client.session.urls.clear()
+        self._generate(client)
+        self.assertEqual(len(client.session.urls), 1)
+        self.assertIn("/v1/models/gemini-2.5-flash:", client.session.urls[0])
+
+    def test_circuit_opens_after_sustained_rate_limits(self):
+        registry = ModelHealthRegistry(failure_threshold=2, cooldown_seconds=60)
+        client = GeminiClient(api_key="key", max_retries=0, health_registry=registry)
+        client.session = _RoutingSession({"generativelanguage": 429})
+
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                self._generate(client)
+
+        self.assertFalse(client.is_available())
+        calls_before = len(client.session.urls)
+        with self.assertRaises(GeminiUnavailableError):
+            self._generate(client)
+        self.assertEqual(len(client.session.urls), calls_before)
+
+
+class _KeyQuotaSession:
+    def __init__(self, exhausted_keys=(), retry_delay="30s"):
+        self.exhausted_keys = set(exhausted_keys)
+        self.retry_delay = retry_delay
+        self.keys = []
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        key = headers["x-goog-api-key"]
+        self.keys.append(key)
+        if key in self.exhausted_keys:
+            body = {"error": {"message": "quota", "details": [{"retryDelay": self.retry_delay}]}}
+            return _FakeResponse(429, body)
+        return _FakeResponse(200, _gemini_body("ok"))
+
+
+class ApiKeyPoolTests(unittest.TestCase):
+    def _generate(self, client: GeminiClient, prompt: str = "u") -> str:
+        return client.generate_text(system_prompt="s", user_prompt=prompt, temperature=0.1, max_output_tokens=50)
+
+    def test_requests_are_spread_across_keys(self):
+        client = GeminiClient(api_key="key-a", max_retries=0, key_pool=ApiKeyPool(["key-a", "key-b"]))
+        client.session = _KeyQuotaSession()
+
+        for index in range(4):
+            self._generate(client, prompt=f"u{index}")
+
+        self.assertEqual(sorted(client.session.keys), ["key-a", "key-a", "key-b", "key-b"])
+
+    def test_rate_limited_key_is_rotated_out_without_waiting(self):
+        pool = ApiKeyPool(["key-a", "key-b"])
+        client = GeminiClient(api_key="key-a", max_retries=1, key_pool=pool)
+        client.session = _KeyQuotaSession(exhausted_keys={"key-a"})
+
+        started = time.monotonic()
+        self.assertEqual(self._generate(client), "ok")
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(client.session.keys, ["key-a", "key-b"])
+
+        client.session.keys.clear()
+        self._generate(client, prompt="again")
+        self.assertEqual(client.session.keys, ["key-b"])
+
+        snapshot = client.usage_snapshot()["api_keys"]
+        first = next(value for label, value in snapshot.items() if label.endswith("...ey-a"))
+        self.assertEqual(first["rate_limited"], 1)
+        self.assertTrue(first["cooling_down"])
+        self.assertNotIn("key-a", json.dumps(snapshot))
+
+    def test_retry_after_hint_sets_the_key_cooldown(self):
+        pool = ApiKeyPool(["key-a"], default_cooldown_seconds=0)
+        key = pool.acquire("model")
+        pool.release(key, 429, retry_after_seconds=30, scope="model")
+
+        self.assertGreater(pool.seconds_until_available("model"), 25)
+        self.assertEqual(pool.seconds_until_available("other-model"), 0)
+
+    def test_first_attempt_waits_for_a_cooling_key(self):
+        url = "https://example.test/models/gemini-2.5-flash:generateContent"
+        pool = ApiKeyPool(["key-a"], default_cooldown_seconds=0)
+        pool.release(pool.acquire(url), 429, retry_after_seconds=0.3, scope=url)
+        client = GeminiClient(api_key="key-a", max_retries=0, key_pool=pool)
+        client.session = _KeyQuotaSession()
+
+        started = time.monotonic()
+        response, attempts = client._post_with_retry(url, {})
+
+        self.assertEqual((response.status_code, attempts), (200, 1))
+        self.assertGreaterEqual(time.monotonic() - started, 0.25)
+
+    def test_configured_quota_prefers_key_with_most_headroom(self):
+        pool = ApiKeyPool(["key-a", "key-b"], requests_per_minute=10)
+        for _ in range(3):
+            pool.release(pool.acquire(), 200)
+        snapshot = pool.snapshot()
+
+        self.assertEqual(sorted(item["requests_last_minute"] for item in snapshot.values()), [1, 2])
+        self.assertEqual(sum(item["successes"] for item in snapshot.values()), 3)
+
+
+class ModelRoutingTests(unittest.TestCase):
+    def test_routed_model_is_tried_before_models_with_a_better_track_record(self):
+        client = GeminiClient(api_key="key", max_retries=0)
+        client.session = _RoutingSession({})
+        client.generate_text(system_prompt="s", user_prompt="u", temperature=0.1, max_output_tokens=50)
+
+        client.generate_text(
+            system_prompt="s",
+            user_prompt="other",
+            temperature=0.1,
+            max_output_tokens=50,
+            model="gemini-2.0-flash-lite",
+        )
+
+        self.assertIn("/models/gemini-2.0-flash-lite:", client.session.urls[-1])
+        self.assertEqual(client.get_last_call_details()["model"], "gemini-2.0-flash-lite")
+
+    def test_routes_parse_and_promote_up_the_tier_ladder(self):
+        routes = parse_model_routes("skills=gemini-2.0-flash-lite, experience=gemini-2.5-pro|gemini-2.5-flash,bad")
+        router = ModelRouter(routes=routes, default_model="gemini-2.5-flash")
+
+        self.assertEqual(routes["experience"], ("gemini-2.5-pro", "gemini-2.5-flash"))
+        self.assertNotIn("bad", routes)
+        self.assertEqual(router.route("skills"), "gemini-2.0-flash-lite")
+        self.assertEqual(router.route("skills", promote=True), "gemini-2.0-flash")
+        self.assertEqual(router.route("summary"), "gemini-2.5-flash")
+        self.assertEqual(router.promote("gemini-2.5-pro"), "gemini-2.5-pro")
+
+    def test_repeated_quality_failures_promote_the_task(self):
+        router = ModelRouter()
+        for _ in range(4):
+            router.record_quality("skills", "gemini-2.0-flash-lite", passed=False)
+
+        self.assertEqual(router.route("skills"), "gemini-2.0-flash")
+        self.assertEqual(router.route("certifications"), "gemini-2.0-flash-lite")
+        self.assertEqual(router.snapshot()["quality"]["skills@gemini-2.0-flash-lite"]["failures"], 4)
+
+    def test_live_health_picks_the_fastest_available_alternative(self):
+        registry = ModelHealthRegistry(failure_threshold=1)
+        router = ModelRouter(routes={"experience": ("model-a", "model-b", "model-c")}, health_registry=registry)
+        registry.record_failure("model-a", "endpoint", 503)
+        registry.record_success("model-b", "endpoint", 2.0)
+        registry.record_success("model-c", "endpoint", 0.5)
+
+        self.assertEqual(router.route("experience"), "model-c")
+
+
+class RateLimiterTests(unittest.TestCase):
+    def _generate(self, client: GeminiClient, deadline: Deadline | None = None) -> str:
+        return client.generate_text(
+            system_prompt="s", user_prompt="u", temperature=0.1, max_output_tokens=50, deadline=deadline
+        )
+
+    def test_bucket_admits_up_to_capacity_then_reports_wait(self):
+        limiter = InProcessRateLimiter(requests_per_minute=2, tokens_per_minute=1000)
+
+        self.assertEqual(limiter.reserve(400), 0)
+        self.assertEqual(limiter.reserve(400), 0)
+        self.assertGreater(limiter.reserve(10), 0)
+        self.assertFalse(limiter.acquire(10, timeout_seconds=0))
+
+        snapshot = limiter.snapshot()
+        self.assertEqual(snapshot["backend"], "memory")
+        self.assertLess(snapshot["requests_fill"], 0.1)
+        self.assertLess(snapshot["tokens_fill"], 0.3)
+        self.assertEqual(snapshot["throttled"], 1)
+
+    def test_token_budget_counts_prompt_and_output_budget(self):
+        limiter = InProcessRateLimiter(tokens_per_minute=100)
+        client = GeminiClient(api_key="key", max_retries=0, rate_limiter=limiter)
+        client.session = _FakeSession()
+
+        self._generate(client)
+
+        self.assertLessEqual(limiter.snapshot()["tokens_available"], 50)
+
+    def test_retries_keep_only_the_tokens_the_successful_attempt_used(self):
+        class _FlakySession:
+            def __init__(self):
+                self.statuses = [503, 200]
+
+            def post(self, url, headers=None, json=None, timeout=None):
+                status_code = self.statuses.pop(0)
+                if status_code != 200:
+                    return _FakeResponse(status_code, {"error": {"message": "unavailable"}})
+                return _FakeResponse(200, {**_gemini_body("ok"), "usageMetadata": {"totalTokenCount": 20}})
+
+        limiter = InProcessRateLimiter(tokens_per_minute=1000)
+        client = GeminiClient(api_key="key", max_retries=1, rate_limiter=limiter)
+        client.session = _FlakySession()
+
+        self.assertEqual(self._generate(client), "ok")
+        self.assertEqual(client.get_last_call_details()["attempts"], 2)
+        self.assertGreaterEqual(limiter.snapshot()["tokens_available"], 975)
+
+    def test_reading_the_bucket_does_not_use_a_request(self):
+        limiter = InProcessRateLimiter(requests_per_minute=2)
+        for _ in range(3):
+            limiter.snapshot()
+
+        self.assertEqual(limiter.reserve(0), 0)
+        self.assertEqual(limiter.reserve(0), 0)
+
+    def test_queued_call_waits_for_capacity(self):
+        limiter = InProcessRateLimiter(requests_per_minute=120)
+        limiter.reserve(0)
+        limiter._state.requests = 0.0
+        client = GeminiClient(api_key="key", max_retries=0, rate_limiter=limiter)
+        client.session = _FakeSession()
+
+        started = time.monotonic()
+        self.assertEqual(self._generate(client), "cached text")
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        self.assertEqual(client.session.calls, 1)
+
+    def test_call_fails_without_upstream_request_when_capacity_misses_deadline(self):
+        limiter = InProcessRateLimiter(requests_per_minute=1)
+        limiter.reserve(0)
+        limiter._state.requests = 0.0
+        client = GeminiClient(api_key="key", max_retries=0, rate_limiter=limiter)
+        client.session = _FakeSession()
+
+        with self.assertRaises(DeadlineExceededError):
+            self._generate(client, deadline=Deadline.after(0.5))
+        self.assertEqual(client.session.calls, 0)
+        self.assertEqual(client.get_last_call_details()["error"], "deadline_exceeded")
+
+    def test_limiter_is_disabled_without_limits_and_local_without_redis(self):
+        self.assertIsNone(build_rate_limiter(0, 0))
+        self.assertIsInstance(build_rate_limiter(10, 0, redis_url=""), InProcessRateLimiter)
+
+    def test_rate_limiter_backends_must_implement_reserve_and_state(self):
+        class _ReserveOnlyLimiter(RateLimiter):
+            def reserve(self, tokens):
+                return 0.0
+
+        with self.assertRaises(TypeError):
+            _ReserveOnlyLimiter(requests_per_minute=1)
+
+
+class _SlowEndpointSession:
+    def __init__(self, slow_fragment: str, delay: float):
+        self.slow_fragment = slow_fragment
+        self.delay = delay
+        self.urls = []
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        self.urls.append(url)
+        if self.slow_fragment in url:
+            time.sleep(self.delay)
+            return _FakeResponse(200, _gemini_body("slow"))
+        return _FakeResponse(200, _gemini_body("fast"))
+
+
+class HedgingTests(unittest.TestCase):
+    SLOW_ENDPOINT = "v1beta/models/gemini-2.5-flash:"
+
+    def _client(self, policy: HedgePolicy) -> GeminiClient:
+        client = GeminiClient(api_key="key", model="gemini-2.5-flash", max_retries=0, hedge_policy=policy)
+        client.session = _SlowEndpointSession(self.SLOW_ENDPOINT, delay=0.6)
+        return client
+
+    def _generate(self, client: GeminiClient) -> str:
+        return client.generate_text(system_prompt="s", user_prompt="u", temperature=0.1, max_output_tokens=50)
+
+    def test_hedge_delay_follows_the_latency_percentile(self):
+        policy = HedgePolicy(percentile=90, min_samples=10, min_delay_seconds=0)
+        for latency in range(1, 10):
+            policy.record_latency("model", latency / 10)
+        self.assertIsNone(policy.hedge_delay("model"))
+
+        policy.record_latency("model", 5.0)
+        self.assertEqual(policy.hedge_delay("model"), 5.0)
+        policy.record_latency("model", 0.1)
+        self.assertEqual(policy.hedge_delay("model"), 0.9)
+
+    def test_slow_call_is_hedged_and_the_faster_response_wins(self):
+        policy = HedgePolicy(min_samples=1, min_delay_seconds=0, max_hedge_ratio=1.0)
+        policy.record_latency("gemini-2.5-flash", 0.05)
+        client = self._client(policy)
+
+        started = time.monotonic()
+        self.assertEqual(self._generate(client), "fast")
+        self.assertLess(time.monotonic() - started, 0.5)
+
+        details = client.get_last_call_details()
+        self.assertEqual((details["hedges"], details["hedge_wins"]), (1, 1))
+        self.assertIn("/v1/models/gemini-2.5-flash:", client.session.urls[1])
+        self.assertEqual(policy.snapshot()["hedge_wins"], 1)
+
+    def test_hedge_rate_cap_keeps_slow_call_unhedged(self):
+        policy = HedgePolicy(min_samples=1, min_delay_seconds=0, max_hedge_ratio=0)
+        policy.record_latency("gemini-2.5-flash", 0.05)
+        client = self._client(policy)
+
+        self.assertEqual(self._generate(client), "slow")
+        self.assertEqual(len(client.session.urls), 1)
+        self.assertEqual(client.get_last_call_details()["hedges"], 0)
+
+
+class DeadlineTests(unittest.TestCase):
+    def test_request_timeout_is_clamped_to_remaining_budget(self):
+        client = GeminiClient(api_key="key", timeout_seconds=60, max_retries=2)
+        client.session = _RoutingSession({})
+
+        client.generate_text(
+            system_prompt="s",
+            user_prompt="u",
+            temperature=0.1,
+            max_output_tokens=10,
+            deadline=Deadline.after(5),
+        )
+
+        self.assertLessEqual(client.session.timeouts[0], 5)
+
+    def test_retries_are_skipped_when_backoff_would_exceed_budget(self):
+        client = GeminiClient(api_key="key", timeout_seconds=60, max_retries=3)
+        client.session = _RoutingSession({"generativelanguage": 503})
+
+        with self.assertRaises(RuntimeError):
+            client.generate_text(
+                system_prompt="s",
+                user_prompt="u",
+                temperature=0.1,
+                max_output_tokens=10,
+                deadline=Deadline.after(1.2),
+            )
+
+        self.assertEqual(len(set(client.session.urls)), len(client.session.urls))
+
+    def test_expired_deadline_raises_without_calling_upstream(self):
+        client = GeminiClient(api_key="key")
+        client.session = _RoutingSession({})
+
+        with self.assertRaises(DeadlineExceededError):
+            client.generate_text(
+                system_prompt="s",
+                user_prompt="u",
+                temperature=0.1,
+                max_output_tokens=10,
+                deadline=Deadline.after(0),
+            )
+
+        self.assertEqual(client.session.urls, [])
+        self.assertTrue(client.get_last_call_details()["deadline_exceeded"])
+
+
+class CallDetailsIsolationTests(unittest.TestCase):
+    def test_concurrent_callers_see_their_own_call_details(self):
+        client = GeminiClient(api_key="key", max_retries=0)
+        client.session = _RoutingSession({"v1beta/models/gemini-2.5-flash:": 404})
+        first_call_done = threading.Event()
+        second_call_done = threading.Event()
+        seen = {}
+
+        def _first_caller():
+            client.generate_text(system_prompt="s", user_prompt="first", temperature=0.1, max_output_tokens=10)
+            first_call_done.set()
+            second_call_done.wait(timeout=5)
+            seen["first"] = client.get_last_call_details()
+
+        worker = threading.Thread(target=_first_caller)
+        worker.start()
+        first_call_done.wait(timeout=5)
+        client.session = _RoutingSession({"generativelanguage": 500})
+        with self.assertRaises(RuntimeError):
+            client.generate_text(system_prompt="s", user_prompt="second", temperature=0.1, max_output_tokens=10)
+        second_call_done.set()
+        worker.join(timeout=5)
+
+        self.assertEqual(seen["first"]["status"], "success")
+        self.assertEqual(seen["first"]["attempts"], 1)
+        self.assertEqual(client.get_last_call_details()["error"], "no_compatible_model")
+
+
+class _SchemaRejectingSession:
+    def __init__(self):
+        self.payloads = []
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        self.payloads.append(json)
+        if "responseSchema" in json["generationConfig"]:
+            return _FakeResponse(400, {"error": {"message": "Unknown name \"responseSchema\""}})
+        return _FakeResponse(200, _gemini_body('{"items": ["Python"]}'))
+
+
+class StructuredOutputTests(unittest.TestCase):
+    SECTION_SCHEMA = {"items": [{"role": "...", "bullets": ["..."]}]}
+
+    def test_example_schema_converts_to_response_schema(self):
+        schema = build_response_schema(self.SECTION_SCHEMA)
+
+        self.assertEqual(schema["type"], "OBJECT")
+        self.assertEqual(schema["required"], ["items"])
+        item_schema = schema["properties"]["items"]["items"]
+        self.assertEqual(item_schema["properties"]["bullets"], {"type": "ARRAY", "items": {"type": "STRING"}})
+        self.assertEqual(schema_violations({"items": [{"role": "Engineer", "bullets": []}]}, schema), [])
+        self.assertEqual(schema_violations({"items": "Engineer"}, schema), ["$.items:expected_array"])
+
+    def test_response_schema_is_sent_with_json_calls(self):
+        client = GeminiClient(api_key="key")
+        client.session = _RoutingSession({})
+
+        client.generate_text(
+            system_prompt="s",
+            user_prompt="u",
+            temperature=0.1,
+            max_output_tokens=10,
+            response_mime_type="application/json",
+            response_schema=build_response_schema(self.SECTION_SCHEMA),
+        )
+
+        self.assertEqual(client.session.payloads[0]["generationConfig"]["responseSchema"]["type"], "OBJECT")
+
+    def test_rejected_response_schema_is_dropped_for_that_endpoint(self):
+        client = GeminiClient(api_key="key", max_retries=0)
+        client.session = _SchemaRejectingSession()
+        kwargs = dict(
+            system_prompt="s",
+            user_prompt="u",
+            temperature=0.1,
+            max_output_tokens=10,
+            response_mime_type="application/json",
+            response_schema=build_response_schema(self.SECTION_SCHEMA),
+        )
+
+        self.assertEqual(client.generate_text(**kwargs), '{"items": ["Python"]}')
+        self.assertEqual(len(client.session.payloads), 2)
+
+        client.generate_text(**kwargs)
+        self.assertEqual(len(client.session.payloads), 3)
+        self.assertNotIn("responseSchema", client.session.payloads[-1]["generationConfig"])
+
+
+class GeminiClientAsyncTests(unittest.IsolatedAsyncioTestCase):
+    def _client_with_transport(self, handler) -> GeminiClient:
+        client = GeminiClient(api_key="key", model="gemini-2.5-flash", max_retries=1)
+        client._async_session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._async_session_loop = asyncio.get_running_loop()
+        return client
+
+    async def test_agenerate_text_falls_back_to_next_model(self):
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request.url.path)
+            if "gemini-2.5-flash:" in request.url.path:
+                return httpx.Response(404, json={"error": {"message": "not found"}})
+            return httpx.Response(200, json=_gemini_body('{"items": ["ok"]}'))
+
+        client = self._client_with_transport(handler)
+        text = await client.agenerate_text(
+            system_prompt="sys",
+            user_prompt="user",
+            temperature=0.2,
+            max_output_tokens=100,
+            response_mime_type="application/json",
+        )
+        await client.aclose()
+
+        self.assertEqual(json.loads(text), {"items": ["ok"]})
+        details = client.get_last_call_details()
+        self.assertEqual(details["status"], "success")
+        self.assertEqual(details["model"], "gemini-2.5-pro")
+        self.assertEqual(details["attempts"], 1)
+        self.assertEqual(len(seen), 3)
+
+    async def test_first_async_attempt_waits_for_a_cooling_key(self):
+        url = "https://example.test/models/gemini-2.5-flash:generateContent"
+        sent = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sent.append(time.monotonic())
+            return httpx.Response(200, json=_gemini_body("ok"))
+
+        client = self._client_with_transport(handler)
+        client.key_pool = ApiKeyPool(["key"], default_cooldown_seconds=0)
+        client.key_pool.release(client.key_pool.acquire(url), 429, retry_after_seconds=0.3, scope=url)
+
+        started = time.monotonic()
+        response, attempts = await client._apost_with_retry(url, {})
+        await client.aclose()
+
+        self.assertEqual((response.status_code, attempts), (200, 1))
+        self.assertGreaterEqual(sent[0] - started, 0.25)
+
+    async def test_concurrent_identical_async_prompts_share_one_request(self):
+        calls = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=_gemini_body("shared"))
+
+        client = self._client_with_transport(handler)
+        client.cache = ResponseCache(MemoryCacheBackend())
+        results = await asyncio.gather(
+            *[
+                client.agenerate_text(system_prompt="s", user_prompt="u", temperature=0.1, max_output_tokens=50)
+                for _ in range(5)
+            ]
+        )
+        await client.aclose()
+
+        self.assertEqual(results, ["shared"] * 5)
+        self.assertEqual(len(calls), 1)
+
+    async def test_cancelled_async_leader_hands_the_flight_to_a_waiter(self):
+        cache = ResponseCache(MemoryCacheBackend())
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+            return {"text": "never"}
+
+        async def fast():
+            return {"text": "fresh"}
+
+        leader = asyncio.create_task(cache.aget_or_compute("key", slow))
+        await started.wait()
+        waiter = asyncio.create_task(cache.aget_or_compute("key", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        self.assertEqual(await waiter, ({"text": "fresh"}, "miss"))
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+
+    async def test_agenerate_text_runs_calls_concurrently(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=_gemini_body("done"))
+
+        client = self._client_with_transport(handler)
+        started = asyncio.get_running_loop().time()
+        results = await asyncio.gather(
+            *[
+                client.agenerate_text(system_prompt="s", user_prompt=str(index), temperature=0.1, max_output_tokens=10)
+                for index in range(10)
+            ]
+        )
+        elapsed = asyncio.get_running_loop().time() - started
+        await client.aclose()
+
+        self.assertEqual(results, ["done"] * 10)
+        self.assertLess(elapsed, 0.4)
+
+    async def test_agenerate_text_cancels_the_losing_hedge(self):
+        cancelled = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if "v1beta/" in request.url.path:
+                try:
+                    await asyncio.sleep(1.0)
+                except asyncio.CancelledError:
+                    cancelled.append(request.url.path)
+                    raise
+                return httpx.Response(200, json=_gemini_body("slow"))
+            return httpx.Response(200, json=_gemini_body("fast"))
+
+        client = self._client_with_transport(handler)
+        client.hedge_policy = HedgePolicy(min_samples=1, min_delay_seconds=0, max_hedge_ratio=1.0)
+        client.hedge_policy.record_latency("gemini-2.5-flash", 0.05)
+
+        text = await client.agenerate_text(system_prompt="s", user_prompt="u", temperature=0.1, max_output_tokens=10)
+        await asyncio.sleep(0)
+        await client.aclose()
+
+        self.assertEqual(text, "fast")
+        self.assertEqual(client.get_last_call_details()["hedge_wins"], 1)
+        self.assertEqual(len(cancelled), 1)
+        self.assertEqual(sum(item["in_flight"] for item in client.key_pool.snapshot().values()), 0)
+
+
+class AsyncSessionLifecycleTests(unittest.TestCase):
+    def test_session_is_closed_when_its_loop_shuts_down(self):
+        client = GeminiClient(api_key="key")
+
+        async def open_session():
+            return client._get_async_session()
+
+        first = asyncio.run(open_session())
+        second = asyncio.run(open_session())
+
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed)
+        self.assertTrue(second.is_closed)
+
+    def test_session_on_a_running_loop_is_closed_when_another_loop_takes_over(self):
+        client = GeminiClient(api_key="key")
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        async def open_session():
+            return client._get_async_session()
+
+        try:
+            first = asyncio.run_coroutine_threadsafe(open_session(), loop).result(timeout=5)
+            asyncio.run(open_session())
+            deadline = time.monotonic() + 5
+            while not first.is_closed and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(first.is_closed)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
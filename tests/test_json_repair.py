@@ -0,0 +1,60 @@
+import unittest
+
+from src.prompts.resume_prompt import SECTION_OUTPUT_SCHEMAS
+from src.utils.json_repair import (
+    REPAIR_SOURCE_DIRECT,
+    REPAIR_SOURCE_LOCAL,
+    REPAIR_SOURCE_SCHEMA_PARTIAL,
+    JsonRepairError,
+    parse_json_object,
+)
+
+
+class JsonRepairTests(unittest.TestCase):
+    def test_valid_json_inside_fences_is_parsed_directly(self):
+        data, source = parse_json_object('```json\n{"items": ["Python"]}\n```')
+
+        self.assertEqual(data, {"items": ["Python"]})
+        self.assertEqual(source, REPAIR_SOURCE_DIRECT)
+
+    def test_common_model_mistakes_are_repaired_locally(self):
+        cases = {
+            '{"items": ["Python", "SQL",],}': ["Python", "SQL"],
+            "{'items': ['Python', 'SQL']}": ["Python", "SQL"],
+            '{"items": ["Built APIs\nfor payments"]}': ["Built APIs\nfor payments"],
+            '{"items": ["Python", "SQL"': ["Python", "SQL"],
+            '{"items": ["Python", "Built REST API for': ["Python"],
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                data, source = parse_json_object(text, SECTION_OUTPUT_SCHEMAS["skills"])
+                self.assertEqual(data["items"], expected)
+                self.assertEqual(source, REPAIR_SOURCE_LOCAL)
+
+    def test_dangling_key_is_dropped_when_output_is_cut_off(self):
+        data, source = parse_json_object('{"items": ["Python"], "notes": ')
+
+        self.assertEqual(data, {"items": ["Python"]})
+        self.assertEqual(source, REPAIR_SOURCE_LOCAL)
+
+    def test_value_string_cut_off_by_truncation_is_dropped(self):
+        data, source = parse_json_object('{"items": ["Python"], "summary": "Led the migration of')
+
+        self.assertEqual(data, {"items": ["Python"]})
+        self.assertEqual(source, REPAIR_SOURCE_LOCAL)
+
+    def test_schema_guided_partial_parse_recovers_known_fields(self):
+        text = 'Sure! "items": ["Python", "FastAPI" and some trailing prose'
+
+        data, source = parse_json_object(text, SECTION_OUTPUT_SCHEMAS["skills"])
+
+        self.assertEqual(data, {"items": ["Python", "FastAPI"]})
+        self.assertEqual(source, REPAIR_SOURCE_SCHEMA_PARTIAL)
+
+    def test_unrecoverable_output_raises(self):
+        with self.assertRaises(JsonRepairError):
+            parse_json_object("I could not generate this section.", SECTION_OUTPUT_SCHEMAS["skills"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from src.prompts.prompt_encoding import compact_json, compress_job_description
+from src.prompts.resume_prompt import build_section_generation_prompt
+from src.utils.token_estimator import estimate_tokens, size_output_budget
+
+
+LONG_JOB_DESCRIPTION = (
+    "We are a fast-growing fintech company and we love what we do. "
+    "You will design and build scalable REST APIs in Python and FastAPI. "
+    "Our culture values ownership, curiosity and kindness above all else. "
+    "You will work with PostgreSQL, Redis and Kafka to process millions of events. "
+    "We offer flexible hours, great snacks, and a generous vacation policy. "
+    "Experience with AWS, Docker and Kubernetes is required. "
+    "The office is located downtown near the train station and has bike parking. "
+) * 4
+
+
+class PromptEncodingTests(unittest.TestCase):
+    def test_compact_json_drops_empty_fields_and_duplicates(self):
+        encoded = compact_json({"skills": ["Python", "python", "SQL"], "projects": [], "summary": "  Backend   engineer "})
+
+        self.assertEqual(encoded, '{"skills":["Python","SQL"],"summary":"Backend engineer"}')
+
+    def test_long_job_description_keeps_keyword_sentences(self):
+        compressed = compress_job_description(LONG_JOB_DESCRIPTION, ["api design"], max_chars=300)
+
+        self.assertLessEqual(len(compressed), 300)
+        self.assertIn("FastAPI", compressed)
+        self.assertIn("Kubernetes", compressed)
+        self.assertNotIn("snacks", compressed)
+
+    def test_short_job_description_is_left_intact(self):
+        self.assertEqual(compress_job_description("Build  APIs in Go."), "Build APIs in Go.")
+
+    def test_job_description_is_only_sent_to_sections_that_use_it(self):
+        payload = {"job_description": LONG_JOB_DESCRIPTION, "education": ["B.Tech | IIT Delhi | 2020 - 2024"]}
+
+        _, education_prompt = build_section_generation_prompt("education", payload)
+        _, skills_prompt = build_section_generation_prompt("skills", payload)
+
+        self.assertNotIn("FastAPI", education_prompt)
+        self.assertIn("FastAPI", skills_prompt)
+        self.assertLess(len(skills_prompt), len(LONG_JOB_DESCRIPTION))
+
+
+class TokenEstimatorTests(unittest.TestCase):
+    def test_estimate_scales_with_text_size(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        short = estimate_tokens("Built REST APIs in FastAPI.")
+        self.assertGreater(short, 0)
+        self.assertGreater(estimate_tokens("Built REST APIs in FastAPI. " * 10), short * 5)
+
+    def test_output_budget_is_bounded_by_floor_and_ceiling(self):
+        self.assertEqual(size_output_budget(950, 0, floor=220), 220)
+        self.assertEqual(size_output_budget(950, 5000, floor=220), 950)
+        self.assertEqual(size_output_budget(950, 200, floor=220, expansion=1.5, overhead=100), 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
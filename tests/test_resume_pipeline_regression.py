@@ -1,6 +1,14 @@
+import dataclasses
+import re
+import threading
+import time
 import unittest
 
-from src.services.resume.generator import ResumeGenerator
+from src.domain.models import EducationItem, ExperienceItem, PersonalInfo, ResumeInput
+from src.prompts.resume_prompt import JD_AWARE_SECTIONS
+from src.services.ai.model_router import ModelRouter
+from src.services.ai.usage import current_usage_tracker, track_usage
+from src.services.resume.generator import RESPONSE_KEYS, ResumeGenerator
 from src.ui.forms import _parse_experience
 
 
@@ -11,6 +19,87 @@ class _FakeGeminiClient:
     def get_last_call_details(self):
         return {}
 
+    def is_available(self):
+        return True
+
+
+class _UnavailableGeminiClient(_FakeGeminiClient):
+    def generate_text(self, **kwargs):
+        raise AssertionError("generate_text must not be called while the circuit is open")
+
+    def is_available(self):
+        return False
+
+
+def _sample_resume_input() -> ResumeInput:
+    return ResumeInput(
+        personal_info=PersonalInfo(full_name="Asha Rao", email="asha@example.com"),
+        career_summary="Backend engineer building reliable Python services and data pipelines.",
+        target_role="Backend Engineer",
+        skills=["Python", "FastAPI", "PostgreSQL", "Docker", "Redis", "AWS"],
+        experiences=[
+            ExperienceItem(
+                role="Software Engineer Intern",
+                company="Acme Labs",
+                duration="Jan 2024 - Jun 2024",
+                location="Remote",
+                bullet_points=["Built REST APIs in FastAPI serving 10k daily requests."],
+            )
+        ],
+    )
+
+
+class _SlowGeminiClient(_FakeGeminiClient):
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate_text(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return '{"items": ["Python", "FastAPI", "SQL"]}'
+
+    def get_last_call_details(self):
+        return {}
+
+
+class _BatchedGeminiClient(_FakeGeminiClient):
+    def __init__(self):
+        self.prompts = []
+
+    def generate_text(self, **kwargs):
+        self.prompts.append(kwargs.get("user_prompt", ""))
+        if len(self.prompts) == 1:
+            return (
+                '{"professional_summary": ["Backend engineer"], '
+                '"skills": ["Python", "FastAPI", "PostgreSQL", "Docker", "Redis", "AWS"], '
+                '"education": [], "experience": [], "projects": [], '
+                '"certifications": ["AWS Certified Cloud Practitioner"], "achievements": []}'
+            )
+        return '{"items": ["Backend engineer shipping reliable Python APIs for high traffic products."]}'
+
+
+class _SummaryGeminiClient(_FakeGeminiClient):
+    def generate_text(self, **kwargs):
+        return '{"items": ["Backend engineer shipping reliable Python APIs for high traffic products."]}'
+
+
+class _TruncatedJsonGeminiClient(_FakeGeminiClient):
+    def __init__(self):
+        self.calls = 0
+
+    def generate_text(self, **kwargs):
+        self.calls += 1
+        return '{"items": ["Python", "FastAPI", "PostgreSQL",'
+
 
 class ResumePipelineRegressionTests(unittest.TestCase):
     def test_experience_location_does_not_capture_sentence_fragment(self):
@@ -73,6 +162,370 @@ class ResumePipelineRegressionTests(unittest.TestCase):
         self.assertEqual(merged.get("name"), "Player Re-Identification in Sports Footage")
         self.assertEqual(merged.get("technologies"), "Python, PyTorch, YOLOv11, ResNet18, OpenCV")
 
+    def test_sectional_generation_respects_concurrency_limit(self):
+        client = _SlowGeminiClient(delay=0.05)
+        generator = ResumeGenerator(gemini_client=client, section_concurrency=3)
+        cleaned_payload = {"skills": ["Python", "FastAPI", "SQL"]}
+
+        payload, meta = generator._generate_sectional_payload(cleaned_payload)
+
+        self.assertEqual(list(payload.keys()), RESPONSE_KEYS)
+        self.assertEqual(client.calls, len(RESPONSE_KEYS))
+        self.assertGreater(client.max_in_flight, 1)
+        self.assertLessEqual(client.max_in_flight, 3)
+        self.assertIn("skills", meta["successful_sections"])
+
+    def test_open_circuit_skips_ai_generation(self):
+        generator = ResumeGenerator(gemini_client=_UnavailableGeminiClient())
+
+        output = generator.generate(_sample_resume_input())
+
+        self.assertEqual(output.raw_response.get("mode"), "fallback_circuit_open")
+        self.assertTrue(output.skills)
+
+    def test_batched_generation_rerequests_only_failed_sections(self):
+        client = _BatchedGeminiClient()
+        generator = ResumeGenerator(gemini_client=client)
+        cleaned_payload = {
+            "skills": ["Python", "FastAPI", "PostgreSQL", "Docker", "Redis", "AWS"],
+            "certifications": ["AWS Certified Cloud Practitioner"],
+        }
+
+        payload, meta = generator._generate_batched_payload(cleaned_payload)
+
+        self.assertEqual(list(payload.keys()), RESPONSE_KEYS)
+        self.assertIn("skills", meta["successful_sections"])
+        self.assertIn("certifications", meta["successful_sections"])
+        self.assertIn("professional_summary", meta["retried_sections"])
+        self.assertNotIn("skills", meta["retried_sections"])
+        self.assertEqual(meta["section_calls"], 1 + len(meta["retried_sections"]))
+        self.assertEqual(len(client.prompts), meta["section_calls"])
+
+    def test_quality_issues_map_to_the_sections_that_caused_them(self):
+        generator = ResumeGenerator(gemini_client=_FakeGeminiClient())
+        payload = {
+            "professional_summary": ["Backend engineer"],
+            "skills": ["Python", "FastAPI"],
+            "experience": ["Software Engineer Intern | Acme Labs | Jan 2024 - Jun 2024 | Remote", "- Built APIs."],
+            "projects": ["Resume Builder | Python, FastAPI", "- Built a resume builder."],
+        }
+
+        targets = generator._sections_for_quality_issues(payload, ["truncated_summary", "sparse_project_headers"])
+        self.assertEqual(targets, ["professional_summary", "projects"])
+
+        targets = generator._sections_for_quality_issues(payload, ["too_few_sections_or_lines"])
+        self.assertEqual(targets, ["education", "certifications", "achievements"])
+
+    def test_recovery_rerequests_only_flagged_sections(self):
+        client = _SlowGeminiClient(delay=0)
+        generator = ResumeGenerator(gemini_client=client)
+        generated = {key: ["Existing content line for this section."] for key in RESPONSE_KEYS}
+
+        generator._recover_low_quality_output(
+            _sample_resume_input(),
+            {},
+            ["truncated_summary"],
+            generated_payload=generated,
+            checked_payload={**generated, "professional_summary": ["Backend engineer"]},
+        )
+
+        self.assertEqual(client.calls, 1)
+
+    def test_recovered_mode_names_the_strategy_that_ran(self):
+        generator = ResumeGenerator(gemini_client=_SummaryGeminiClient())
+        generated = {key: ["Existing content line for this section."] for key in RESPONSE_KEYS}
+
+        recovered = generator._recover_low_quality_output(
+            _sample_resume_input(),
+            {},
+            ["truncated_summary"],
+            strategy="batched",
+            generated_payload=generated,
+            checked_payload={**generated, "professional_summary": ["Backend engineer"]},
+        )
+
+        self.assertEqual(recovered["mode"], "ai_batched_recovered")
+        self.assertEqual(recovered["generation_strategy"], "batched")
+
+    def test_payload_checks_match_the_per_section_checks(self):
+        generator = ResumeGenerator(gemini_client=_FakeGeminiClient())
+        payload = {
+            "professional_summary": ["Backend engineer"],
+            "experience": ["Acme | Acme | Jan 2024 | Remote", "- " + "Built APIs " * 30],
+            "projects": ["Resume Builder | N/A | 2024", "- Built a resume builder."],
+        }
+
+        section_issues = [
+            issue
+            for section in ("professional_summary", "experience", "projects")
+            for issue in generator._section_quality_issues(section, payload[section])
+        ]
+        issues = generator._quality_issues(payload, _sample_resume_input())
+
+        self.assertTrue(section_issues)
+        self.assertEqual([issue for issue in issues if issue in section_issues], list(dict.fromkeys(section_issues)))
+
+    def test_truncated_section_json_is_repaired_without_a_model_round_trip(self):
+        client = _TruncatedJsonGeminiClient()
+        generator = ResumeGenerator(gemini_client=client)
+        repair_sources = []
+
+        values = generator._generate_single_section("skills", {}, repair_sources=repair_sources)
+
+        self.assertEqual(values, ["Python", "FastAPI", "PostgreSQL"])
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(repair_sources, ["local"])
+
+
+class _ModelRecordingGeminiClient(_FakeGeminiClient):
+    def __init__(self):
+        self.models = []
+        self._lock = threading.Lock()
+
+    def generate_text(self, **kwargs):
+        with self._lock:
+            self.models.append(kwargs.get("model", ""))
+        return '{"items": ["Python", "FastAPI", "SQL"]}'
+
+    def get_last_call_details(self):
+        return {"model": self.models[-1] if self.models else ""}
+
+
+class _CheapModelFailingGeminiClient(_ModelRecordingGeminiClient):
+    def generate_text(self, **kwargs):
+        super().generate_text(**kwargs)
+        if kwargs.get("model") == "gemini-2.0-flash-lite":
+            return '{"items": ["N/A"]}'
+        return '{"items": ["AWS Certified Developer"]}'
+
+
+class _MeteredGeminiClient(_ModelRecordingGeminiClient):
+    def generate_text(self, **kwargs):
+        tracker = current_usage_tracker()
+        if tracker is not None:
+            tracker.record_call(kwargs.get("model", ""), True, 0.01, 1, {"total_tokens": 10})
+        return super().generate_text(**kwargs)
+
+
+class ModelRoutingGenerationTests(unittest.TestCase):
+    def test_sections_are_routed_and_recovery_promotes(self):
+        client = _ModelRecordingGeminiClient()
+        router = ModelRouter(routes={"skills": ("gemini-2.0-flash-lite",)}, default_model="gemini-2.5-flash")
+        generator = ResumeGenerator(gemini_client=client, model_router=router)
+        cleaned_payload = generator._build_local_cleaning_payload(_sample_resume_input())
+
+        generator._collect_section_results(["skills", "education"], cleaned_payload, {}, [], [])
+        self.assertEqual(client.models, ["gemini-2.0-flash-lite", "gemini-2.5-flash"])
+
+        client.models.clear()
+        generator._collect_section_results(["skills"], cleaned_payload, {}, [], [], promote=True)
+        self.assertEqual(client.models, ["gemini-2.0-flash"])
+        self.assertEqual(router.snapshot()["quality"]["skills@gemini-2.0-flash"], {"samples": 1, "failures": 0})
+
+    def test_failing_cheap_route_is_promoted(self):
+        client = _CheapModelFailingGeminiClient()
+        router = ModelRouter(routes={"certifications": ("gemini-2.0-flash-lite",)}, default_model="gemini-2.5-flash")
+        generator = ResumeGenerator(gemini_client=client, model_router=router)
+        cleaned_payload = generator._build_local_cleaning_payload(_sample_resume_input())
+
+        for _ in range(4):
+            generator._collect_section_results(["certifications"], cleaned_payload, {}, [], [])
+        self.assertEqual(set(client.models), {"gemini-2.0-flash-lite"})
+        self.assertEqual(
+            router.snapshot()["quality"]["certifications@gemini-2.0-flash-lite"], {"samples": 4, "failures": 4}
+        )
+
+        client.models.clear()
+        payload = {}
+        generator._collect_section_results(["certifications"], cleaned_payload, payload, [], [])
+        self.assertEqual(client.models, ["gemini-2.0-flash"])
+        self.assertEqual(payload["certifications"], ["AWS Certified Developer"])
+
+    def test_empty_and_placeholder_list_sections_fail_quality(self):
+        router = ModelRouter(routes={})
+        generator = ResumeGenerator(gemini_client=_FakeGeminiClient(), model_router=router)
+
+        self.assertEqual(generator._section_quality_issues("certifications", ["N/A"]), ["placeholder_content"])
+        self.assertEqual(generator._section_quality_issues("certifications", ["AWS Certified Developer"]), [])
+        generator._record_section_quality("skills", [], {"model": "gemini-2.0-flash-lite"})
+        self.assertEqual(router.snapshot()["quality"]["skills@gemini-2.0-flash-lite"], {"samples": 1, "failures": 1})
+
+
+
+class ProgressiveGenerationTests(unittest.TestCase):
+    def test_completed_sections_are_reported_as_they_land(self):
+        generator = ResumeGenerator(gemini_client=_ModelRecordingGeminiClient(), section_concurrency=4)
+        completed = []
+
+        generator.generate(_sample_resume_input(), on_section=lambda name, lines: completed.append((name, lines)))
+
+        names = {name for name, _ in completed}
+        self.assertTrue({"skills", "education", "experience"} <= names <= set(RESPONSE_KEYS))
+        self.assertTrue(all(lines for _, lines in completed))
+
+    def test_preview_output_needs_no_model_call(self):
+        generator = ResumeGenerator(gemini_client=_UnavailableGeminiClient())
+
+        preview = generator.preview_output(_sample_resume_input())
+
+        self.assertEqual(preview.raw_response["mode"], "preview")
+        self.assertTrue(preview.skills)
+
+    def test_section_threads_see_the_callers_usage_tracker(self):
+        generator = ResumeGenerator(gemini_client=_FakeGeminiClient(), section_concurrency=4)
+
+        with track_usage() as tracker:
+            seen = generator._map_sections(lambda _: current_usage_tracker(), RESPONSE_KEYS)
+
+        self.assertEqual(seen, [tracker] * len(RESPONSE_KEYS))
+
+
+class _SectionRecordingGeminiClient(_ModelRecordingGeminiClient):
+    def __init__(self):
+        super().__init__()
+        self.sections = []
+
+    def generate_text(self, **kwargs):
+        match = re.search(r"Generate only the '(\w+)' section", kwargs.get("user_prompt", ""))
+        with self._lock:
+            self.sections.append(match.group(1) if match else "")
+        return super().generate_text(**kwargs)
+
+
+class _PromptRecordingGeminiClient(_SectionRecordingGeminiClient):
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def generate_text(self, **kwargs):
+        text = super().generate_text(**kwargs)
+        with self._lock:
+            self.prompts.append((self.sections[-1], kwargs.get("system_prompt", "") + kwargs.get("user_prompt", "")))
+        return text
+
+
+class IncrementalRegenerationTests(unittest.TestCase):
+    def _base_input(self):
+        return dataclasses.replace(
+            _sample_resume_input(),
+            education=[EducationItem(degree="B.Tech Computer Science", institution="IIT Delhi", duration="2020 - 2024")],
+        )
+
+    def _previous_run(self, generator, resume_input):
+        previous_output = generator.preview_output(resume_input)
+        previous_output.raw_response = {"mode": "ai_sectional", "successful_sections": list(RESPONSE_KEYS)}
+        return previous_output
+
+    def test_only_changed_sections_call_gemini(self):
+        client = _SectionRecordingGeminiClient()
+        generator = ResumeGenerator(gemini_client=client)
+        previous_input = self._base_input()
+        previous_output = self._previous_run(generator, previous_input)
+        resume_input = dataclasses.replace(previous_input, certifications=["AWS Certified Developer"])
+
+        output = generator.generate(resume_input, previous_input=previous_input, previous_output=previous_output)
+
+        reused = output.raw_response["reused_sections"]
+        self.assertTrue({"professional_summary", "skills", "education", "experience"} <= set(reused))
+        self.assertIn("certifications", client.sections)
+        self.assertEqual(set(client.sections), set(RESPONSE_KEYS) - set(reused))
+        self.assertEqual(output.experience, previous_output.experience)
+
+    def test_job_description_change_invalidates_jd_aware_sections(self):
+        generator = ResumeGenerator(gemini_client=_FakeGeminiClient())
+        previous_input = self._base_input()
+        previous_output = self._previous_run(generator, previous_input)
+        resume_input = dataclasses.replace(previous_input, job_description="Python backend role using Kafka.")
+        cleaned_payload = generator._build_local_cleaning_payload(resume_input)
+
+        reused = generator._reusable_sections(cleaned_payload, previous_input, previous_output)
+
+        self.assertIn("education", reused)
+        self.assertFalse({"professional_summary", "skills", "experience"} & set(reused))
+
+    def test_fallback_output_is_never_reused(self):
+        generator = ResumeGenerator(gemini_client=_FakeGeminiClient())
+        resume_input = _sample_resume_input()
+        cleaned_payload = generator._build_local_cleaning_payload(resume_input)
+
+        reused = generator._reusable_sections(cleaned_payload, resume_input, generator.preview_output(resume_input))
+
+        self.assertEqual(reused, {})
+
+
+class TargetFanOutTests(unittest.TestCase):
+    def test_jd_independent_sections_are_generated_once(self):
+        client = _SectionRecordingGeminiClient()
+        generator = ResumeGenerator(gemini_client=client, section_concurrency=3)
+        profile = dataclasses.replace(
+            _sample_resume_input(),
+            education=[EducationItem(degree="B.Tech Computer Science", institution="IIT Delhi", duration="2020 - 2024")],
+        )
+        targets = [
+            dataclasses.replace(profile, target_role=role, job_description=f"{role} role using Python and Kafka.")
+            for role in ("Backend Engineer", "Data Engineer", "Platform Engineer")
+        ]
+
+        outputs = generator.generate_for_targets(profile, targets)
+
+        shared = set(RESPONSE_KEYS) - JD_AWARE_SECTIONS
+        self.assertEqual(len(outputs), 3)
+        self.assertTrue(all(client.sections.count(name) == 1 for name in shared))
+        self.assertTrue(all(client.sections.count(name) >= 3 for name in JD_AWARE_SECTIONS))
+        self.assertTrue(all(output.education == outputs[0].education for output in outputs))
+
+    def test_each_target_reports_its_own_usage(self):
+        generator = ResumeGenerator(gemini_client=_MeteredGeminiClient(), section_concurrency=2)
+        targets = [dataclasses.replace(_sample_resume_input(), target_role=f"Role {index}") for index in range(2)]
+
+        with track_usage() as tracker:
+            outputs = generator.generate_for_targets(_sample_resume_input(), targets)
+
+        target_calls = [output.raw_response["usage"]["calls"] for output in outputs]
+        self.assertTrue(all(target_calls))
+        self.assertGreater(tracker.summary()["calls"], sum(target_calls))
+
+    def test_every_target_gets_its_own_deadline(self):
+        generator = ResumeGenerator(gemini_client=_SlowGeminiClient(delay=0.02), deadline_seconds=0.3)
+        targets = [
+            dataclasses.replace(_sample_resume_input(), target_role=f"Role {index}", job_description="Python APIs.")
+            for index in range(4)
+        ]
+
+        started = time.monotonic()
+        outputs = generator.generate_for_targets(_sample_resume_input(), targets)
+
+        self.assertGreater(time.monotonic() - started, 0.3)
+        self.assertFalse([output.raw_response for output in outputs if output.raw_response.get("deadline_exceeded")])
+
+    def test_nested_pools_share_the_concurrency_cap(self):
+        client = _SlowGeminiClient(delay=0.01)
+        generator = ResumeGenerator(gemini_client=client, section_concurrency=2)
+        targets = [dataclasses.replace(_sample_resume_input(), target_role=f"Role {index}") for index in range(4)]
+
+        generator.generate_for_targets(_sample_resume_input(), targets)
+
+        self.assertEqual(client.max_in_flight, 2)
+
+    def test_shared_section_prompts_carry_no_target(self):
+        client = _PromptRecordingGeminiClient()
+        generator = ResumeGenerator(gemini_client=client)
+        profile = dataclasses.replace(
+            _sample_resume_input(),
+            target_role="Staff Engineer",
+            target_company="Initech",
+            job_description="Staff role using Go.",
+        )
+        targets = [dataclasses.replace(profile, target_role="Data Engineer", target_company="Globex")]
+
+        generator.generate_for_targets(profile, targets)
+
+        shared_prompts = [prompt for section, prompt in client.prompts if section not in JD_AWARE_SECTIONS]
+        self.assertTrue(shared_prompts)
+        for prompt in shared_prompts:
+            for value in ("Staff Engineer", "Initech", "Data Engineer", "Globex", "Staff role using Go"):
+                self.assertNotIn(value, prompt)
+
 
 if __name__ == "__main__":
     unittest.main()
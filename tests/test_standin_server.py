@@ -0,0 +1,146 @@
+import json
+import random
+import tempfile
+import threading
+import unittest
+
+from src.services.ai.gemini_client import GeminiClient
+from src.services.ai.standin_server import (
+    FAULT_MALFORMED,
+    FaultPlan,
+    GeminiStandIn,
+    LatencyModel,
+    build_server,
+    request_key,
+)
+from src.services.ai.structured_output import build_response_schema, schema_violations
+from src.services.ai.usage import track_usage
+
+
+_SCHEMA = {"summary": "string", "bullets": ["string"]}
+
+
+class _RunningStandIn:
+    def __init__(self, standin: GeminiStandIn):
+        self.standin = standin
+        self.server = build_server(standin, port=0)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "_RunningStandIn":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _client(base_url: str) -> GeminiClient:
+    return GeminiClient(api_key="local", model="gemini-2.5-flash", max_retries=0, base_url=base_url)
+
+
+def _generate(client: GeminiClient, prompt: str = "Senior Python engineer, Kubernetes and PostgreSQL") -> str:
+    return client.generate_text(
+        system_prompt="Write resume content.",
+        user_prompt=prompt,
+        temperature=0.2,
+        max_output_tokens=200,
+        response_mime_type="application/json",
+        response_schema=build_response_schema(_SCHEMA),
+    )
+
+
+class GeminiStandInServerTests(unittest.TestCase):
+    def test_base_url_routes_client_calls_to_the_stand_in(self):
+        with _RunningStandIn(GeminiStandIn()) as running:
+            client = _client(running.url)
+            with track_usage() as tracker:
+                first = _generate(client)
+                second = _generate(client)
+
+        self.assertTrue(all(template.startswith(running.url) for template in client.api_templates))
+        self.assertEqual(first, second)
+        self.assertEqual(schema_violations(json.loads(first), build_response_schema(_SCHEMA)), [])
+        self.assertGreater(tracker.summary()["prompt_tokens"], 0)
+        self.assertEqual(running.standin.stats()["synthesized"], 2)
+
+    def test_recorded_responses_replay_without_upstream(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with _RunningStandIn(GeminiStandIn()) as upstream:
+                recorder = GeminiStandIn(mode="record", recordings_dir=directory, upstream_url=upstream.url)
+                with _RunningStandIn(recorder) as running:
+                    recorded = _generate(_client(running.url))
+
+            replayer = GeminiStandIn(mode="replay", recordings_dir=directory, synthesize_on_miss=False)
+            with _RunningStandIn(replayer) as running:
+                client = _client(running.url)
+                replayed = _generate(client)
+                with self.assertRaises(RuntimeError):
+                    _generate(client, prompt="A prompt that was never recorded")
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(recorder.stats()["recorded"], 1)
+        self.assertEqual(replayer.stats()["replayed"], 1)
+        self.assertGreaterEqual(replayer.stats()["replay_misses"], 1)
+
+    def test_injected_rate_limits_reach_the_client(self):
+        standin = GeminiStandIn(faults=FaultPlan(rate_limited_rate=1.0), retry_after_seconds=0)
+        with _RunningStandIn(standin) as running:
+            client = _client(running.url)
+            with self.assertRaises(RuntimeError):
+                _generate(client)
+
+        self.assertIn("429", json.dumps(client.get_last_call_details()["errors"]))
+        self.assertGreater(standin.stats()["injected_429"], 0)
+
+
+class GeminiStandInBehaviourTests(unittest.TestCase):
+    def _body(self, text: str = "prompt") -> dict:
+        return {"contents": [{"role": "user", "parts": [{"text": text}]}], "generationConfig": {"temperature": 0.2}}
+
+    def test_seeded_fault_sequence_is_reproducible(self):
+        faults = FaultPlan(not_found_rate=0.1, rate_limited_rate=0.2, server_error_rate=0.1, malformed_rate=0.1)
+        runs = []
+        for _ in range(2):
+            standin = GeminiStandIn(faults=faults, seed=7)
+            runs.append([standin.handle("/v1beta/models/m:generateContent", self._body())[0] for _ in range(40)])
+
+        self.assertEqual(runs[0], runs[1])
+        self.assertTrue({404, 429, 503, 200} <= set(runs[0]))
+
+    def test_malformed_fault_truncates_the_answer(self):
+        standin = GeminiStandIn(faults=FaultPlan(malformed_rate=1.0))
+        body = {**self._body(), "generationConfig": {"responseMimeType": "application/json"}}
+        status, _, response = standin.handle("/v1/models/m:generateContent", body)
+        text = response["candidates"][0]["content"]["parts"][0]["text"]
+
+        self.assertEqual(status, 200)
+        self.assertEqual(standin.stats()["injected_" + FAULT_MALFORMED], 1)
+        with self.assertRaises(ValueError):
+            json.loads(text)
+
+    def test_rate_limit_carries_retry_hints(self):
+        standin = GeminiStandIn(faults=FaultPlan(rate_limited_rate=1.0), retry_after_seconds=3)
+        status, headers, response = standin.handle("/v1beta/models/m:generateContent", self._body())
+
+        self.assertEqual((status, headers["Retry-After"]), (429, "3"))
+        self.assertEqual(response["error"]["details"][0]["retryDelay"], "3s")
+
+    def test_request_key_ignores_model_and_unrelated_fields(self):
+        body = self._body()
+        self.assertEqual(request_key(body), request_key({**body, "safetySettings": []}))
+        self.assertNotEqual(request_key(body), request_key(self._body("other prompt")))
+
+    def test_latency_distributions(self):
+        rng = random.Random(1)
+        self.assertEqual(LatencyModel.parse("250").sample(rng), 0.25)
+        uniform = [LatencyModel.parse("uniform:100:200").sample(rng) for _ in range(50)]
+        self.assertTrue(all(0.1 <= value <= 0.2 for value in uniform))
+        self.assertGreater(LatencyModel.parse("lognormal:300:0.5").sample(rng), 0)
+        with self.assertRaises(ValueError):
+            LatencyModel.parse("pareto:1:2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,8 @@ export const API_BASE_URL =
   process.env.NEXT_PUBLIC_API_BASE_URL ?? "http://localhost:8000/api/v1";
 
 export type ResumeTemplateKey = "classic" | "compact" | "modern";
+export type GenerationStrategy = "sectional" | "batched";
+export type GenerationMode = "ai" | "local";
 
 export interface AuthTokenResponse {
   access_token: string;
@@ -9,6 +11,7 @@ export interface AuthTokenResponse {
   user: {
     id: string;
     email: string;
+    deduplicate_jobs: boolean;
     created_at: string;
   };
 }
@@ -59,15 +62,19 @@ export interface ResumeInputPayload {
   achievements: string[];
 }
 
+export type ResumeJobStatus = "queued" | "processing" | "preview_ready" | "completed" | "failed";
+
 export interface ResumeJobQueuedResponse {
   job_id: string;
-  status: "queued" | "processing" | "completed" | "failed";
+  status: ResumeJobStatus;
   queue_backend: string;
+  deduplicated: boolean;
+  record_id: string | null;
 }
 
 export interface ResumeJobStatusResponse {
   job_id: string;
-  status: "queued" | "processing" | "completed" | "failed";
+  status: ResumeJobStatus;
   template_key: ResumeTemplateKey;
   created_at: string;
   updated_at: string;
@@ -77,6 +84,47 @@ export interface ResumeJobStatusResponse {
   pdf_download_url: string;
 }
 
+export interface ResumeTargetPayload {
+  target_role?: string;
+  target_company?: string;
+  job_description?: string;
+}
+
+export interface ResumeBatchJobQueuedResponse {
+  job_id: string;
+  status: ResumeJobStatus;
+  queue_backend: string;
+  targets: number;
+}
+
+export interface ResumeBatchJobStatusResponse {
+  job_id: string;
+  status: ResumeJobStatus;
+  template_key: ResumeTemplateKey;
+  created_at: string;
+  updated_at: string;
+  error_message: string;
+  result_payload: Record<string, unknown>;
+  record_ids: string[];
+}
+
+export interface RecordTemplateResponse {
+  record_id: string;
+  template_key: ResumeTemplateKey;
+  markdown: string;
+  pdf_download_url: string;
+  cached: boolean;
+  elapsed_ms: number;
+}
+
+export interface LocalGenerationResponse {
+  resume_output: Record<string, string[]>;
+  markdown: string;
+  ats_result: Record<string, unknown>;
+  jd_result: Record<string, unknown>;
+  elapsed_ms: number;
+}
+
 function resolveApiUrl(pathOrUrl: string): string {
   if (/^https?:\/\//i.test(pathOrUrl)) {
     return pathOrUrl;
@@ -274,6 +322,11 @@ export function createResumeJob(
   payload: {
     resume_input: ResumeInputPayload;
     template_key: ResumeTemplateKey;
+    generation_strategy?: GenerationStrategy;
+    generation_mode?: GenerationMode;
+    preview_first?: boolean;
+    previous_record_id?: string;
+    deduplicate?: boolean;
   },
   token: string
 ) {
@@ -287,10 +340,53 @@ export function createResumeJob(
   );
 }
 
+export function createResumeBatchJob(
+  payload: {
+    resume_input: ResumeInputPayload;
+    targets: ResumeTargetPayload[];
+    template_key: ResumeTemplateKey;
+  },
+  token: string
+) {
+  return apiRequest<ResumeBatchJobQueuedResponse>(
+    "/resumes/batch-jobs",
+    {
+      method: "POST",
+      body: JSON.stringify(payload),
+    },
+    token
+  );
+}
+
+export function getResumeBatchJob(jobId: string, token: string) {
+  return apiRequest<ResumeBatchJobStatusResponse>(`/resumes/batch-jobs/${jobId}`, {}, token);
+}
+
+export function generateLocalResume(
+  payload: {
+    resume_input: ResumeInputPayload;
+    template_key: ResumeTemplateKey;
+  },
+  token: string
+) {
+  return apiRequest<LocalGenerationResponse>(
+    "/resumes/generate-local",
+    {
+      method: "POST",
+      body: JSON.stringify(payload),
+    },
+    token
+  );
+}
+
 export function getResumeJob(jobId: string, token: string) {
   return apiRequest<ResumeJobStatusResponse>(`/resumes/jobs/${jobId}`, {}, token);
 }
 
+export function renderRecordTemplate(recordId: string, templateKey: ResumeTemplateKey, token: string) {
+  return apiRequest<RecordTemplateResponse>(`/resumes/records/${recordId}/templates/${templateKey}`, {}, token);
+}
+
 export function listResumeRecords(token: string) {
   return apiRequest<Array<{ id: string; title: string; created_at: string }>>("/resumes/records", {}, token);
 }